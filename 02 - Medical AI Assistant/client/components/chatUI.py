@@ -1,5 +1,51 @@
+import requests
 import streamlit as st
-from utils.api import ask_question
+from config import HISTORY_PAGE_SIZE
+from utils.api import ask_question, create_session_api
+
+
+def _get_session_id():
+    # one server-side conversation per browser session; stay stateless if
+    # the backend can't create one
+    if "session_id" not in st.session_state:
+        try:
+            response = create_session_api()
+            st.session_state.session_id = (
+                response.json()["session_id"] if response.status_code == 200 else None
+            )
+        except requests.RequestException:
+            st.session_state.session_id = None
+    return st.session_state.session_id
+
+
+def _format_citations(citations):
+    lines = []
+    for c in citations:
+        if not c.get("source"):
+            continue
+        where = f"p. {c['page']}" if c.get("page") else ""
+        if c.get("start") is not None:
+            where = f"{where}, chars {c['start']}–{c['end']}".lstrip(", ")
+        lines.append(f"- `{c['source']}` {where}".rstrip())
+    if not lines:
+        return ""
+    return "\n\n📄 **Sources:**\n" + "\n".join(lines)
+
+
+def _render_history(messages):
+    """
+    Render only the newest page(s) of history. Older messages stay in
+    session state but are not turned into widgets until requested, so a
+    rerun costs the same however long the conversation gets.
+    """
+    visible = st.session_state.setdefault("history_visible", HISTORY_PAGE_SIZE)
+    hidden = max(0, len(messages) - visible)
+    if hidden:
+        if st.button(f"Show earlier messages ({hidden} hidden)"):
+            st.session_state.history_visible = visible + HISTORY_PAGE_SIZE
+            st.rerun()
+    for msg in messages[hidden:]:
+        st.chat_message(msg["role"]).markdown(msg["content"])
 
 
 def render_chat():
@@ -9,8 +55,7 @@ def render_chat():
         st.session_state.messages = []
 
     # render existing chat history
-    for msg in st.session_state.messages:
-        st.chat_message(msg["role"]).markdown(msg["content"])
+    _render_history(st.session_state.messages)
 
     # input and response
     user_input = st.chat_input("Type your question....")
@@ -18,16 +63,28 @@ def render_chat():
         st.chat_message("user").markdown(user_input)
         st.session_state.messages.append({"role": "user", "content": user_input})
 
-        response = ask_question(user_input)
+        # placeholder is filled in place once the answer arrives
+        with st.chat_message("assistant"):
+            placeholder = st.empty()
+            with st.spinner("Thinking..."):
+                try:
+                    response = ask_question(user_input, _get_session_id())
+                except requests.RequestException as e:
+                    placeholder.empty()
+                    st.error(f"Error: {e}")
+                    return
+
+        if response.status_code == 404 and "session_id" in st.session_state:
+            # server restarted or session expired; start a new one next time
+            del st.session_state["session_id"]
+
         if response.status_code == 200:
             data = response.json()
             answer = data["response"]
-            sources = data.get("sources", [])
-            st.chat_message("assistant").markdown(answer)
-            # if sources:
-            #     st.markdown("📄 **Sources: **")
-            #     for src in sources:
-            #         st.markdown(f"- `{src}`")
-            st.session_state.messages.append({"role": "assistant", "content": answer})
+            citations = data.get("citations", [])
+            content = answer + _format_citations(citations)
+            placeholder.markdown(content)
+            st.session_state.messages.append({"role": "assistant", "content": content})
         else:
+            placeholder.empty()
             st.error(f"Error: {response.text}")
@@ -1,14 +1,25 @@
 import streamlit as st
 
 
+def _build_transcript(messages):
+    return "\n\n".join(f"{m['role'].upper()}: {m['content']}" for m in messages)
+
+
 def render_history_download():
-    if st.session_state.get("message"):
-        chat_text = "\n\n".join(
-            [f"{m['role'].upper()}: {m['content']}" for m in st.session_state.messages]
-        )
+    messages = st.session_state.get("messages")
+    if not messages:
+        return
+
+    # the transcript is only built when asked for, and reused until new
+    # messages arrive
+    cached = st.session_state.get("history_export")
+    if cached and cached[0] == len(messages):
         st.download_button(
             "Download Chat History",
-            chat_text,
+            cached[1],
             file_name="chat_history.txt",
             mime="text/plain",
         )
+    elif st.button("Prepare Chat History Download"):
+        st.session_state.history_export = (len(messages), _build_transcript(messages))
+        st.rerun()
@@ -1 +1,9 @@
-API_URL = "http://127.0.0.1:8000"
\ No newline at end of file
+API_URL = "http://127.0.0.1:8000"
+
+# HTTP client
+CONNECT_TIMEOUT = 5  # seconds to establish a connection
+TIMEOUT = 120  # seconds to wait for a response (LLM answers can be slow)
+POOL_MAXSIZE = 10  # keep-alive connections kept open to the backend
+
+# Chat history rendering
+HISTORY_PAGE_SIZE = 20  # messages rendered per page of history
@@ -1,12 +1,66 @@
+import threading
 import requests
-from config import API_URL
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import API_URL, CONNECT_TIMEOUT, TIMEOUT, POOL_MAXSIZE
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide keep-alive session, shared across Streamlit reruns."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # retry only connection failures; POSTs are not idempotent
+                retries = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.2)
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=POOL_MAXSIZE, max_retries=retries
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
 
 
 def upload_pdfs_api(files):
     files_payload = [("files", (f.name, f.read(), "application/pdf")) for f in files]
-    return requests.post(f"{API_URL}/upload_pdfs", files=files_payload)
+    return get_session().post(
+        f"{API_URL}/upload_pdfs/", files=files_payload, timeout=(CONNECT_TIMEOUT, TIMEOUT)
+    )
+
+
+def create_session_api():
+    return get_session().post(f"{API_URL}/sessions/", timeout=(CONNECT_TIMEOUT, TIMEOUT))
 
 
-def ask_question(question):
+def ask_question(question, session_id=None):
     # Backend expects form data, not JSON
-    return requests.post(f"{API_URL}/ask/", data={"question": question})
+    data = {"question": question}
+    if session_id:
+        data["session_id"] = session_id
+    return get_session().post(
+        f"{API_URL}/ask/", data=data, timeout=(CONNECT_TIMEOUT, TIMEOUT)
+    )
+
+
+async def ask_question_async(question, session_id=None, client=None):
+    """
+    Async variant of `ask_question` for scripts and notebooks.
+
+    Pass a shared `httpx.AsyncClient` to reuse its connection pool across
+    calls; otherwise a short-lived client is created for this call.
+    """
+    import httpx
+
+    data = {"question": question}
+    if session_id:
+        data["session_id"] = session_id
+    timeout = httpx.Timeout(TIMEOUT, connect=CONNECT_TIMEOUT)
+    if client is not None:
+        return await client.post(f"{API_URL}/ask/", data=data, timeout=timeout)
+    async with httpx.AsyncClient(timeout=timeout) as own_client:
+        return await own_client.post(f"{API_URL}/ask/", data=data)
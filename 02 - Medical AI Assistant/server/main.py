@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from middlewares.exception_handlers import catch_exception_middleware
 from routes.upload_pdfs import router as upload_router
 from routes.ask_question import router as ask_router
+from routes.sessions import router as sessions_router
 
 app = FastAPI(
     title="Medical Assistant API",
@@ -28,3 +29,6 @@ app.include_router(upload_router)
 
 # 2. asking query
 app.include_router(ask_router)
+
+# 3. conversation sessions
+app.include_router(sessions_router)
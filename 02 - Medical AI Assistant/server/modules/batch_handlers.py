@@ -0,0 +1,114 @@
+import asyncio
+import json
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from logger import logger
+from modules.llm import get_llm_chain
+from modules.query_handlers import query_chain
+from modules.retrieval import (
+    SimpleRetriever,
+    get_embed_model,
+    get_index,
+    matches_to_documents,
+)
+
+
+async def _retrieve_all(questions: List[str], top_k: int) -> List[list]:
+    """
+    Embed every question with a single embedding call, then run the vector
+    queries concurrently.
+
+    Returns:
+        list[list]: Pinecone matches for each question, in input order.
+    """
+    embed_model = get_embed_model()
+    vectors = await asyncio.to_thread(embed_model.embed_documents, questions)
+
+    index = get_index()
+    results = await asyncio.gather(
+        *(
+            asyncio.to_thread(
+                index.query, vector=vector, top_k=top_k, include_metadata=False
+            )
+            for vector in vectors
+        )
+    )
+    return [res["matches"] for res in results]
+
+
+async def answer_batch(
+    questions: List[str],
+    top_k: int = 3,
+    max_concurrency: int = 4,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> AsyncIterator[str]:
+    """
+    Answer a batch of questions, yielding one NDJSON line per answer as soon
+    as it is ready (not in input order; each line carries its `index`).
+
+    Questions whose retrieval returns the same chunk set share one context
+    and one chain. `max_concurrency` workers pull questions from a queue;
+    each checks `is_disconnected` before starting an LLM call and stops once
+    the client is gone. Calls already running in a thread cannot be
+    interrupted, so at most `max_concurrency` finish after a disconnect.
+    """
+    try:
+        all_matches = await _retrieve_all(questions, top_k)
+    except Exception as e:
+        # headers are already sent, so report the failure in-band
+        logger.exception("Error retrieving context for batch")
+        yield json.dumps({"error": str(e)}) + "\n"
+        return
+
+    # group questions by the set of chunks they retrieved
+    chains: Dict[Tuple[str, ...], object] = {}
+    keys: List[Tuple[str, ...]] = []
+    for matches in all_matches:
+        key = tuple(sorted(match["id"] for match in matches))
+        if key not in chains:
+            retriever = SimpleRetriever(matches_to_documents(matches))
+            chains[key] = get_llm_chain(retriever)
+        keys.append(key)
+
+    logger.info(
+        f"batch of {len(questions)} questions -> {len(chains)} distinct contexts"
+    )
+
+    pending: asyncio.Queue = asyncio.Queue()
+    for i in range(len(questions)):
+        pending.put_nowait(i)
+    answers: asyncio.Queue = asyncio.Queue()
+
+    async def answer(i: int) -> dict:
+        try:
+            result = await asyncio.to_thread(query_chain, chains[keys[i]], questions[i])
+            return {"index": i, "question": questions[i], **result}
+        except Exception as e:
+            return {"index": i, "question": questions[i], "error": str(e)}
+
+    async def worker():
+        try:
+            while not pending.empty():
+                if is_disconnected is not None and await is_disconnected():
+                    # client went away: don't keep paying for LLM calls
+                    logger.info(f"batch client disconnected, {pending.qsize()} questions skipped")
+                    break
+                await answers.put(await answer(pending.get_nowait()))
+        finally:
+            await answers.put(None)
+
+    workers = [
+        asyncio.create_task(worker())
+        for _ in range(min(max_concurrency, len(questions)))
+    ]
+    try:
+        running = len(workers)
+        while running:
+            item = await answers.get()
+            if item is None:
+                running -= 1
+                continue
+            yield json.dumps(item) + "\n"
+    finally:
+        for task in workers:
+            task.cancel()
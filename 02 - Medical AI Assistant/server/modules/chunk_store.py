@@ -0,0 +1,102 @@
+import json
+import mmap
+import os
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+CHUNK_STORE_DIR = os.getenv("CHUNK_STORE_DIR", "./chunk_store")
+
+
+class ChunkRecord(NamedTuple):
+    chunk_id: str
+    source: str
+    page: Optional[int]  # 1-based page number in the source document
+    start: int  # character span of the chunk within that page
+    end: int
+    text: str
+
+
+class _Entry(NamedTuple):
+    offset: int
+    length: int
+    source: str
+    page: Optional[int]
+    start: int
+    end: int
+
+
+class ChunkStore:
+    """
+    Local store mapping chunk ID -> document, page, character span and text.
+
+    Chunk text is appended to `chunks.bin` and read back through a memory
+    map; `chunks.idx` holds one small JSON line per chunk with its byte
+    offset and provenance. Only the index lives in process memory, so a
+    lookup is one dict access plus a slice of the mapped file. Re-ingesting
+    a chunk ID appends a new copy and the latest entry wins.
+    """
+
+    def __init__(self, directory: str = CHUNK_STORE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self._data_path = os.path.join(directory, "chunks.bin")
+        self._index_path = os.path.join(directory, "chunks.idx")
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._mmap: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+
+        open(self._data_path, "ab").close()
+        if os.path.exists(self._index_path):
+            with open(self._index_path, encoding="utf-8") as f:
+                for line in f:
+                    chunk_id, *fields = json.loads(line)
+                    self._entries[chunk_id] = _Entry(*fields)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, records: Iterable[ChunkRecord]):
+        with self._lock:
+            added: Dict[str, _Entry] = {}
+            with open(self._data_path, "ab") as data:
+                offset = data.tell()
+                for record in records:
+                    raw = record.text.encode("utf-8")
+                    data.write(raw)
+                    added[record.chunk_id] = _Entry(
+                        offset, len(raw), record.source, record.page, record.start, record.end
+                    )
+                    offset += len(raw)
+            # the text is on disk now; only then may the index (and readers) point at it
+            with open(self._index_path, "a", encoding="utf-8") as idx:
+                for chunk_id, entry in added.items():
+                    idx.write(json.dumps([chunk_id, *entry]) + "\n")
+            self._entries.update(added)
+
+    def _view(self, needed: int) -> mmap.mmap:
+        # the file only grows; remap when an entry lies past the current map
+        if self._mmap is None or needed > self._mapped_size:
+            with self._lock:
+                if self._mmap is None or needed > self._mapped_size:
+                    with open(self._data_path, "rb") as f:
+                        size = os.fstat(f.fileno()).st_size
+                        new_map = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+                    # old maps are left to the GC: readers may still hold them
+                    self._mmap, self._mapped_size = new_map, size
+        return self._mmap
+
+    def get(self, chunk_id: str) -> Optional[ChunkRecord]:
+        entry = self._entries.get(chunk_id)
+        if entry is None:
+            return None
+        view = self._view(entry.offset + entry.length)
+        text = view[entry.offset : entry.offset + entry.length].decode("utf-8")
+        return ChunkRecord(
+            chunk_id, entry.source, entry.page, entry.start, entry.end, text
+        )
+
+    def get_many(self, chunk_ids: List[str]) -> List[Optional[ChunkRecord]]:
+        return [self.get(chunk_id) for chunk_id in chunk_ids]
+
+
+chunk_store = ChunkStore()
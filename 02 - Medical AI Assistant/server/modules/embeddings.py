@@ -0,0 +1,159 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+# Which backend embeds chunks and questions: "google" (remote API) or
+# "local" (sentence-transformers on CPU). Switching providers changes the
+# vector space, so documents must be re-ingested afterwards.
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "google")
+EMBEDDING_DIMENSION = 768  # must match the Pinecone index
+LOCAL_EMBEDDING_MODEL = os.getenv(
+    "LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-mpnet-base-v2"
+)
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "64"))
+EMBEDDING_MAX_BATCH_TOKENS = int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", "8192"))
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "2"))
+
+
+class EmbeddingDimensionError(ValueError):
+    pass
+
+
+class EmbeddingProvider(Embeddings):
+    """Common interface for the embedding backends."""
+
+    name = "base"
+    dimension = EMBEDDING_DIMENSION
+
+    # embed_documents stays abstract (declared on Embeddings)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class GoogleEmbeddingProvider(EmbeddingProvider):
+    name = "google"
+    dimension = 768
+
+    def __init__(self, model: str = "models/embedding-001"):
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        self._model = GoogleGenerativeAIEmbeddings(model=model)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._model.embed_query(text)
+
+
+def plan_batches(
+    texts: List[str],
+    max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE,
+    max_batch_tokens: int = EMBEDDING_MAX_BATCH_TOKENS,
+) -> List[List[int]]:
+    """
+    Group text indices into batches of similar length.
+
+    Texts are sorted longest first so each batch pads to roughly the same
+    length, and a batch grows only while `size * longest_text_tokens` stays
+    within the token budget: short texts get big batches, long ones small.
+    """
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+    batches, current, longest = [], [], 0
+    for i in order:
+        tokens = max(1, len(texts[i]) // 4)
+        longest_if_added = max(longest, tokens)
+        if current and (
+            len(current) >= max_batch_size
+            or (len(current) + 1) * longest_if_added > max_batch_tokens
+        ):
+            batches.append(current)
+            current, longest_if_added = [], tokens
+        current.append(i)
+        longest = longest_if_added
+    if current:
+        batches.append(current)
+    return batches
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    sentence-transformers model running on CPU. No network, no quota.
+
+    Batches are encoded as whole numpy arrays and spread over a small thread
+    pool (torch releases the GIL during inference).
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        model: str = LOCAL_EMBEDDING_MODEL,
+        workers: int = EMBEDDING_WORKERS,
+    ):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        # split the cores between workers instead of oversubscribing them
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // max(1, workers)))
+        self._model = SentenceTransformer(model, device="cpu")
+        self.dimension = self._model.get_sentence_embedding_dimension()
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="embed"
+        )
+
+    def _encode(self, batch: List[str]):
+        return self._model.encode(
+            batch,
+            batch_size=len(batch),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        batches = plan_batches(texts)
+        results = self._pool.map(self._encode, [[texts[i] for i in b] for b in batches])
+
+        vectors: List[List[float]] = [None] * len(texts)
+        for batch, embedded in zip(batches, results):
+            for i, row in zip(batch, embedded.tolist()):
+                vectors[i] = row
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
+
+
+_PROVIDERS = {
+    "google": GoogleEmbeddingProvider,
+    "local": LocalEmbeddingProvider,
+}
+
+
+def check_dimension(provider: EmbeddingProvider, expected: int = EMBEDDING_DIMENSION):
+    if provider.dimension != expected:
+        raise EmbeddingDimensionError(
+            f"Embedding provider '{provider.name}' produces {provider.dimension}-d "
+            f"vectors but the index expects {expected}-d"
+        )
+
+
+@lru_cache(maxsize=1)
+def get_embedding_provider() -> EmbeddingProvider:
+    try:
+        provider_cls = _PROVIDERS[EMBEDDING_PROVIDER]
+    except KeyError:
+        raise ValueError(
+            f"Unknown EMBEDDING_PROVIDER '{EMBEDDING_PROVIDER}', "
+            f"expected one of {sorted(_PROVIDERS)}"
+        )
+    provider = provider_cls()
+    check_dimension(provider)
+    return provider
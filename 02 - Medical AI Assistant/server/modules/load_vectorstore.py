@@ -6,7 +6,12 @@ from tqdm.auto import tqdm
 from pinecone import Pinecone, ServerlessSpec
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from modules.chunk_store import ChunkRecord, chunk_store
+from modules.embeddings import (
+    EMBEDDING_DIMENSION,
+    EmbeddingDimensionError,
+    get_embedding_provider,
+)
 
 load_dotenv()
 
@@ -15,7 +20,9 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_ENV = "us-east-1"
 PINECONE_INDEX_NAME = "medicalindex"
 
-os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
+# only needed by the google embedding provider
+if GOOGLE_API_KEY:
+    os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 
 UPLOAD_DIR = "./uploaded_docs"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -29,7 +36,10 @@ existing_indexes = [i["name"] for i in pc.list_indexes()]
 
 if PINECONE_INDEX_NAME not in existing_indexes:
     pc.create_index(
-        name=PINECONE_INDEX_NAME, dimension=768, metric="dotproduct", spec=spec
+        name=PINECONE_INDEX_NAME,
+        dimension=EMBEDDING_DIMENSION,
+        metric="dotproduct",
+        spec=spec,
     )
     while not pc.describe_index(PINECONE_INDEX_NAME).status["ready"]:
         time.sleep(1)
@@ -37,11 +47,18 @@ if PINECONE_INDEX_NAME not in existing_indexes:
 
 index = pc.Index(PINECONE_INDEX_NAME)
 
+index_dimension = pc.describe_index(PINECONE_INDEX_NAME).dimension
+if index_dimension != EMBEDDING_DIMENSION:
+    raise EmbeddingDimensionError(
+        f"Pinecone index '{PINECONE_INDEX_NAME}' is {index_dimension}-d, "
+        f"expected {EMBEDDING_DIMENSION}-d"
+    )
+
 # load,split,embed and upsert pdf docs content
 
 
 def load_vectorStore(uploaded_files):
-    embed_model = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+    embed_model = get_embedding_provider()
     file_paths = []
 
     for file in uploaded_files:
@@ -54,19 +71,38 @@ def load_vectorStore(uploaded_files):
         loader = PyPDFLoader(file_path)
         documents = loader.load()
 
-        splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=500, chunk_overlap=50, add_start_index=True
+        )
         chunks = splitter.split_documents(documents)
 
         texts = [chunk.page_content for chunk in chunks]
-        metadatas = [chunk.metadata for chunk in chunks]
         ids = [f"{Path(file_path).stem}-{i}" for i in range(len(chunks))]
 
+        # provenance and text live in the local chunk store; the vectors
+        # carry only their ID
+        records = []
+        for chunk_id, chunk in zip(ids, chunks):
+            start = chunk.metadata.get("start_index", 0)
+            page = chunk.metadata.get("page")
+            records.append(
+                ChunkRecord(
+                    chunk_id=chunk_id,
+                    source=Path(file_path).name,
+                    page=page + 1 if page is not None else None,
+                    start=start,
+                    end=start + len(chunk.page_content),
+                    text=chunk.page_content,
+                )
+            )
+        chunk_store.add(records)
+
         print(f"🔍 Embedding {len(texts)} chunks...")
         embeddings = embed_model.embed_documents(texts)
 
         print("📤 Uploading to Pinecone...")
         with tqdm(total=len(embeddings), desc="Upserting to Pinecone") as progress:
-            index.upsert(vectors=zip(ids, embeddings, metadatas))
+            index.upsert(vectors=list(zip(ids, embeddings)))
             progress.update(len(embeddings))
 
         print(f"✅ Upload complete for {file_path}")
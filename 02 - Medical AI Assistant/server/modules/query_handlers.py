@@ -1,12 +1,26 @@
 from logger import logger
 
+
+def citation_for(doc) -> dict:
+    metadata = doc.metadata
+    return {
+        "chunk_id": metadata.get("chunk_id"),
+        "source": metadata.get("source", ""),
+        "page": metadata.get("page"),
+        "start": metadata.get("start"),
+        "end": metadata.get("end"),
+    }
+
+
 def query_chain(chain, user_input:str):
     try:
         logger.debug(f"Processing user input: {user_input}")
         result = chain({"query": user_input})
+        citations = [citation_for(doc) for doc in result["source_documents"]]
         response = {
             "response": result["result"],
-            "source": [doc.metadata.get("sources", "") for doc in result["source_documents"]]
+            "source": list(dict.fromkeys(c["source"] for c in citations if c["source"])),
+            "citations": citations,
         }
         logger.debug(f"Query response: {response}")
         return response
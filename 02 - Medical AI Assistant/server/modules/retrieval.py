@@ -0,0 +1,63 @@
+import os
+from functools import lru_cache
+from typing import List, Optional
+
+from langchain_core.documents import Document
+from langchain.schema import BaseRetriever
+from pinecone import Pinecone
+from pydantic import Field
+
+from modules.chunk_store import chunk_store
+from modules.embeddings import get_embedding_provider
+
+
+class SimpleRetriever(BaseRetriever):
+    """Retriever that hands back an already-fetched list of documents."""
+
+    tags: Optional[List[str]] = Field(default_factory=list)
+    metadata: Optional[dict] = Field(default_factory=dict)
+
+    def __init__(self, documents: List[Document]):
+        super().__init__()
+        self._docs = documents
+
+    def _get_relevant_documents(self, query: str) -> List[Document]:
+        return self._docs
+
+
+@lru_cache(maxsize=1)
+def get_index():
+    # one client per process instead of one per request
+    pc = Pinecone(api_key=os.environ["PINECONE_API_KEY"])
+    return pc.Index(os.environ["PINECONE_INDEX_NAME"])
+
+
+def get_embed_model():
+    return get_embedding_provider()
+
+
+def matches_to_documents(matches) -> List[Document]:
+    """
+    Resolve Pinecone matches to documents through the chunk store (one
+    dict lookup per match). Vectors ingested before the chunk store existed
+    resolve to an empty document until their PDF is uploaded again.
+    """
+    docs = []
+    for match in matches:
+        record = chunk_store.get(match["id"])
+        if record is not None:
+            docs.append(
+                Document(
+                    page_content=record.text,
+                    metadata={
+                        "chunk_id": record.chunk_id,
+                        "source": record.source,
+                        "page": record.page,
+                        "start": record.start,
+                        "end": record.end,
+                    },
+                )
+            )
+        else:
+            docs.append(Document(page_content="", metadata={"chunk_id": match["id"]}))
+    return docs
@@ -0,0 +1,203 @@
+import math
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, List, NamedTuple, Optional, Tuple
+
+from langchain_core.documents import Document
+
+# rough budget knobs; 1 token ~= 4 characters of English text
+SESSION_HISTORY_TOKENS = int(os.getenv("SESSION_HISTORY_TOKENS", "600"))
+SESSION_SUMMARY_TOKENS = int(os.getenv("SESSION_SUMMARY_TOKENS", "200"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+# cosine similarity above which a follow-up's retrieval query is treated as
+# the same topic as the previous turn, so its chunks are reused
+SESSION_REUSE_SIMILARITY = float(os.getenv("SESSION_REUSE_SIMILARITY", "0.9"))
+
+_FOLLOW_UP_MAX_WORDS = 8
+_FOLLOW_UP_WORDS = {
+    "it", "its", "it's", "they", "them", "their", "these", "those",
+}
+_FOLLOW_UP_PREFIXES = ("what about", "how about", "what else", "and what", "and how")
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _truncate_to_tokens(text: str, budget: int, keep_tail: bool = False) -> str:
+    max_chars = budget * 4
+    if len(text) <= max_chars:
+        return text
+    return text[-max_chars:] if keep_tail else text[:max_chars]
+
+
+def _first_sentence(text: str) -> str:
+    return re.split(r"(?<=[.!?])\s", text.strip(), maxsplit=1)[0]
+
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+@dataclass
+class ChatSession:
+    session_id: str
+    summary: str = ""
+    turns: Deque[Tuple[str, str]] = field(default_factory=deque)
+    last_chunk_ids: List[str] = field(default_factory=list)
+    last_documents: List[Document] = field(default_factory=list)
+    last_query_vector: Optional[List[float]] = None
+    updated_at: float = field(default_factory=time.monotonic)
+
+    def history_tokens(self) -> int:
+        return estimate_tokens(self.summary) + sum(
+            estimate_tokens(q) + estimate_tokens(a) for q, a in self.turns
+        )
+
+    def add_turn(self, question: str, answer: str):
+        """
+        Append a turn and fold the oldest turns into the rolling summary
+        until the history fits the token budget again.
+        """
+        self.turns.append((question, answer))
+        while len(self.turns) > 1 and self.history_tokens() > SESSION_HISTORY_TOKENS:
+            old_q, old_a = self.turns.popleft()
+            line = f"Q: {old_q} A: {_first_sentence(old_a)}"
+            self.summary = _truncate_to_tokens(
+                f"{self.summary}\n{line}".strip(), SESSION_SUMMARY_TOKENS, keep_tail=True
+            )
+        self.updated_at = time.monotonic()
+
+    def remember_context(
+        self,
+        chunk_ids: List[str],
+        documents: List[Document],
+        query_vector: Optional[List[float]] = None,
+    ):
+        self.last_chunk_ids = list(chunk_ids)
+        self.last_documents = list(documents)
+        if query_vector is not None:
+            self.last_query_vector = list(query_vector)
+
+    def same_topic(self, question_vector: List[float]) -> bool:
+        """True when a question embeds close to the query that retrieved the last chunks."""
+        if self.last_query_vector is None or not self.last_documents:
+            return False
+        return (
+            cosine_similarity(question_vector, self.last_query_vector)
+            >= SESSION_REUSE_SIMILARITY
+        )
+
+    def render_history(self) -> str:
+        parts = []
+        if self.summary:
+            parts.append(f"Earlier in the conversation:\n{self.summary}")
+        for q, a in self.turns:
+            parts.append(f"User: {q}\nAssistant: {a}")
+        return "\n\n".join(parts)
+
+    def is_follow_up(self, question: str) -> bool:
+        """
+        Cheap heuristic: a short question that opens with "what about" and
+        the like or refers back with a pronoun. Only decides how to build
+        the retrieval query; it never skips retrieval on its own.
+        """
+        if not self.turns:
+            return False
+        lowered = question.lower().strip()
+        words = re.findall(r"[a-z']+", lowered)
+        if len(words) > _FOLLOW_UP_MAX_WORDS:
+            return False
+        return lowered.startswith(_FOLLOW_UP_PREFIXES) or any(
+            w in _FOLLOW_UP_WORDS for w in words
+        )
+
+    def condensed_query(self, question: str) -> str:
+        """
+        Retrieval query for a follow-up: the last user question plus the new
+        one, so pronouns have something to resolve against. No LLM call.
+        """
+        if not self.turns:
+            return question
+        last_question = self.turns[-1][0]
+        return _truncate_to_tokens(f"{last_question} {question}", 128)
+
+
+class RetrievalPlan(NamedTuple):
+    mode: str  # "fresh", "condensed" or "reused"
+    query_vector: Optional[List[float]]  # vector search input; None when reused
+
+
+def plan_retrieval(
+    session: Optional[ChatSession],
+    question: str,
+    embed_query: Callable[[str], List[float]],
+    reuse_context: bool = False,
+) -> RetrievalPlan:
+    """
+    Decide how to get context for `question`.
+
+    A follow-up reuses the previous turn's chunks when the caller opts in
+    (no embedding call) or when the question on its own embeds close to the
+    query those chunks were retrieved with. The condensed query is not used
+    for that check: it repeats the previous question, so it lands near it
+    even when the topic changed. Otherwise the follow-up is searched with
+    the condensed query.
+    """
+    follow_up = session is not None and session.is_follow_up(question)
+    if follow_up and reuse_context and session.last_documents:
+        return RetrievalPlan("reused", None)
+    question_vector = embed_query(question)
+    if not follow_up:
+        return RetrievalPlan("fresh", question_vector)
+    if session.same_topic(question_vector):
+        return RetrievalPlan("reused", None)
+    return RetrievalPlan("condensed", embed_query(session.condensed_query(question)))
+
+
+class SessionStore:
+    """In-process session store with TTL and LRU eviction."""
+
+    def __init__(
+        self,
+        ttl_seconds: int = SESSION_TTL_SECONDS,
+        max_sessions: int = SESSION_MAX_SESSIONS,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self) -> ChatSession:
+        session = ChatSession(session_id=uuid.uuid4().hex)
+        with self._lock:
+            self._sessions[session.session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if time.monotonic() - session.updated_at > self.ttl_seconds:
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+
+session_store = SessionStore()
@@ -1,53 +1,77 @@
-from fastapi import APIRouter, Form
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Form, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from modules.llm import get_llm_chain
 from modules.query_handlers import query_chain
-from langchain_core.documents import Document
-from langchain.schema import BaseRetriever
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from pinecone import Pinecone
-from pydantic import Field
+from modules.retrieval import (
+    SimpleRetriever,
+    get_embed_model,
+    get_index,
+    matches_to_documents,
+)
+from modules.batch_handlers import answer_batch
+from modules.sessions import plan_retrieval, session_store
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from logger import logger
-import os
 
 router = APIRouter()
 
+MAX_BATCH_QUESTIONS = 500
+
+
+class BatchAskRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_QUESTIONS)
+    top_k: int = Field(3, ge=1, le=20)
+    max_concurrency: int = Field(4, ge=1, le=32)
+
 
 @router.post("/ask/")
-async def ask_question(question: str = Form(...)):
+async def ask_question(
+    question: str = Form(...),
+    session_id: Optional[str] = Form(None),
+    reuse_context: bool = Form(False),
+):
     try:
         logger.info(f"user query: {question}")
 
-        # Embed model + Pinecone setup
-        pc = Pinecone(api_key=os.environ["PINECONE_API_KEY"])
-        index = pc.Index(os.environ["PINECONE_INDEX_NAME"])
-        embed_model = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-        embedded_query = embed_model.embed_query(question)
-        res = index.query(vector=embedded_query, top_k=3, include_metadata=True)
-
-        docs = [
-            Document(
-                page_content=match["metadata"].get("text", ""),
-                metadata=match["metadata"],
-            )
-            for match in res["matches"]
-        ]
+        session = None
+        if session_id:
+            session = session_store.get(session_id)
+            if session is None:
+                return JSONResponse(
+                    status_code=404, content={"error": "Unknown or expired session"}
+                )
 
-        class SimpleRetriever(BaseRetriever):
-            tags: Optional[List[str]] = Field(default_factory=list)
-            metadata: Optional[dict] = Field(default_factory=dict)
+        plan = plan_retrieval(
+            session, question, lambda text: get_embed_model().embed_query(text), reuse_context
+        )
+        retrieval = plan.mode
 
-            def __init__(self, documents: List[Document]):
-                super().__init__()
-                self._docs = documents
+        if plan.query_vector is None:
+            # same topic as the previous turn: skip the vector search
+            chunk_ids = session.last_chunk_ids
+            docs = session.last_documents
+        else:
+            index = get_index()
+            res = index.query(vector=plan.query_vector, top_k=3, include_metadata=False)
 
-            def _get_relevant_documents(self, query: str) -> List[Document]:
-                return self._docs
+            chunk_ids = [match["id"] for match in res["matches"]]
+            docs = matches_to_documents(res["matches"])
+
+        llm_question = question
+        if session is not None and session.turns:
+            llm_question = (
+                f"{session.render_history()}\n\nFollow-up question: {question}"
+            )
 
         retriever = SimpleRetriever(docs)
         chain = get_llm_chain(retriever)
-        result = query_chain(chain, question)
+        result = query_chain(chain, llm_question)
+
+        if session is not None:
+            session.add_turn(question, result["response"])
+            session.remember_context(chunk_ids, docs, plan.query_vector)
+            result = {**result, "session_id": session.session_id, "retrieval": retrieval}
 
         logger.info("query successful")
         return result
@@ -55,3 +79,17 @@ async def ask_question(question: str = Form(...)):
     except Exception as e:
         logger.exception("Error processing question")
         return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@router.post("/ask/batch/")
+async def ask_batch(request: BatchAskRequest, http_request: Request):
+    logger.info(f"batch query: {len(request.questions)} questions")
+    return StreamingResponse(
+        answer_batch(
+            request.questions,
+            top_k=request.top_k,
+            max_concurrency=request.max_concurrency,
+            is_disconnected=http_request.is_disconnected,
+        ),
+        media_type="application/x-ndjson",
+    )
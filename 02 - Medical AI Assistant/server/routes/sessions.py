@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from modules.sessions import session_store
+from logger import logger
+
+router = APIRouter()
+
+
+@router.post("/sessions/")
+async def create_session():
+    session = session_store.create()
+    logger.info(f"session created: {session.session_id}")
+    return {"session_id": session.session_id}
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if not session_store.delete(session_id):
+        return JSONResponse(status_code=404, content={"error": "Unknown session"})
+    return {"message": "Session deleted"}
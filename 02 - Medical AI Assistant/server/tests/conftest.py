@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The server runs from server/, importing `modules...` as top-level packages
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,60 @@
+from langchain_core.documents import Document
+
+from modules.sessions import ChatSession, plan_retrieval
+
+DIABETES_WORDS = {"metformin", "diabetes", "glucose", "insulin"}
+ASTHMA_WORDS = {"asthma", "inhaler", "wheezing"}
+
+
+def embed(text: str):
+    """Two-topic stand-in for an embedding model"""
+    words = [word.strip("?,.").lower() for word in text.split()]
+    return [
+        float(sum(word in DIABETES_WORDS for word in words)),
+        float(sum(word in ASTHMA_WORDS for word in words)),
+    ]
+
+
+def session_after(question: str) -> ChatSession:
+    session = ChatSession(session_id="test")
+    session.add_turn(question, "An answer.")
+    session.remember_context(["chunk-1"], [Document(page_content="...")], embed(question))
+    return session
+
+
+class TestPlanRetrieval:
+    def test_pronoun_question_changing_topic_is_searched(self):
+        session = session_after("Is metformin the first diabetes drug for type 2 diabetes?")
+        question = "What about asthma, how is it treated?"
+
+        plan = plan_retrieval(session, question, embed)
+
+        assert session.is_follow_up(question)
+        # The condensed query repeats the previous question, so it alone would pass
+        assert session.same_topic(embed(session.condensed_query(question)))
+        assert plan.mode == "condensed"
+        assert plan.query_vector == embed(session.condensed_query(question))
+
+    def test_same_topic_follow_up_reuses_chunks(self):
+        session = session_after("Is metformin the first diabetes drug for type 2 diabetes?")
+
+        plan = plan_retrieval(session, "What about its effect on glucose?", embed)
+
+        assert plan == ("reused", None)
+
+    def test_reuse_on_request_skips_embedding(self):
+        session = session_after("Is metformin the first diabetes drug for type 2 diabetes?")
+
+        def no_embedding(text):
+            raise AssertionError("embedded despite reuse_context")
+
+        plan = plan_retrieval(session, "What about asthma, how is it treated?", no_embedding, reuse_context=True)
+
+        assert plan.mode == "reused"
+
+    def test_new_question_is_fresh(self):
+        session = session_after("Is metformin the first diabetes drug for type 2 diabetes?")
+
+        plan = plan_retrieval(session, "Which inhaler is best for asthma in adults over sixty?", embed)
+
+        assert plan.mode == "fresh"
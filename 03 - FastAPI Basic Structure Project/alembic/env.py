@@ -1,7 +1,9 @@
 from logging.config import fileConfig
 from sqlalchemy import engine_from_config
+from sqlalchemy import event
 from sqlalchemy import pool
 from alembic import context
+from alembic.migration import MigrationContext
 import os
 import sys
 
@@ -11,6 +13,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 # Import our models
 from app.database import Base
 from app.models.user import User  # Import all models here
+from app.core.online_migrations import PROGRESS_TABLE, dry_run_requested
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -34,12 +37,29 @@ def get_database_url():
     return os.getenv("DATABASE_URL", "sqlite:///./fastapi.db")
 
 
+def include_name(name, type_, parent_names):
+    """Keep autogenerate from proposing to drop the backfill checkpoint table"""
+    return not (type_ == "table" and name == PROGRESS_TABLE)
+
+
+def enable_sqlite_transactional_ddl(engine) -> None:
+    """Let pysqlite run DDL inside a transaction, so a dry run can roll it back"""
+    @event.listens_for(engine, "connect")
+    def do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
     url = get_database_url()
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -59,13 +79,46 @@ def run_migrations_online() -> None:
         poolclass=pool.NullPool,
     )
 
+    # `alembic -x dry_run=true upgrade head`: migrations run in SQL mode, so
+    # every op (create_index, add_column, ...) is printed instead of
+    # executed and takes no locks. The connection stays open for the online
+    # migration helpers' estimates, whose sampling is rolled back at the end.
+    dry_run = dry_run_requested()
+    if dry_run and connectable.dialect.name == "sqlite":
+        enable_sqlite_transactional_ddl(connectable)
+
     with connectable.connect() as connection:
+        # Begun before configure(), so Alembic treats it as the caller's
+        # transaction and never commits it
+        transaction = connection.begin() if dry_run else None
+        dry_run_options = {}
+        if dry_run:
+            # SQL mode cannot read the version table, so start from what is applied
+            current_heads = MigrationContext.configure(connection).get_current_heads()
+            dry_run_options = {
+                "as_sql": True,
+                "starting_rev": list(current_heads) or None,
+                "dry_run_connection": connection,
+            }
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
+            # Each migration commits on its own, so an autocommit block
+            # (CREATE INDEX CONCURRENTLY, batched backfills) only commits
+            # the migration it is in
+            transaction_per_migration=True,
+            **dry_run_options,
         )
 
-        with context.begin_transaction():
-            context.run_migrations()
+        if dry_run:
+            try:
+                context.run_migrations()
+            finally:
+                transaction.rollback()
+        else:
+            with context.begin_transaction():
+                context.run_migrations()
 
 
 if context.is_offline_mode():
@@ -0,0 +1,24 @@
+"""Add (created_at, id) index for keyset pagination
+
+Revision ID: 8c1d2e4f6a10
+Revises: 27fee46f1e10
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1d2e4f6a10'
+down_revision = '27fee46f1e10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_created_at_id', table_name='users')
@@ -0,0 +1,39 @@
+"""Add user search indexes (FTS5 on SQLite, tsvector and trigram GIN on PostgreSQL)
+
+Revision ID: b7e3a9d5c2f4
+Revises: 8c1d2e4f6a10
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+
+from app.core.search import POSTGRES_DDL, POSTGRES_DROP, SQLITE_DDL, SQLITE_DROP, SQLITE_REBUILD
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3a9d5c2f4'
+down_revision = '8c1d2e4f6a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_DDL:
+            op.execute(statement)
+        # Index the rows that already exist
+        op.execute(SQLITE_REBUILD)
+    elif dialect == 'postgresql':
+        for statement in POSTGRES_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_DROP:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        for statement in POSTGRES_DROP:
+            op.execute(statement)
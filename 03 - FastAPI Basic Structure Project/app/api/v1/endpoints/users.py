@@ -1,45 +1,138 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+import json
+import time
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
+from jose import JWTError
 
-from ....database import get_db
-from ....schemas.user import User, UserCreate, UserUpdate, UserList, Token
-from ....services.user_service import user_service
-from ....core.security import create_access_token
+from ....database import get_async_db, get_async_sessionmaker
+from ....schemas.user import (
+    User, UserCreate, UserUpdate, UserList, UserSearchResults, Token, RefreshTokenRequest, BulkImportResult, USER_FIELDS
+)
+from ....services.user_service import async_user_service
+from ....core.security import create_access_token, create_refresh_token, decode_refresh_token
+from ....core.auth_cache import revocation_store, token_cache
 from ....core.exceptions import NotFoundException, ConflictException, AuthenticationException
-from ....dependencies import get_current_active_user
-from ....config import ACCESS_TOKEN_EXPIRE_MINUTES
+from ....dependencies import get_current_active_user, get_token_payload, load_principal, security
+from ....core.response_cache import cache_response
+from ....core.rate_limit import (
+    rate_limiter, auth_concurrency, client_ip, LOGIN_IP_RULE, LOGIN_ACCOUNT_RULE, REGISTER_IP_RULE
+)
+from ....core.db_routing import route_for
+from ....core.fields import fields_variant, parse_fields, slim_model
+from ....core.http_cache import make_etag, is_not_modified, has_validators, set_cache_headers, not_modified
+from ....config import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    BULK_IMPORT_BATCH_SIZE,
+    EXPORT_BATCH_SIZE,
+    CACHE_CONTROL_USER,
+    CACHE_CONTROL_ME,
+    CACHE_CONTROL_USER_LIST,
+    SEARCH_MAX_OFFSET,
+)
+from ....utils.bulk_io import CSV_TYPES, NDJSON_TYPES, iter_csv_rows, iter_ndjson_rows, to_csv_line
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def user_response(user, status_code: int = status.HTTP_200_OK, fields=USER_FIELDS) -> ORJSONResponse:
+    """Serialize a stored user straight to JSON
+    
+    Rows coming out of the database were validated on the way in, so
+    running them back through the User schema (response_model) is skipped.
+    response_model is kept on the routes for the OpenAPI schema.
+    """
+    return ORJSONResponse({field: getattr(user, field) for field in fields}, status_code=status_code)
+
+
+async def user_fields(
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return, e.g. id,username (id is always included)"
+    )
+) -> tuple:
+    """Dependency: the User fields selected by `?fields=` (all by default)"""
+    return parse_fields(fields, USER_FIELDS)
+
+
+def issue_tokens(email: str, family: Optional[str] = None) -> dict:
+    """Access token plus a refresh token (continuing `family` when rotating)"""
+    access_token = create_access_token(
+        data={"sub": email}, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {
+        "access_token": access_token,
+        "refresh_token": create_refresh_token(email, family=family),
+        "token_type": "bearer",
+    }
+
+
+def family_expiry() -> float:
+    """When a refresh token family revoked now can be forgotten
+    
+    The newest token in the family may have been issued just now, so the
+    family stays revoked for a full refresh lifetime, not until the
+    expiry of whichever (possibly older) token was presented.
+    """
+    return time.time() + REFRESH_TOKEN_EXPIRE_DAYS * 86400
+
+
+def require_superuser(current_user: User = Depends(get_current_active_user)) -> User:
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return current_user
+
 
 @router.post("/register", response_model=User, status_code=status.HTTP_201_CREATED)
-def register_user(
+async def register_user(
     user_in: UserCreate,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Register a new user"""
+    """Register a new user
+    
+    Rate limited per client IP (429), and shed with 503 while too many
+    password operations are already in progress.
+    """
+    await rate_limiter.check(REGISTER_IP_RULE, client_ip(request))
+    # The new account's first reads should not miss it on a lagging replica
+    await route_for(user_in.email)
     try:
-        user = user_service.create(db=db, user_in=user_in)
-        return user
+        async with auth_concurrency:
+            user = await async_user_service.create(db=db, user_in=user_in)
+        return user_response(user, status_code=status.HTTP_201_CREATED)
     except ConflictException as e:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
 
 @router.post("/login", response_model=Token)
-def login_user(
+async def login_user(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Login user and return access token"""
-    user = user_service.authenticate(
-        db=db, 
-        email=form_data.username,  # OAuth2 uses 'username' field for email
-        password=form_data.password
-    )
+    """Login user and return access and refresh tokens
+    
+    Rate limited per client IP and per account (429), and shed with 503
+    while too many password operations are already in progress.
+    """
+    await rate_limiter.check(LOGIN_IP_RULE, client_ip(request))
+    await rate_limiter.check(LOGIN_ACCOUNT_RULE, form_data.username.strip().lower())
+    async with auth_concurrency:
+        user = await async_user_service.authenticate(
+            db=db, 
+            email=form_data.username,  # OAuth2 uses 'username' field for email
+            password=form_data.password
+        )
     
     if not user:
         raise HTTPException(
@@ -54,77 +147,259 @@ def login_user(
             detail="Inactive user"
         )
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+    return issue_tokens(user.email)
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_tokens(
+    body: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Exchange a refresh token for a new access and refresh token
+    
+    Each refresh token works once. Presenting one that was already used
+    revokes every token rotated from the same login.
+    """
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
     )
+    try:
+        claims = decode_refresh_token(body.refresh_token)
+    except JWTError:
+        raise invalid
+    
+    if await revocation_store.is_revoked(claims["fam"]):
+        raise invalid
+    # Claiming the token id is atomic, so concurrent reuse is detected too
+    if not await revocation_store.revoke(claims["jti"], claims["exp"]):
+        await revocation_store.revoke(claims["fam"], family_expiry())
+        raise invalid
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    user = await load_principal(db, claims["sub"])
+    if user is None or not user.is_active:
+        raise invalid
+    return issue_tokens(user.email, family=claims["fam"])
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_user(
+    body: Optional[RefreshTokenRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    payload: dict = Depends(get_token_payload)
+):
+    """Revoke the current access token and, if given, its refresh token chain"""
+    if payload.get("jti"):
+        await revocation_store.revoke(payload["jti"], payload["exp"])
+    token_cache.forget(credentials.credentials)
+    if body is not None:
+        try:
+            claims = decode_refresh_token(body.refresh_token)
+        except JWTError:
+            claims = None
+        if claims is not None and claims["sub"] == payload["sub"]:
+            await revocation_store.revoke(claims["fam"], family_expiry())
 
 
 @router.get("/me", response_model=User)
-def read_current_user(
+async def read_current_user(
+    request: Request,
+    fields: tuple = Depends(user_fields),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get current user information"""
-    return current_user
+    etag = make_etag(current_user.id, current_user.updated_at, fields_variant(fields, USER_FIELDS))
+    if is_not_modified(request, etag, current_user.updated_at):
+        return not_modified(etag, current_user.updated_at, CACHE_CONTROL_ME)
+    response = user_response(current_user, fields=fields)
+    return set_cache_headers(response, etag, current_user.updated_at, CACHE_CONTROL_ME)
 
 
 @router.put("/me", response_model=User)
-def update_current_user(
+async def update_current_user(
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Update current user information"""
     try:
-        user = user_service.update(db=db, db_user=current_user, user_in=user_update)
-        return user
+        user = await async_user_service.update(db=db, db_user=current_user, user_in=user_update)
+        return user_response(user)
     except ConflictException as e:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
 
 @router.get("/", response_model=UserList)
-def read_users(
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+@cache_response(tags=lambda **_: [async_user_service.cache_tag], vary_on_user=False)
+async def read_users(
+    request: Request,
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    order: str = Query("id", pattern="^(id|created_at)$", description="Sort key for cursor pagination"),
+    exact_total: bool = Query(False, description="Run an exact COUNT instead of an estimate"),
+    skip: int = Query(0, ge=0, description="Deprecated offset pagination; prefer cursor"),
+    fields: tuple = Depends(user_fields),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get list of users with pagination"""
-    users = user_service.get_multi(db=db, skip=skip, limit=limit)
-    total = user_service.count(db=db)
-    
-    return UserList(
-        users=users,
-        total=total,
-        page=skip // limit + 1,
-        per_page=limit,
-        pages=(total + limit - 1) // limit
+    """Get list of users with cursor pagination
+    
+    `?fields=` narrows both the SELECT and the response to those columns.
+    """
+    if skip and not cursor:
+        users = await async_user_service.get_multi(db=db, skip=skip, limit=limit, fields=fields)
+        users = [{field: getattr(user, field) for field in fields} for user in users]
+        next_cursor = None
+        page = skip // limit + 1
+    else:
+        # Only the response columns, as plain rows
+        result = await async_user_service.get_page_rows(
+            db=db, fields=fields, limit=limit, cursor=cursor, order=order
+        )
+        users, next_cursor = result.items, result.next_cursor
+        page = None if cursor else 1
+    
+    if exact_total:
+        total = await async_user_service.count(db=db)
+    else:
+        total = await async_user_service.count_estimate(db=db)
+    
+    response = ORJSONResponse({
+        "users": users,
+        "total": total,
+        "page": page,
+        "per_page": limit,
+        "pages": (total + limit - 1) // limit,
+        "next_cursor": next_cursor,
+        "total_exact": exact_total
+    })
+    response.headers["Cache-Control"] = CACHE_CONTROL_USER_LIST
+    return response
+
+
+@router.get("/search", response_model=UserSearchResults)
+@cache_response(tags=lambda **_: [async_user_service.cache_tag], vary_on_user=False)
+async def search_users(
+    request: Request,
+    q: str = Query(..., min_length=2, max_length=200, description="Words or word prefixes to find"),
+    limit: int = Query(20, ge=1, le=100, description="Number of results to return"),
+    offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET, description="Results to skip"),
+    fields: tuple = Depends(user_fields),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Search users by username, email, full name and bio
+    
+    Every word must match the start of a word in one of those fields
+    (`ali smi` finds "Alice Smith"); best matches come first. Served from
+    the full-text indexes rather than a table scan.
+    """
+    users, next_offset = await async_user_service.search_rows(
+        db=db, q=q, fields=fields, limit=limit, offset=offset
+    )
+    response = ORJSONResponse({"users": users, "limit": limit, "offset": offset, "next_offset": next_offset})
+    response.headers["Cache-Control"] = CACHE_CONTROL_USER_LIST
+    return response
+
+
+@router.post("/import", response_model=BulkImportResult)
+async def import_users(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_superuser)
+):
+    """Bulk create users from a streamed CSV or NDJSON body (admin only)"""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in CSV_TYPES:
+        rows = iter_csv_rows(request.stream())
+    elif content_type in NDJSON_TYPES:
+        rows = iter_ndjson_rows(request.stream())
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson"
+        )
+    
+    created, errors = await async_user_service.import_rows(
+        db=db, rows=rows, batch_size=BULK_IMPORT_BATCH_SIZE
+    )
+    return BulkImportResult(created=created, failed=len(errors), errors=errors)
+
+
+@router.get("/export")
+async def export_users(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Output format"),
+    fields: tuple = Depends(user_fields),
+    session_factory=Depends(get_async_sessionmaker),
+    current_user: User = Depends(require_superuser)
+):
+    """Stream every user as NDJSON or CSV (admin only)"""
+    schema = slim_model(User, fields)
+    
+    async def generate():
+        # The response outlives the request's dependencies, so it owns its session
+        async with session_factory() as db:
+            if format == "csv":
+                yield to_csv_line(fields)
+            async for users in async_user_service.stream_all(db, batch_size=EXPORT_BATCH_SIZE, fields=fields):
+                lines = []
+                for user in users:
+                    data = schema.model_validate(user).model_dump(mode="json")
+                    if format == "csv":
+                        lines.append(to_csv_line(data[field] for field in fields))
+                    else:
+                        lines.append(json.dumps(data) + "\n")
+                yield "".join(lines)
+    
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'}
     )
 
 
 @router.get("/{user_id}", response_model=User)
-def read_user(
+@cache_response(tags=lambda user_id, **_: [async_user_service.record_cache_tag(user_id)], vary_on_user=False)
+async def read_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    fields: tuple = Depends(user_fields),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get user by ID"""
-    user = user_service.get(db=db, id=user_id)
+    """Get user by ID
+    
+    Conditional requests are answered from the row version alone; the
+    full row is only loaded when the client's copy is stale. `?fields=`
+    narrows the SELECT and the response to those columns.
+    """
+    variant = fields_variant(fields, USER_FIELDS)
+    if has_validators(request):
+        version = await async_user_service.get_version(db=db, id=user_id)
+        if version is not None:
+            etag = make_etag(user_id, version.updated_at, variant)
+            if is_not_modified(request, etag, version.updated_at):
+                return not_modified(etag, version.updated_at, CACHE_CONTROL_USER)
+    
+    # updated_at is needed for the validators even when not requested
+    columns = fields if "updated_at" in fields else fields + ("updated_at",)
+    user = await async_user_service.get_row(db=db, id=user_id, fields=columns)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return user
+    updated_at = user["updated_at"] if "updated_at" in fields else user.pop("updated_at")
+    etag = make_etag(user_id, updated_at, variant)
+    return set_cache_headers(ORJSONResponse(user), etag, updated_at, CACHE_CONTROL_USER)
 
 
 @router.put("/{user_id}", response_model=User)
-def update_user(
+async def update_user(
     user_id: int,
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Update user by ID (admin only)"""
@@ -135,7 +410,7 @@ def update_user(
             detail="Not enough permissions"
         )
     
-    user = user_service.get(db=db, id=user_id)
+    user = await async_user_service.get(db=db, id=user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -143,16 +418,16 @@ def update_user(
         )
     
     try:
-        user = user_service.update(db=db, db_user=user, user_in=user_update)
-        return user
+        user = await async_user_service.update(db=db, db_user=user, user_in=user_update)
+        return user_response(user)
     except ConflictException as e:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
 
 @router.delete("/{user_id}", response_model=User)
-def deactivate_user(
+async def deactivate_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Deactivate user by ID (admin only)"""
@@ -163,8 +438,8 @@ def deactivate_user(
         )
     
     try:
-        user = user_service.deactivate_user(db=db, user_id=user_id)
-        return user
+        user = await async_user_service.deactivate_user(db=db, user_id=user_id)
+        return user_response(user)
     except NotFoundException as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
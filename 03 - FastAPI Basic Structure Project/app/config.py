@@ -3,10 +3,114 @@ from decouple import config
 # Database
 DATABASE_URL = config("DATABASE_URL", default="sqlite:///./test.db")
 
+# Connection pool (per engine, per worker process)
+DB_POOL_SIZE = config("DB_POOL_SIZE", default=5, cast=int)
+DB_MAX_OVERFLOW = config("DB_MAX_OVERFLOW", default=10, cast=int)
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=30, cast=float)
+DB_POOL_RECYCLE = config("DB_POOL_RECYCLE", default=1800, cast=int)
+DB_POOL_PRE_PING = config("DB_POOL_PRE_PING", default=False, cast=bool)
+
+# Read replica (empty = all queries go to DATABASE_URL); reads are sent to
+# the primary for REPLICA_STICKY_SECONDS after the same user writes
+DATABASE_REPLICA_URL = config("DATABASE_REPLICA_URL", default="")
+REPLICA_STICKY_SECONDS = config("REPLICA_STICKY_SECONDS", default=5, cast=float)
+REPLICA_STICKY_SIZE = config("REPLICA_STICKY_SIZE", default=100000, cast=int)
+
 # Security
 SECRET_KEY = config("SECRET_KEY", default="your-secret-key-here")
 ALGORITHM = config("ALGORITHM", default="HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = config("ACCESS_TOKEN_EXPIRE_MINUTES", default=30, cast=int)
+REFRESH_TOKEN_EXPIRE_DAYS = config("REFRESH_TOKEN_EXPIRE_DAYS", default=14, cast=int)
+
+# Password hashing
+BCRYPT_ROUNDS = config("BCRYPT_ROUNDS", default=12, cast=int)
+HASH_WORKERS = config("HASH_WORKERS", default=0, cast=int)  # 0 = one process per CPU
+HASH_MAX_PENDING = config("HASH_MAX_PENDING", default=0, cast=int)  # 0 = 8 per worker
+
+# Redis (optional shared cache tier; empty disables it)
+REDIS_URL = config("REDIS_URL", default="")
+
+# Authenticated principal and verified token caches
+PRINCIPAL_CACHE_TTL = config("PRINCIPAL_CACHE_TTL", default=60, cast=int)
+PRINCIPAL_CACHE_LOCAL_TTL = config("PRINCIPAL_CACHE_LOCAL_TTL", default=5, cast=int)
+PRINCIPAL_CACHE_SIZE = config("PRINCIPAL_CACHE_SIZE", default=10000, cast=int)
+TOKEN_CACHE_SIZE = config("TOKEN_CACHE_SIZE", default=10000, cast=int)
+
+# Revoked token ids (jti); shared through REDIS_URL when set. Without it a
+# logout only applies on the worker that handled it, so run several workers
+# only with REDIS_URL
+REVOCATION_LOCAL_SIZE = config("REVOCATION_LOCAL_SIZE", default=100000, cast=int)
+REVOCATION_LOCAL_TTL = config("REVOCATION_LOCAL_TTL", default=5, cast=int)  # seconds a "not revoked" answer is reused
+
+# Seconds an exact table count is reused for approximate list totals
+COUNT_CACHE_TTL = config("COUNT_CACHE_TTL", default=30, cast=int)
+
+# User search (terms per query beyond this are ignored; deepest offset served)
+SEARCH_MAX_TERMS = config("SEARCH_MAX_TERMS", default=8, cast=int)
+SEARCH_MAX_OFFSET = config("SEARCH_MAX_OFFSET", default=1000, cast=int)
+
+# Bulk import/export (rows per batch)
+BULK_IMPORT_BATCH_SIZE = config("BULK_IMPORT_BATCH_SIZE", default=500, cast=int)
+EXPORT_BATCH_SIZE = config("EXPORT_BATCH_SIZE", default=1000, cast=int)
+
+# Response cache (Redis backend when REDIS_URL is set, otherwise in-process)
+# The in-process backend only sees its own worker's invalidations, so with
+# several workers and no REDIS_URL the cache is switched off at startup;
+# RESPONSE_CACHE_ALLOW_LOCAL=True keeps it on, serving stale entries for up to
+# RESPONSE_CACHE_TTL seconds after a write handled by another worker
+RESPONSE_CACHE_ENABLED = config("RESPONSE_CACHE_ENABLED", default=True, cast=bool)
+RESPONSE_CACHE_ALLOW_LOCAL = config("RESPONSE_CACHE_ALLOW_LOCAL", default=False, cast=bool)
+RESPONSE_CACHE_TTL = config("RESPONSE_CACHE_TTL", default=30, cast=int)
+RESPONSE_CACHE_SIZE = config("RESPONSE_CACHE_SIZE", default=1000, cast=int)
+RESPONSE_CACHE_LOCK_TIMEOUT = config("RESPONSE_CACHE_LOCK_TIMEOUT", default=5, cast=float)
+
+# HTTP caching (Cache-Control per route)
+CACHE_CONTROL_USER = config("CACHE_CONTROL_USER", default="private, no-cache")
+CACHE_CONTROL_ME = config("CACHE_CONTROL_ME", default="private, no-cache")
+CACHE_CONTROL_USER_LIST = config("CACHE_CONTROL_USER_LIST", default="private, no-store")
+
+# Rate limiting and admission control for /login and /register
+# (Redis-backed when REDIS_URL is set, otherwise per worker process)
+RATE_LIMIT_ENABLED = config("RATE_LIMIT_ENABLED", default=True, cast=bool)
+RATE_LIMIT_KEYS = config("RATE_LIMIT_KEYS", default=100000, cast=int)  # in-process keys tracked
+RATE_LIMIT_LOGIN_IP_PER_MINUTE = config("RATE_LIMIT_LOGIN_IP_PER_MINUTE", default=30, cast=int)
+RATE_LIMIT_LOGIN_IP_BURST = config("RATE_LIMIT_LOGIN_IP_BURST", default=10, cast=int)
+RATE_LIMIT_LOGIN_ACCOUNT = config("RATE_LIMIT_LOGIN_ACCOUNT", default=10, cast=int)
+RATE_LIMIT_LOGIN_ACCOUNT_WINDOW = config("RATE_LIMIT_LOGIN_ACCOUNT_WINDOW", default=300, cast=int)
+RATE_LIMIT_REGISTER_IP = config("RATE_LIMIT_REGISTER_IP", default=20, cast=int)
+RATE_LIMIT_REGISTER_IP_WINDOW = config("RATE_LIMIT_REGISTER_IP_WINDOW", default=3600, cast=int)
+AUTH_MAX_CONCURRENT = config("AUTH_MAX_CONCURRENT", default=0, cast=int)  # 0 = half the hashing queue bound
+
+# Request instrumentation (access log sampling; 5xx and slow requests are always logged)
+ACCESS_LOG_SAMPLE_RATE = config("ACCESS_LOG_SAMPLE_RATE", default=0.01, cast=float)
+ACCESS_LOG_SLOW_MS = config("ACCESS_LOG_SLOW_MS", default=1000, cast=float)
+
+# Response compression (gzip always; br and zstd when the brotli / zstandard packages are installed)
+COMPRESSION_ENABLED = config("COMPRESSION_ENABLED", default=True, cast=bool)
+COMPRESSION_MIN_SIZE = config("COMPRESSION_MIN_SIZE", default=1024, cast=int)  # bytes
+COMPRESSION_GZIP_LEVEL = config("COMPRESSION_GZIP_LEVEL", default=6, cast=int)  # 1-9
+COMPRESSION_BROTLI_QUALITY = config("COMPRESSION_BROTLI_QUALITY", default=4, cast=int)  # 0-11
+COMPRESSION_ZSTD_LEVEL = config("COMPRESSION_ZSTD_LEVEL", default=3, cast=int)  # 1-22
+# Per-route overrides by path prefix: "/prefix:gzip=1,br=1;/other:gzip=9"
+COMPRESSION_ROUTE_LEVELS = config("COMPRESSION_ROUTE_LEVELS", default="/api/v1/users/export:gzip=1,br=1,zstd=1")
+
+# Online migrations (batched backfills in app/core/online_migrations.py)
+BACKFILL_BATCH_SIZE = config("BACKFILL_BATCH_SIZE", default=1000, cast=int)  # rows per committed batch
+BACKFILL_PAUSE_SECONDS = config("BACKFILL_PAUSE_SECONDS", default=0.05, cast=float)  # sleep between batches
+BACKFILL_REPORT_SECONDS = config("BACKFILL_REPORT_SECONDS", default=10, cast=float)  # progress log interval
+
+# Production server (python -m app.server)
+WEB_CONCURRENCY = config("WEB_CONCURRENCY", default=0, cast=int)  # 0 = one worker per CPU
+SERVER_HOST = config("SERVER_HOST", default="0.0.0.0")
+SERVER_PORT = config("SERVER_PORT", default=8000, cast=int)
+SERVER_MAX_REQUESTS = config("SERVER_MAX_REQUESTS", default=10000, cast=int)  # 0 = never recycle
+SERVER_MAX_REQUESTS_JITTER = config("SERVER_MAX_REQUESTS_JITTER", default=1000, cast=int)
+SERVER_GRACEFUL_TIMEOUT = config("SERVER_GRACEFUL_TIMEOUT", default=30, cast=int)
+SERVER_TIMEOUT = config("SERVER_TIMEOUT", default=60, cast=int)
+SERVER_KEEPALIVE = config("SERVER_KEEPALIVE", default=5, cast=int)
+SERVER_BACKLOG = config("SERVER_BACKLOG", default=2048, cast=int)
+# Proxies trusted to set X-Forwarded-For (comma-separated IPs, "*" = any; only behind a proxy that overwrites it)
+FORWARDED_ALLOW_IPS = config("FORWARDED_ALLOW_IPS", default="127.0.0.1")
 
 # API
 API_V1_STR = "/api/v1"
@@ -0,0 +1,221 @@
+import json
+import logging
+import math
+import time
+from datetime import datetime
+from typing import Optional
+
+from jose import JWTError, jwt
+from sqlalchemy import inspect
+
+from .cache import ExpiringSet, TTLCache, get_redis
+from ..config import (
+    SECRET_KEY,
+    ALGORITHM,
+    PRINCIPAL_CACHE_TTL,
+    PRINCIPAL_CACHE_LOCAL_TTL,
+    PRINCIPAL_CACHE_SIZE,
+    TOKEN_CACHE_SIZE,
+    REVOCATION_LOCAL_SIZE,
+    REVOCATION_LOCAL_TTL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Never cached: not needed to authorize a request
+_EXCLUDED_COLUMNS = {"hashed_password"}
+_DATETIME_COLUMNS = {"created_at", "updated_at"}
+
+
+def principal_to_dict(user) -> dict:
+    """Column values of a user row, minus secrets"""
+    return {
+        attr.key: getattr(user, attr.key)
+        for attr in inspect(user).mapper.column_attrs
+        if attr.key not in _EXCLUDED_COLUMNS
+    }
+
+
+def _dumps(data: dict) -> str:
+    return json.dumps({
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in data.items()
+    })
+
+
+def _loads(raw) -> dict:
+    data = json.loads(raw)
+    for key in _DATETIME_COLUMNS:
+        if data.get(key):
+            data[key] = datetime.fromisoformat(data[key])
+    return data
+
+
+class PrincipalCache:
+    """Two-tier cache of authenticated users keyed by token subject
+
+    The in-process tier is short-lived (other workers cannot invalidate
+    it); the optional Redis tier is shared by all workers and is
+    invalidated explicitly whenever a user changes.
+    """
+
+    key_prefix = "principal:"
+
+    def __init__(
+        self,
+        local_ttl: float = PRINCIPAL_CACHE_LOCAL_TTL,
+        shared_ttl: int = PRINCIPAL_CACHE_TTL,
+        maxsize: int = PRINCIPAL_CACHE_SIZE,
+        redis=None,
+    ):
+        self.local = TTLCache(maxsize=maxsize, ttl=local_ttl)
+        self.shared_ttl = shared_ttl
+        self._redis = redis
+
+    @property
+    def redis(self):
+        return self._redis if self._redis is not None else get_redis()
+
+    async def get(self, subject: str) -> Optional[dict]:
+        data = self.local.get(subject)
+        if data is not None:
+            return data
+        redis = self.redis
+        if redis is not None:
+            raw = await redis.get(self.key_prefix + subject)
+            if raw is not None:
+                data = _loads(raw)
+                self.local.set(subject, data)
+                return data
+        return None
+
+    async def set(self, subject: str, data: dict):
+        self.local.set(subject, data)
+        redis = self.redis
+        if redis is not None:
+            await redis.set(self.key_prefix + subject, _dumps(data), ex=self.shared_ttl)
+
+    async def invalidate(self, *subjects: str):
+        subjects = [s for s in subjects if s]
+        for subject in subjects:
+            self.local.delete(subject)
+        redis = self.redis
+        if redis is not None and subjects:
+            await redis.delete(*(self.key_prefix + s for s in subjects))
+
+
+class TokenCache:
+    """Remembers tokens whose signature already verified
+
+    Keyed by the raw token; entries expire with the token itself, so a hit
+    only needs an expiry check instead of an HMAC/RSA verification.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.cache = TTLCache(maxsize=maxsize, ttl=0)
+
+    def decode(self, token: str) -> dict:
+        """Return the token's claims, raising JWTError if invalid or expired"""
+        payload = self.cache.get(token)
+        if payload is not None:
+            return payload
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        remaining = payload.get("exp", 0) - time.time()
+        if remaining > 0:
+            self.cache.set(token, payload, ttl=remaining)
+        return payload
+
+    def forget(self, token: str):
+        self.cache.delete(token)
+
+
+class RevocationStore:
+    """Deny-list of token ids (`jti`), each kept only until its token expires
+
+    Revoked ids live in an in-process ExpiringSet (O(1) lookups, shrinks
+    as tokens expire) and, when Redis is configured, under keys that expire
+    with the token so other workers see them. A "not revoked" answer from
+    Redis is reused for REVOCATION_LOCAL_TTL seconds, which bounds both the
+    Redis traffic per token and how long another worker's revocation can
+    take to apply.
+
+    Without Redis the local set is the only record, so it never evicts an
+    id before its token expires: past `maxsize` it keeps growing and logs a
+    warning rather than silently un-revoking a token. With Redis, local
+    evictions just fall back to a Redis lookup.
+    """
+
+    key_prefix = "revoked:"
+
+    def __init__(
+        self,
+        maxsize: int = REVOCATION_LOCAL_SIZE,
+        negative_ttl: float = REVOCATION_LOCAL_TTL,
+        redis=None,
+    ):
+        self.revoked = ExpiringSet(maxsize)
+        self.not_revoked = TTLCache(maxsize=maxsize, ttl=negative_ttl)
+        self._redis = redis
+        self.shared_lookups = 0
+        self.over_capacity = False
+
+    @property
+    def redis(self):
+        return self._redis if self._redis is not None else get_redis()
+
+    def _remember(self, jti: str, expires_at: float, shared: bool):
+        self.revoked.add(jti, expires_at, evict_live=shared)
+        over = len(self.revoked) > self.revoked.maxsize
+        if over and not self.over_capacity:
+            logger.warning(
+                "Revocation deny-list holds %d live ids, over REVOCATION_LOCAL_SIZE=%d; "
+                "growing rather than forgetting revoked tokens (set REDIS_URL to share and offload it)",
+                len(self.revoked), self.revoked.maxsize,
+            )
+        self.over_capacity = over
+
+    async def revoke(self, jti: str, expires_at: float) -> bool:
+        """Deny `jti` until `expires_at`; False if it was already revoked
+
+        With Redis the claim is atomic across workers (SET NX), which is
+        what makes refresh tokens single-use.
+        """
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            return False
+        newly_revoked = jti not in self.revoked
+        redis = self.redis
+        self._remember(jti, expires_at, shared=redis is not None)
+        self.not_revoked.delete(jti)
+        if redis is not None:
+            newly_revoked = bool(await redis.set(
+                self.key_prefix + jti, str(expires_at), ex=math.ceil(remaining), nx=True
+            ))
+        return newly_revoked
+
+    async def is_revoked(self, jti: str) -> bool:
+        if jti in self.revoked:
+            return True
+        redis = self.redis
+        if redis is None or self.not_revoked.get(jti):
+            return False
+        self.shared_lookups += 1
+        raw = await redis.get(self.key_prefix + jti)
+        if raw is None:
+            self.not_revoked.set(jti, True)
+            return False
+        self._remember(jti, float(raw), shared=True)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "revoked_local": len(self.revoked),
+            "evicted_local": self.revoked.evictions,
+            "over_capacity": self.over_capacity,
+            "shared_lookups": self.shared_lookups,
+        }
+
+
+principal_cache = PrincipalCache()
+token_cache = TokenCache()
+revocation_store = RevocationStore()
@@ -0,0 +1,141 @@
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from ..config import REDIS_URL
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe in-process cache with per-entry TTL and LRU eviction"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class ExpiringSet:
+    """Thread-safe bounded set whose members drop out at their own expiry time
+
+    Membership is a dict lookup. A heap ordered by expiry lets expired
+    members be purged oldest-first without scanning, so the set shrinks as
+    its members expire. When full, the member closest to expiry is evicted,
+    unless the caller passes `evict_live=False` (for members that must not
+    be forgotten early); the set then grows past `maxsize` instead.
+    Expiry times are wall-clock (time.time), like JWT `exp` claims.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._expiry: Dict[Hashable, float] = {}
+        self._heap: List[Tuple[float, Hashable]] = []
+        self._lock = threading.Lock()
+
+    def _purge(self, now: float):
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            # Skip heap entries superseded by a later add of the same key
+            if self._expiry.get(key) == expires_at:
+                del self._expiry[key]
+
+    def _evict_one(self):
+        while self._heap:
+            expires_at, key = heapq.heappop(self._heap)
+            if self._expiry.get(key) == expires_at:
+                del self._expiry[key]
+                return
+
+    def add(self, key: Hashable, expires_at: float, evict_live: bool = True):
+        with self._lock:
+            self._purge(time.time())
+            if self._expiry.get(key, 0) >= expires_at:
+                return
+            self._expiry[key] = expires_at
+            heapq.heappush(self._heap, (expires_at, key))
+            while evict_live and len(self._expiry) > self.maxsize:
+                self._evict_one()
+                self.evictions += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        expires_at = self._expiry.get(key)
+        if expires_at is None:
+            return False
+        now = time.time()
+        if expires_at > now:
+            return True
+        with self._lock:
+            self._purge(now)
+        return False
+
+    def purge(self):
+        with self._lock:
+            self._purge(time.time())
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+
+_redis_client = None
+
+
+def get_redis():
+    """Shared async Redis client, or None when REDIS_URL is not set"""
+    global _redis_client
+    if not REDIS_URL:
+        return None
+    if _redis_client is None:
+        import redis.asyncio as redis
+        _redis_client = redis.from_url(REDIS_URL)
+    return _redis_client
+
+
+def reset_redis():
+    """Forget the client so the next call connects afresh (e.g. after fork)"""
+    global _redis_client
+    _redis_client = None
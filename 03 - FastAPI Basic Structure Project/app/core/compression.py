@@ -0,0 +1,348 @@
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install zstandard
+    zstandard = None
+
+from ..config import (
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MIN_SIZE,
+    COMPRESSION_ROUTE_LEVELS,
+    COMPRESSION_ZSTD_LEVEL,
+)
+
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        # wbits=31: deflate with a gzip header and trailer
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it, so the client can decode it on arrival"""
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, level: int):
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data) + self._obj.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.process(data) + self._obj.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level: int):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush()
+
+
+# Server preference, best ratio per CPU first; only installed codecs are offered
+ENCODERS: Dict[str, Callable[[int], object]] = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = ZstdEncoder
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+ENCODERS["gzip"] = GzipEncoder
+
+DEFAULT_LEVELS = {
+    "gzip": COMPRESSION_GZIP_LEVEL,
+    "br": COMPRESSION_BROTLI_QUALITY,
+    "zstd": COMPRESSION_ZSTD_LEVEL,
+}
+
+# Already compressed; recompressing costs CPU and saves nothing
+_EXCLUDED_PREFIXES = ("image/", "video/", "audio/")
+_EXCLUDED_TYPES = {
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "application/zstd",
+    "application/x-bzip2",
+    "application/x-xz",
+    "application/x-7z-compressed",
+    "application/octet-stream",
+    "application/pdf",
+    "font/woff",
+    "font/woff2",
+}
+_COMPRESSIBLE_IMAGES = {"image/svg+xml", "image/bmp"}
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type in _COMPRESSIBLE_IMAGES:
+        return True
+    return not (media_type.startswith(_EXCLUDED_PREFIXES) or media_type in _EXCLUDED_TYPES)
+
+
+def negotiate(accept_encoding: str, available=ENCODERS) -> Optional[str]:
+    """Best available coding for an Accept-Encoding header, or None for identity
+
+    Highest q-value wins, ties go to server preference (the order of
+    `available`). `q=0` refuses a coding; `*` covers codings not listed.
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    if "x-gzip" in weights and "gzip" not in weights:
+        weights["gzip"] = weights["x-gzip"]
+
+    best, best_q = None, 0.0
+    wildcard = weights.get("*", 0.0)
+    for coding in available:
+        q = weights.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def parse_route_levels(raw: str) -> Dict[str, Dict[str, int]]:
+    """Parse `/path:gzip=1,br=1;/other:gzip=9` into {path prefix: {coding: level}}"""
+    routes: Dict[str, Dict[str, int]] = {}
+    for entry in raw.split(";"):
+        prefix, _, levels = entry.strip().partition(":")
+        if not prefix or not levels:
+            continue
+        routes[prefix] = {
+            coding.strip(): int(level)
+            for coding, _, level in (item.partition("=") for item in levels.split(","))
+            if coding.strip()
+        }
+    return routes
+
+
+class CompressionMetrics:
+    """Process-wide bytes in/out and time spent compressing, per coding"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._codings: Dict[str, Dict[str, float]] = {}
+        self._skipped: Dict[str, int] = {}
+
+    def record(self, coding: str, bytes_in: int, bytes_out: int, seconds: float):
+        with self._lock:
+            stats = self._codings.get(coding)
+            if stats is None:
+                stats = self._codings[coding] = {"responses": 0, "bytes_in": 0, "bytes_out": 0, "seconds": 0.0}
+            stats["responses"] += 1
+            stats["bytes_in"] += bytes_in
+            stats["bytes_out"] += bytes_out
+            stats["seconds"] += seconds
+
+    def skip(self, reason: str):
+        with self._lock:
+            self._skipped[reason] = self._skipped.get(reason, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            codings = {
+                coding: {
+                    "responses": stats["responses"],
+                    "bytes_in": stats["bytes_in"],
+                    "bytes_out": stats["bytes_out"],
+                    "ratio": round(stats["bytes_out"] / stats["bytes_in"], 4) if stats["bytes_in"] else None,
+                    "compress_seconds_total": round(stats["seconds"], 6),
+                }
+                for coding, stats in self._codings.items()
+            }
+            return {"available": list(ENCODERS), "codings": codings, "skipped": dict(self._skipped)}
+
+
+compression_metrics = CompressionMetrics()
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _add_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    for i, (key, value) in enumerate(headers):
+        if key.lower() == b"vary":
+            if b"accept-encoding" not in value.lower() and value.strip() != b"*":
+                headers[i] = (key, value + b", Accept-Encoding")
+            return headers
+    headers.append((b"vary", b"Accept-Encoding"))
+    return headers
+
+
+class CompressionMiddleware:
+    """Pure ASGI response compression with content negotiation
+
+    Picks zstd, br or gzip from Accept-Encoding (whichever are installed),
+    leaves alone responses that are small, already encoded, partial, or of
+    an already-compressed media type, and compresses streaming bodies chunk
+    by chunk: each chunk is flushed as it is produced, so NDJSON/CSV exports
+    still reach the client incrementally and are never buffered whole.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        levels: Optional[Mapping[str, int]] = None,
+        route_levels: Optional[Mapping[str, Mapping[str, int]]] = None,
+        metrics: CompressionMetrics = compression_metrics,
+        encoders: Optional[Mapping[str, Callable[[int], object]]] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {**DEFAULT_LEVELS, **(levels or {})}
+        if route_levels is None:
+            route_levels = parse_route_levels(COMPRESSION_ROUTE_LEVELS)
+        # Longest prefix first, so the most specific route wins
+        self.route_levels = sorted(route_levels.items(), key=lambda item: len(item[0]), reverse=True)
+        self.metrics = metrics
+        self.encoders = ENCODERS if encoders is None else encoders
+
+    def _level(self, path: str, coding: str) -> int:
+        for prefix, levels in self.route_levels:
+            if path.startswith(prefix) and coding in levels:
+                return levels[coding]
+        return self.levels[coding]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = _header(scope["headers"], b"accept-encoding")
+        coding = negotiate(accept.decode("latin-1"), self.encoders) if accept else None
+        metrics = self.metrics
+        minimum_size = self.minimum_size
+
+        start_message = None
+        passthrough = False
+        encoder = None
+        buffered: List[bytes] = []
+        buffered_size = 0
+        bytes_in = bytes_out = 0
+        seconds = 0.0
+
+        async def send_uncompressed(body: bytes, more_body: bool):
+            nonlocal passthrough
+            passthrough = True
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        async def send_compressed(body: bytes, more_body: bool):
+            nonlocal encoder, bytes_in, bytes_out, seconds
+            started = encoder is None
+            if started:
+                encoder = self.encoders[coding](self._level(scope["path"], coding))
+            t0 = time.perf_counter()
+            out = encoder.compress(body) if more_body else encoder.finish(body)
+            seconds += time.perf_counter() - t0
+            bytes_in += len(body)
+            bytes_out += len(out)
+            if started:
+                headers = [
+                    (key, value) for key, value in start_message["headers"]
+                    if key.lower() != b"content-length"
+                ]
+                headers.append((b"content-encoding", coding.encode()))
+                if not more_body:
+                    headers.append((b"content-length", str(len(out)).encode()))
+                etag_index = next((i for i, (key, _) in enumerate(headers) if key.lower() == b"etag"), None)
+                if etag_index is not None and not headers[etag_index][1].startswith(b"W/"):
+                    # A different byte sequence; only weakly equal to the identity representation
+                    headers[etag_index] = (headers[etag_index][0], b"W/" + headers[etag_index][1])
+                start_message["headers"] = headers
+                await send(start_message)
+            if out or not more_body:
+                await send({"type": "http.response.body", "body": out, "more_body": more_body})
+            if not more_body:
+                metrics.record(coding, bytes_in, bytes_out, seconds)
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough, buffered_size
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                headers = list(message.get("headers", ()))
+                content_type = _header(headers, b"content-type")
+                compressible = content_type is None or is_compressible(content_type.decode("latin-1"))
+                if compressible:
+                    headers = _add_vary(headers)
+                message["headers"] = headers
+                start_message = message
+
+                reason = None
+                status = message["status"]
+                content_length = _header(headers, b"content-length")
+                if not compressible:
+                    reason = "excluded_type"
+                elif status < 200 or status in (204, 206, 304):
+                    reason = "status"
+                elif _header(headers, b"content-encoding") is not None:
+                    reason = "already_encoded"
+                elif coding is None:
+                    reason = "not_accepted"
+                elif content_length is not None and int(content_length) < minimum_size:
+                    reason = "too_small"
+                if reason is not None:
+                    metrics.skip(reason)
+                    passthrough = True
+                    await send(message)
+                return
+
+            if message_type != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is not None:
+                await send_compressed(body, more_body)
+                return
+
+            # Hold chunks until there is enough to be worth compressing
+            if body:
+                buffered.append(body)
+                buffered_size += len(body)
+            if buffered_size < minimum_size:
+                if more_body:
+                    return
+                metrics.skip("too_small")
+                await send_uncompressed(b"".join(buffered), False)
+                return
+            await send_compressed(b"".join(buffered), more_body)
+            buffered.clear()
+
+        await self.app(scope, receive, send_wrapper)
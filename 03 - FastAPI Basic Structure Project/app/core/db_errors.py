@@ -0,0 +1,21 @@
+import re
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+
+# SQLite: "UNIQUE constraint failed: users.email"
+_SQLITE_UNIQUE = re.compile(r"UNIQUE constraint failed: \w+\.(\w+)")
+# PostgreSQL: 'Key (email)=(a@example.com) already exists.'
+_PG_KEY = re.compile(r"Key \((\w+)\)=")
+# PostgreSQL: 'violates unique constraint "ix_users_email"'
+_PG_CONSTRAINT = re.compile(r'unique constraint "(\w+)"')
+
+
+def unique_violation(exc: IntegrityError) -> Optional[str]:
+    """Column (or constraint name) behind a unique violation, if it was one"""
+    message = str(exc.orig)
+    for pattern in (_SQLITE_UNIQUE, _PG_KEY, _PG_CONSTRAINT):
+        match = pattern.search(message)
+        if match:
+            return match.group(1)
+    return None
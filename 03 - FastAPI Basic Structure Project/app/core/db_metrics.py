@@ -0,0 +1,145 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class RequestDBStats:
+    """Database work done on behalf of one request"""
+    __slots__ = ("queries", "query_time", "pool_wait", "checkouts")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.pool_wait = 0.0
+        self.checkouts = 0
+
+
+class DBMetrics:
+    """Process-wide database counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries_total = 0
+        self.query_time_total = 0.0
+        self.checkouts_total = 0
+        self.pool_wait_total = 0.0
+        self.pool_wait_max = 0.0
+
+    def record_query(self, seconds: float):
+        with self._lock:
+            self.queries_total += 1
+            self.query_time_total += seconds
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_time += seconds
+
+    def record_checkout(self, wait: float):
+        with self._lock:
+            self.checkouts_total += 1
+            self.pool_wait_total += wait
+            if wait > self.pool_wait_max:
+                self.pool_wait_max = wait
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.checkouts += 1
+            stats.pool_wait += wait
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "queries_total": self.queries_total,
+                "query_time_seconds_total": round(self.query_time_total, 6),
+                "checkouts_total": self.checkouts_total,
+                "pool_wait_seconds_total": round(self.pool_wait_total, 6),
+                "pool_wait_seconds_max": round(self.pool_wait_max, 6),
+            }
+
+
+_request_stats: ContextVar[Optional[RequestDBStats]] = ContextVar("request_db_stats", default=None)
+db_metrics = DBMetrics()
+_engines: Dict[str, Engine] = {}
+
+
+def start_request_stats() -> RequestDBStats:
+    """Begin collecting DB stats for the current request context"""
+    stats = RequestDBStats()
+    _request_stats.set(stats)
+    return stats
+
+
+def get_request_stats() -> Optional[RequestDBStats]:
+    return _request_stats.get()
+
+
+class _TimedCheckoutMixin:
+    """Measure how long a checkout waits on the pool (includes connecting)"""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            db_metrics.record_checkout(time.perf_counter() - start)
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start_time"].pop()
+    db_metrics.record_query(time.perf_counter() - start)
+
+
+def _handle_error(context):
+    # failed statements never reach after_cursor_execute
+    if context.connection is not None:
+        starts = context.connection.info.get("query_start_time")
+        if starts:
+            starts.pop()
+
+
+# Listening on the Engine class times queries on every engine, including
+# the sync engine behind each AsyncEngine
+event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+event.listen(Engine, "handle_error", _handle_error)
+
+
+def register_engine(name: str, engine: Engine):
+    """Report this engine's pool in /metrics
+
+    Pass `async_engine.sync_engine` for async engines.
+    """
+    _engines[name] = engine
+
+
+def pool_status() -> dict:
+    """Current size and usage of each registered engine's pool"""
+    status = {}
+    for name, engine in _engines.items():
+        pool = engine.pool
+        if isinstance(pool, QueuePool):
+            status[name] = {
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            }
+        else:
+            status[name] = {"class": type(pool).__name__}
+    return status
@@ -0,0 +1,148 @@
+import math
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .cache import TTLCache, get_redis
+from ..config import DATABASE_REPLICA_URL, REPLICA_STICKY_SECONDS, REPLICA_STICKY_SIZE
+
+# Per request (each request runs in its own task, so these never leak between requests)
+_routing_key: ContextVar[Optional[str]] = ContextVar("db_routing_key", default=None)
+_use_primary: ContextVar[bool] = ContextVar("db_use_primary", default=False)
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class StickyPrimary:
+    """Remembers who wrote recently, so their reads skip the lagging replica
+
+    A key (normally the user's email) is sticky for `window` seconds after
+    a commit that wrote. Marks are kept in-process and, when Redis is
+    configured, under expiring keys so that every worker honours them.
+    """
+
+    key_prefix = "sticky:"
+
+    def __init__(
+        self,
+        window: float = REPLICA_STICKY_SECONDS,
+        maxsize: int = REPLICA_STICKY_SIZE,
+        enabled: bool = bool(DATABASE_REPLICA_URL),
+        redis=None,
+    ):
+        self.window = window
+        self.enabled = enabled and window > 0
+        self.recent = TTLCache(maxsize=maxsize, ttl=window)
+        self._redis = redis
+        self.marked = 0
+        self.sticky_reads = 0
+
+    @property
+    def redis(self):
+        return self._redis if self._redis is not None else get_redis()
+
+    def remember(self, key: Optional[str]):
+        """Mark `key` in this process"""
+        if self.enabled and key:
+            self.recent.set(key.lower(), True)
+            self.marked += 1
+
+    async def share(self, key: Optional[str]):
+        """Mark `key` for the other workers too"""
+        redis = self.redis
+        if self.enabled and key and redis is not None:
+            await redis.set(self.key_prefix + key.lower(), 1, ex=math.ceil(self.window))
+
+    async def is_sticky(self, key: Optional[str]) -> bool:
+        if not self.enabled or not key:
+            return False
+        key = key.lower()
+        sticky = bool(self.recent.get(key))
+        if not sticky:
+            redis = self.redis
+            sticky = redis is not None and await redis.get(self.key_prefix + key) is not None
+        if sticky:
+            self.sticky_reads += 1
+        return sticky
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "window_seconds": self.window,
+            "marked": self.marked,
+            "sticky_reads": self.sticky_reads,
+        }
+
+
+sticky_primary = StickyPrimary()
+
+
+def use_primary():
+    """Send the rest of this request's queries to the primary"""
+    _use_primary.set(True)
+
+
+def route_for_method(method: str):
+    """Requests that may write use the primary throughout, reads included"""
+    if method not in SAFE_METHODS:
+        _use_primary.set(True)
+
+
+async def route_for(key: Optional[str]):
+    """Attribute this request to `key`: its writes make `key` sticky, and
+    its reads use the primary if `key` wrote within the sticky window"""
+    if not sticky_primary.enabled or not key:
+        return
+    _routing_key.set(key)
+    if await sticky_primary.is_sticky(key):
+        _use_primary.set(True)
+
+
+class RoutingSession(Session):
+    """Session that reads from a replica and writes to the primary
+
+    Flushes, INSERT/UPDATE/DELETE statements and SELECT ... FOR UPDATE go
+    to the primary. Once a session has written, its later reads follow
+    (read-your-writes), as do all reads in a request routed to the primary
+    by `use_primary`, `route_for_method` or a sticky `route_for`. Raw SQL
+    that writes must call `use_primary()` first. Without a replica
+    everything goes to the primary.
+    """
+
+    def __init__(self, *args, primary: Engine, replica: Optional[Engine] = None, **kwargs):
+        if kwargs.get("bind") is None:
+            kwargs["bind"] = primary
+        super().__init__(*args, **kwargs)
+        self.primary = primary
+        self.replica = replica
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.replica is None:
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        if self._flushing or (clause is not None and (
+            getattr(clause, "is_dml", False) or getattr(clause, "_for_update_arg", None) is not None
+        )):
+            self.info["wrote"] = True
+            return self.primary
+        if self.info.get("wrote") or _use_primary.get():
+            return self.primary
+        return self.replica
+
+    def commit(self):
+        super().commit()
+        if self.info.get("wrote"):
+            sticky_primary.remember(_routing_key.get())
+
+
+class RoutingAsyncSession(AsyncSession):
+    """AsyncSession over a RoutingSession that also shares sticky marks"""
+
+    sync_session_class = RoutingSession
+
+    async def commit(self):
+        await super().commit()
+        if self.sync_session.info.get("wrote"):
+            await sticky_primary.share(_routing_key.get())
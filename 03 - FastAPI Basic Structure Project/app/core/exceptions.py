@@ -1,3 +1,5 @@
+import math
+
 from fastapi import HTTPException, status
 
 
@@ -8,12 +10,14 @@ class CustomException(Exception):
         message: str,
         status_code: int = status.HTTP_500_INTERNAL_SERVER_ERROR,
         error_type: str = "INTERNAL_ERROR",
-        detail: str = None
+        detail: str = None,
+        headers: dict = None
     ):
         self.message = message
         self.status_code = status_code
         self.error_type = error_type
         self.detail = detail
+        self.headers = headers
         super().__init__(self.message)
 
 
@@ -70,3 +74,27 @@ class ConflictException(CustomException):
             error_type="CONFLICT_ERROR",
             detail=detail
         )
+
+
+class ServiceUnavailableException(CustomException):
+    """Service unavailable exception"""
+    def __init__(self, message: str = "Service temporarily overloaded", detail: str = None, headers: dict = None):
+        super().__init__(
+            message=message,
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            error_type="SERVICE_UNAVAILABLE",
+            detail=detail,
+            headers=headers
+        )
+
+
+class RateLimitException(CustomException):
+    """Rate limit exceeded exception"""
+    def __init__(self, message: str = "Too many requests", retry_after: float = 1, detail: str = None):
+        super().__init__(
+            message=message,
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            error_type="RATE_LIMITED",
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
@@ -0,0 +1,47 @@
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel, ConfigDict, create_model
+
+from .exceptions import ValidationException
+
+
+def parse_fields(
+    raw: Optional[str], allowed: Sequence[str], required: Sequence[str] = ("id",)
+) -> Tuple[str, ...]:
+    """Fields named in a `?fields=a,b` parameter, in `allowed` order
+
+    `required` fields are always included; no parameter means every field.
+    """
+    if not raw:
+        return tuple(allowed)
+    requested = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise ValidationException(
+            f"Unknown field(s): {', '.join(sorted(unknown))}",
+            detail=f"Available fields: {', '.join(allowed)}",
+        )
+    requested.update(required)
+    return tuple(name for name in allowed if name in requested)
+
+
+def fields_variant(fields: Sequence[str], allowed: Sequence[str]) -> str:
+    """ETag variant naming a projection ("" for the full representation)"""
+    return "" if tuple(fields) == tuple(allowed) else ".".join(fields)
+
+
+@lru_cache(maxsize=128)
+def slim_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """`model` restricted to `fields`, for serializing projected objects
+
+    Reads attributes, so it works on ORM objects loaded with load_only and on
+    result rows alike. One class is built per distinct projection.
+    """
+    if fields == tuple(model.model_fields):
+        return model
+    return create_model(
+        f"{model.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields},
+    )
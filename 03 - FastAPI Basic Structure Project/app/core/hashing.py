@@ -0,0 +1,162 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from .exceptions import ServiceUnavailableException
+from .security import pwd_context
+from ..config import HASH_WORKERS, HASH_MAX_PENDING
+
+# How often bulk hashing re-checks for a free slot while the queue is full
+ADMIT_POLL_SECONDS = 0.01
+
+
+def _timed_hash(password: str) -> Tuple[str, float]:
+    """Hash in a worker process, returning the hash and CPU time spent"""
+    start = time.process_time()
+    hashed = pwd_context.hash(password)
+    return hashed, time.process_time() - start
+
+
+def _timed_verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str], float]:
+    """Verify in a worker process; also returns a new hash if parameters changed"""
+    start = time.process_time()
+    valid, new_hash = pwd_context.verify_and_update(password, hashed_password)
+    return valid, new_hash, time.process_time() - start
+
+
+class PasswordHasher:
+    """Bounded process pool for bcrypt hashing and verification
+
+    bcrypt is pure CPU, so running it on the event loop or FastAPI's
+    threadpool stalls unrelated requests. Work goes to a dedicated process
+    pool instead, and once `max_pending` operations are queued or running,
+    new interactive ones are rejected with 503 rather than piling up. Bulk
+    hashing waits for a free slot instead, so an import is never cut off
+    halfway through.
+    """
+
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 8
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.cpu_seconds_total = 0.0
+        self.wall_seconds_total = 0.0
+        self.wall_seconds_max = 0.0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _try_admit(self) -> bool:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return False
+            self._pending += 1
+            return True
+
+    def _admit(self):
+        if not self._try_admit():
+            with self._lock:
+                self.rejected += 1
+            raise ServiceUnavailableException("Too many concurrent password operations, retry shortly")
+
+    async def _wait_admit(self):
+        while not self._try_admit():
+            await asyncio.sleep(ADMIT_POLL_SECONDS)
+
+    def _release(self, wall: float, cpu: float):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+            self.cpu_seconds_total += cpu
+            self.wall_seconds_total += wall
+            if wall > self.wall_seconds_max:
+                self.wall_seconds_max = wall
+
+    async def _run(self, fn, *args, wait: bool = False):
+        if wait:
+            await self._wait_admit()
+        else:
+            self._admit()
+        start = time.perf_counter()
+        cpu = 0.0
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+            cpu = result[-1]
+            return result[:-1]
+        finally:
+            self._release(time.perf_counter() - start, cpu)
+
+    async def hash(self, password: str) -> str:
+        """Hash password off the event loop"""
+        (hashed,) = await self._run(_timed_hash, password)
+        return hashed
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """Hash a batch across all hashing processes
+
+        Submitted in waves of one password per process, so interactive
+        logins queued meanwhile are not stuck behind the whole batch. When
+        the queue is full the batch waits for capacity rather than failing.
+        """
+        hashed = []
+        wave_size = min(self.workers, self.max_pending)
+        for start in range(0, len(passwords), wave_size):
+            wave = passwords[start:start + wave_size]
+            results = await asyncio.gather(*(self._run(_timed_hash, password, wait=True) for password in wave))
+            hashed.extend(result for (result,) in results)
+        return hashed
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify password; returns a new hash when the stored one is outdated"""
+        valid, new_hash = await self._run(_timed_verify_and_update, password, hashed_password)
+        if new_hash is not None:
+            with self._lock:
+                self.rehashed += 1
+        return valid, new_hash
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed_total": self.completed,
+                "rejected_total": self.rejected,
+                "rehashed_total": self.rehashed,
+                "cpu_seconds_total": round(self.cpu_seconds_total, 6),
+                "wall_seconds_total": round(self.wall_seconds_total, 6),
+                "wall_seconds_max": round(self.wall_seconds_max, 6),
+            }
+
+    def reset_after_fork(self, workers: Optional[int] = None):
+        """A forked worker starts its own pool rather than using the parent's
+
+        `workers` resizes the pool, e.g. to split the CPUs between API workers.
+        """
+        if workers:
+            self.workers = workers
+            self.max_pending = HASH_MAX_PENDING or workers * 8
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,75 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Stored timestamps are naive UTC (datetime.utcnow)"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def make_etag(id: int, updated_at: Optional[datetime], variant: str = "") -> str:
+    """Weak validator for one stored version of a resource
+
+    Derived from the row version rather than the body bytes, so it can be
+    checked without loading or serializing the resource. `variant`
+    distinguishes different representations of the same version.
+    """
+    version = int(_as_utc(updated_at).timestamp() * 1_000_000) if updated_at else 0
+    suffix = f"-{variant}" if variant else ""
+    return f'W/"{id}-{version}{suffix}"'
+
+
+def http_date(value: datetime) -> str:
+    """IMF-fixdate for a naive-UTC or aware datetime"""
+    return format_datetime(_as_utc(value).astimezone(timezone.utc), usegmt=True)
+
+
+def _strip_weak(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, etag: str, updated_at: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison, as required for If-None-Match
+        candidates = {_strip_weak(tag.strip()) for tag in if_none_match.split(",")}
+        return _strip_weak(etag) in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and updated_at is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution
+        return _as_utc(updated_at).replace(microsecond=0) <= _as_utc(since)
+    return False
+
+
+def has_validators(request: Request) -> bool:
+    """Whether the request is conditional at all"""
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def set_cache_headers(
+    response: Response, etag: str, updated_at: Optional[datetime], cache_control: str
+) -> Response:
+    response.headers["ETag"] = etag
+    if updated_at is not None:
+        response.headers["Last-Modified"] = http_date(updated_at)
+    response.headers["Cache-Control"] = cache_control
+    # Bodies differ per user token
+    response.headers["Vary"] = "Authorization"
+    return response
+
+
+def not_modified(etag: str, updated_at: Optional[datetime], cache_control: str) -> Response:
+    """Bodiless 304 carrying the same validators as the full response"""
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    return set_cache_headers(response, etag, updated_at, cache_control)
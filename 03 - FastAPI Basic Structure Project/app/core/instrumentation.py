@@ -0,0 +1,244 @@
+import json
+import logging
+import queue
+import random
+import sys
+from bisect import bisect_left
+from logging.handlers import QueueHandler, QueueListener
+from time import perf_counter_ns
+from typing import Dict, Optional, Tuple
+
+from .db_metrics import start_request_stats
+from ..config import ACCESS_LOG_SAMPLE_RATE, ACCESS_LOG_SLOW_MS
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+access_logger = logging.getLogger("app.access")
+
+
+class Histogram:
+    """Fixed-bucket latency histogram
+
+    Only updated from the event loop thread, so it takes no lock.
+    """
+    __slots__ = ("counts", "count", "sum_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class RouteStats:
+    __slots__ = ("latency", "statuses")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.statuses: Dict[int, int] = {}
+
+
+class HTTPMetrics:
+    """Per-route request latency and status counts, plus an in-flight gauge
+
+    The route is only known once the router has matched it, so in-flight
+    requests are counted per process rather than per route.
+    """
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.in_flight = 0
+
+    def route(self, method: str, template: str) -> RouteStats:
+        stats = self.routes.get((method, template))
+        if stats is None:
+            stats = self.routes[(method, template)] = RouteStats()
+        return stats
+
+    def snapshot(self) -> dict:
+        routes = {}
+        for (method, template), stats in sorted(self.routes.items(), key=lambda item: item[0][::-1]):
+            latency = stats.latency
+            routes[f"{method} {template}"] = {
+                "count": latency.count,
+                "statuses": {str(code): n for code, n in sorted(stats.statuses.items())},
+                "latency_ms": {
+                    "sum": round(latency.sum_ms, 3),
+                    "p50": latency.quantile(0.5),
+                    "p90": latency.quantile(0.9),
+                    "p99": latency.quantile(0.99),
+                    "buckets": dict(zip([str(b) for b in LATENCY_BUCKETS_MS] + ["+Inf"], latency.counts)),
+                },
+            }
+        return {"in_flight": self.in_flight, "routes": routes}
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition of the HTTP metrics"""
+        lines = [
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, template), stats in self.routes.items():
+            labels = f'method="{method}",route="{template}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS_MS, stats.latency.counts):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound / 1000}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.latency.count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {stats.latency.sum_ms / 1000}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {stats.latency.count}")
+        lines.append("# TYPE http_responses_total counter")
+        for (method, template), stats in self.routes.items():
+            for code, n in stats.statuses.items():
+                lines.append(f'http_responses_total{{method="{method}",route="{template}",status="{code}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+
+http_metrics = HTTPMetrics()
+
+
+class InstrumentationMiddleware:
+    """Pure ASGI request instrumentation
+
+    Records per-route latency histograms and the in-flight gauge, sets the
+    X-Process-Time and X-DB-* response headers, and hands a sample of
+    requests (plus every 5xx and slow request) to the access log queue.
+    """
+
+    def __init__(
+        self,
+        app,
+        metrics: HTTPMetrics = http_metrics,
+        sample_rate: float = ACCESS_LOG_SAMPLE_RATE,
+        slow_ms: float = ACCESS_LOG_SLOW_MS,
+    ):
+        self.app = app
+        self.metrics = metrics
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self._templates: Dict[object, str] = {}
+
+    def _template(self, scope) -> str:
+        """Route path template (e.g. /api/v1/users/{user_id}) of the matched endpoint"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        template = self._templates.get(endpoint)
+        if template is None:
+            for route in scope["app"].routes:
+                if getattr(route, "endpoint", None) is endpoint:
+                    template = route.path
+                    break
+            else:
+                template = scope["path"]
+            self._templates[endpoint] = template
+        return template
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = perf_counter_ns()
+        db_stats = start_request_stats()
+        metrics = self.metrics
+        metrics.in_flight += 1
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = (perf_counter_ns() - start) / 1e9
+                headers = list(message.get("headers", ()))
+                headers.append((b"x-process-time", f"{elapsed:.6f}".encode()))
+                headers.append((b"x-db-queries", str(db_stats.queries).encode()))
+                headers.append((b"x-db-time", f"{db_stats.query_time:.6f}".encode()))
+                headers.append((b"x-db-pool-wait", f"{db_stats.pool_wait:.6f}".encode()))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            elapsed_ms = (perf_counter_ns() - start) / 1e6
+            template = self._template(scope)
+            route = metrics.route(scope["method"], template)
+            route.latency.observe(elapsed_ms)
+            route.statuses[status] = route.statuses.get(status, 0) + 1
+            if status >= 500 or elapsed_ms >= self.slow_ms or random.random() < self.sample_rate:
+                access_logger.info(
+                    "request",
+                    extra={
+                        "method": scope["method"],
+                        "route": template,
+                        "path": scope["path"],
+                        "status": status,
+                        "duration_ms": round(elapsed_ms, 3),
+                        "db_queries": db_stats.queries,
+                    },
+                )
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Enqueue records as-is; formatting happens on the listener thread"""
+
+    def prepare(self, record):
+        return record
+
+
+class JSONAccessFormatter(logging.Formatter):
+    FIELDS = ("method", "route", "path", "status", "duration_ms", "db_queries")
+
+    def format(self, record):
+        data = {"ts": round(record.created, 3), "event": record.getMessage()}
+        data.update({field: getattr(record, field) for field in self.FIELDS if hasattr(record, field)})
+        return json.dumps(data)
+
+
+_listener: Optional[QueueListener] = None
+
+
+def start_access_log(stream=None):
+    """Route access records through a queue to a JSON stream handler thread"""
+    global _listener
+    if _listener is not None:
+        return
+    log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JSONAccessFormatter())
+    access_logger.addHandler(_DeferredQueueHandler(log_queue))
+    access_logger.setLevel(logging.INFO)
+    access_logger.propagate = False
+    _listener = QueueListener(log_queue, handler)
+    _listener.start()
+
+
+def stop_access_log():
+    """Flush queued access records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        for handler in list(access_logger.handlers):
+            if isinstance(handler, _DeferredQueueHandler):
+                access_logger.removeHandler(handler)
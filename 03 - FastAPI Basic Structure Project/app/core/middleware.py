@@ -1,7 +1,6 @@
 from fastapi import Request
 from fastapi.responses import JSONResponse
 import logging
-import time
 
 logger = logging.getLogger(__name__)
 
@@ -21,22 +20,3 @@ async def catch_exceptions_middleware(request: Request, call_next):
             }
         )
 
-
-async def logging_middleware(request: Request, call_next):
-    """Middleware to log requests"""
-    start_time = time.time()
-    
-    # Log request
-    logger.info(f"{request.method} {request.url}")
-    
-    response = await call_next(request)
-    
-    # Log response
-    process_time = time.time() - start_time
-    logger.info(
-        f"{request.method} {request.url} - "
-        f"Status: {response.status_code} - "
-        f"Time: {process_time:.4f}s"
-    )
-    
-    return response
@@ -0,0 +1,341 @@
+import logging
+import math
+import statistics
+import time
+from typing import Optional, Sequence
+
+import sqlalchemy as sa
+from alembic import context, op
+
+from ..config import BACKFILL_BATCH_SIZE, BACKFILL_PAUSE_SECONDS, BACKFILL_REPORT_SECONDS
+
+# Under the "alembic" logger, so alembic.ini's INFO level and handler apply
+logger = logging.getLogger("alembic.online")
+
+# Resume points of interrupted backfills; ignored by autogenerate (see alembic/env.py)
+PROGRESS_TABLE = "alembic_backfill_progress"
+
+# CREATE INDEX CONCURRENTLY scans the table twice and waits for open transactions
+_CONCURRENT_FACTOR = 2.0
+
+
+def dry_run_requested() -> bool:
+    """True under `alembic -x dry_run=true ...`"""
+    try:
+        value = context.get_x_argument(as_dictionary=True).get("dry_run", "")
+    except NameError:  # not running inside an Alembic environment
+        return False
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def _dry_run(dry_run: Optional[bool]) -> bool:
+    return dry_run_requested() if dry_run is None else dry_run
+
+
+def _estimate_bind():
+    """Connection the estimates query
+
+    A dry run executes migrations in SQL mode, where op.get_bind() only
+    echoes statements; env.py passes the real connection along as the
+    `dry_run_connection` option.
+    """
+    return op.get_context().opts.get("dry_run_connection") or op.get_bind()
+
+
+def _format_seconds(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def estimate_rows(bind, table_name: str) -> int:
+    """Row count from planner statistics where available, otherwise COUNT(*)"""
+    if bind.dialect.name == "postgresql":
+        estimate = bind.execute(
+            sa.text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table"), {"table": table_name}
+        ).scalar()
+        if estimate and estimate > 0:
+            return int(estimate)
+    return bind.execute(sa.text(f"SELECT count(*) FROM {table_name}")).scalar()
+
+
+def _index_state(bind, index_name: str, table_name: str) -> Optional[bool]:
+    """None if the index does not exist, else whether it is usable
+
+    A CREATE INDEX CONCURRENTLY that was interrupted leaves an INVALID index
+    behind on PostgreSQL; it must be dropped before building again.
+    """
+    if bind.dialect.name == "postgresql":
+        return bind.execute(
+            sa.text(
+                "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                "WHERE c.relname = :name"
+            ),
+            {"name": index_name},
+        ).scalar()
+    names = {index["name"] for index in sa.inspect(bind).get_indexes(table_name)}
+    return True if index_name in names else None
+
+
+def estimate_index_build(
+    table_name: str, columns: Sequence[str], sample_fraction: float = 0.01
+) -> dict:
+    """Estimate how long building an index on `columns` will take
+
+    Copies a sample of the table into a temporary table, times building the
+    index there and scales up by n log n (the sort dominates). On PostgreSQL
+    the sample is TABLESAMPLE SYSTEM and the result is doubled for the extra
+    scan of a concurrent build.
+    """
+    bind = _estimate_bind()
+    dialect = bind.dialect.name
+    total = estimate_rows(bind, table_name)
+    column_list = ", ".join(columns)
+    if dialect == "postgresql":
+        sample_from = f"{table_name} TABLESAMPLE SYSTEM ({sample_fraction * 100:g})"
+    else:
+        sample_from = f"{table_name} WHERE abs(random()) % {max(1, round(1 / sample_fraction))} = 0"
+
+    bind.execute(sa.text(f"CREATE TEMPORARY TABLE online_index_sample AS SELECT {column_list} FROM {sample_from}"))
+    try:
+        sampled = bind.execute(sa.text("SELECT count(*) FROM online_index_sample")).scalar()
+        start = time.perf_counter()
+        bind.execute(sa.text(f"CREATE INDEX online_index_sample_ix ON online_index_sample ({column_list})"))
+        elapsed = time.perf_counter() - start
+    finally:
+        bind.execute(sa.text("DROP TABLE online_index_sample"))
+
+    if sampled < 2 or total <= sampled:
+        seconds = elapsed
+    else:
+        seconds = elapsed * (total / sampled) * (math.log(total) / math.log(sampled))
+    if dialect == "postgresql":
+        seconds *= _CONCURRENT_FACTOR
+    return {"rows": total, "sampled_rows": sampled, "seconds": seconds}
+
+
+def create_index_concurrently(
+    index_name: str,
+    table_name: str,
+    columns: Sequence[str],
+    unique: bool = False,
+    dry_run: Optional[bool] = None,
+    **kw,
+) -> Optional[dict]:
+    """Build an index without blocking writes to the table
+
+    PostgreSQL: CREATE INDEX CONCURRENTLY, run outside the migration's
+    transaction as it must be. The migration's earlier work is committed
+    first, so keep such migrations to this one operation. An INVALID index
+    left by an interrupted build is dropped and rebuilt; a valid one is kept,
+    so the migration can simply be re-run.
+
+    SQLite has no concurrent builds (writers wait for the build either way);
+    the index is created normally. In a dry run nothing is built and the
+    estimated duration is returned.
+    """
+    bind = op.get_bind()
+    migration_context = op.get_context()
+    if _dry_run(dry_run):
+        estimate = estimate_index_build(table_name, columns)
+        logger.info(
+            "dry run: index %s on %s (~%d rows) would take about %s",
+            index_name, table_name, estimate["rows"], _format_seconds(estimate["seconds"]),
+        )
+        return estimate
+
+    if bind.dialect.name != "postgresql":
+        if migration_context.as_sql or _index_state(bind, index_name, table_name) is None:
+            op.create_index(index_name, table_name, list(columns), unique=unique, **kw)
+        return None
+
+    with migration_context.autocommit_block():
+        if not migration_context.as_sql:
+            state = _index_state(op.get_bind(), index_name, table_name)
+            if state is True:
+                logger.info("index %s already exists", index_name)
+                return None
+            if state is False:
+                logger.warning("dropping invalid index %s left by an interrupted build", index_name)
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+        start = time.perf_counter()
+        op.create_index(index_name, table_name, list(columns), unique=unique, postgresql_concurrently=True, **kw)
+        logger.info("built index %s in %s", index_name, _format_seconds(time.perf_counter() - start))
+    return None
+
+
+def drop_index_concurrently(index_name: str, table_name: str) -> None:
+    """Drop an index without blocking reads and writes (PostgreSQL)"""
+    if op.get_bind().dialect.name != "postgresql":
+        op.execute(f"DROP INDEX IF EXISTS {index_name}")
+        return
+    with op.get_context().autocommit_block():
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+
+def _next_boundary(bind, table_name: str, key: str, after, batch_size: int):
+    """Key of the last row in the next batch of `batch_size` rows after `after`"""
+    return bind.execute(
+        sa.text(
+            f"SELECT max({key}) FROM (SELECT {key} FROM {table_name} WHERE {key} > :after "
+            f"ORDER BY {key} LIMIT :n) AS batch"
+        ),
+        {"after": after, "n": batch_size},
+    ).scalar()
+
+
+def _update_statement(table_name: str, set_clause: str, where: Optional[str], key: str):
+    condition = f"{key} > :lo AND {key} <= :hi"
+    if where:
+        condition += f" AND ({where})"
+    return sa.text(f"UPDATE {table_name} SET {set_clause} WHERE {condition}")
+
+
+def _load_checkpoint(bind, name: str):
+    bind.execute(sa.text(
+        f"CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} ("
+        f"name VARCHAR(255) PRIMARY KEY, last_key BIGINT NOT NULL, rows_done BIGINT NOT NULL)"
+    ))
+    return bind.execute(
+        sa.text(f"SELECT last_key, rows_done FROM {PROGRESS_TABLE} WHERE name = :name"), {"name": name}
+    ).first()
+
+
+def _save_checkpoint(bind, name: str, last_key, rows_done: int):
+    params = {"name": name, "last_key": last_key, "rows_done": rows_done}
+    updated = bind.execute(
+        sa.text(f"UPDATE {PROGRESS_TABLE} SET last_key = :last_key, rows_done = :rows_done WHERE name = :name"),
+        params,
+    )
+    if updated.rowcount == 0:
+        bind.execute(
+            sa.text(f"INSERT INTO {PROGRESS_TABLE} (name, last_key, rows_done) VALUES (:name, :last_key, :rows_done)"),
+            params,
+        )
+
+
+def estimate_backfill(
+    table_name: str,
+    set_clause: str,
+    where: Optional[str] = None,
+    key: str = "id",
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    pause: float = BACKFILL_PAUSE_SECONDS,
+    sample_batches: int = 5,
+) -> dict:
+    """Estimate a backfill by running a few batches spread over the table and rolling them back"""
+    bind = _estimate_bind()
+    low, high = bind.execute(sa.text(f"SELECT min({key}), max({key}) FROM {table_name}")).first()
+    total = estimate_rows(bind, table_name)
+    if low is None:
+        return {"rows": 0, "batches": 0, "seconds": 0.0}
+
+    statement = _update_statement(table_name, set_clause, where, key)
+    timings, matched, scanned = [], 0, 0
+    for i in range(sample_batches):
+        after = low - 1 + (high - low) * i // sample_batches
+        boundary = _next_boundary(bind, table_name, key, after, batch_size)
+        if boundary is None:
+            break
+        params = {"lo": after, "hi": boundary}
+        savepoint = bind.begin_nested()
+        try:
+            start = time.perf_counter()
+            matched += bind.execute(statement, params).rowcount
+            timings.append(time.perf_counter() - start)
+        finally:
+            savepoint.rollback()
+        scanned += bind.execute(
+            sa.text(f"SELECT count(*) FROM {table_name} WHERE {key} > :lo AND {key} <= :hi"), params
+        ).scalar()
+
+    batches = math.ceil(total / batch_size)
+    return {
+        "rows": round(total * matched / scanned) if scanned else 0,
+        "batches": batches,
+        "seconds": batches * ((statistics.median(timings) if timings else 0.0) + pause),
+    }
+
+
+def backfill(
+    table_name: str,
+    set_clause: str,
+    where: Optional[str] = None,
+    name: Optional[str] = None,
+    key: str = "id",
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    pause: float = BACKFILL_PAUSE_SECONDS,
+    report_every: float = BACKFILL_REPORT_SECONDS,
+    dry_run: Optional[bool] = None,
+) -> Optional[dict]:
+    """UPDATE a large table in short, separately committed batches
+
+        backfill("users", "email_lower = lower(email)", where="email_lower IS NULL")
+
+    Rows are walked in `key` order (an indexed integer key), `batch_size` at
+    a time, each batch committed on its own so locks are held briefly and
+    replicas keep up; `pause` seconds between batches leaves room for the
+    application's own writes. Progress is logged every `report_every`
+    seconds and checkpointed in PROGRESS_TABLE under `name`, so re-running
+    an interrupted migration resumes after the last committed batch.
+
+    The update must be idempotent (a `where` that excludes already-done rows
+    is the usual way), since the batch in flight when a run is interrupted
+    is repeated. In a dry run nothing is changed and an estimate is returned.
+    """
+    migration_context = op.get_context()
+    if _dry_run(dry_run):
+        estimate = estimate_backfill(table_name, set_clause, where, key, batch_size, pause)
+        logger.info(
+            "dry run: backfill of %s would update ~%d rows in %d batches, about %s",
+            table_name, estimate["rows"], estimate["batches"], _format_seconds(estimate["seconds"]),
+        )
+        return estimate
+
+    statement = _update_statement(table_name, set_clause, where, key)
+    if migration_context.as_sql:
+        # Offline SQL cannot loop over result sets; emit one statement
+        logger.warning("backfill of %s is not batched in --sql mode", table_name)
+        op.execute(f"UPDATE {table_name} SET {set_clause}" + (f" WHERE {where}" if where else ""))
+        return None
+
+    name = name or f"{table_name}: {set_clause}"[:255]
+    with migration_context.autocommit_block():
+        bind = op.get_bind()
+        checkpoint = _load_checkpoint(bind, name)
+        low, high = bind.execute(sa.text(f"SELECT min({key}), max({key}) FROM {table_name}")).first()
+        if low is None:
+            return None
+        after, rows_done = (checkpoint.last_key, checkpoint.rows_done) if checkpoint else (low - 1, 0)
+        if checkpoint:
+            logger.info("resuming backfill of %s after %s=%s", table_name, key, after)
+
+        resumed_at, start = after, time.perf_counter()
+        last_report = start
+        while True:
+            boundary = _next_boundary(bind, table_name, key, after, batch_size)
+            if boundary is None:
+                break
+            rows_done += bind.execute(statement, {"lo": after, "hi": boundary}).rowcount
+            after = boundary
+            _save_checkpoint(bind, name, after, rows_done)
+
+            now = time.perf_counter()
+            if now - last_report >= report_every:
+                last_report = now
+                done = (after - low + 1) / max(high - low + 1, 1)
+                rate = (after - resumed_at) / (now - start)
+                remaining = max(high - after, 0) / rate if rate else 0.0
+                logger.info(
+                    "backfill %s: %d rows updated, %.1f%% through, ETA %s",
+                    table_name, rows_done, min(done, 1.0) * 100, _format_seconds(remaining),
+                )
+            if pause:
+                time.sleep(pause)
+
+        bind.execute(sa.text(f"DELETE FROM {PROGRESS_TABLE} WHERE name = :name"), {"name": name})
+        logger.info(
+            "backfill of %s done: %d rows updated in %s",
+            table_name, rows_done, _format_seconds(time.perf_counter() - start),
+        )
+    return None
@@ -0,0 +1,82 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+from sqlalchemy import DateTime, select, text, tuple_
+
+from .cache import TTLCache
+from .exceptions import ValidationException
+from ..config import COUNT_CACHE_TTL
+
+
+class Page:
+    """One page of a keyset-paginated result"""
+
+    def __init__(self, items: list, next_cursor: Optional[str]):
+        self.items = items
+        self.next_cursor = next_cursor
+
+
+def encode_cursor(values: Sequence[Any], order: str) -> str:
+    """Opaque, URL-safe cursor pointing just after a row's sort key"""
+    payload = {
+        "o": order,
+        "k": [v.isoformat() if isinstance(v, datetime) else v for v in values],
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, columns: Sequence, order: str) -> List[Any]:
+    """Sort key values from a cursor made by `encode_cursor`"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        values = payload["k"]
+        if payload["o"] != order or len(values) != len(columns):
+            raise ValueError("cursor does not match ordering")
+        return [
+            datetime.fromisoformat(v) if isinstance(col.type, DateTime) else v
+            for col, v in zip(columns, values)
+        ]
+    except (ValueError, KeyError, TypeError):
+        raise ValidationException("Invalid pagination cursor")
+
+
+def keyset_select(entity, columns: Sequence, order: str, limit: int, cursor: Optional[str] = None):
+    """SELECT for the page after `cursor`, fetching one extra row to detect more
+
+    `entity` is a model, or a list of columns to fetch plain rows.
+    """
+    entities = entity if isinstance(entity, (list, tuple)) else [entity]
+    stmt = select(*entities).order_by(*columns).limit(limit + 1)
+    if cursor:
+        values = decode_cursor(cursor, columns, order)
+        if len(columns) == 1:
+            stmt = stmt.where(columns[0] > values[0])
+        else:
+            stmt = stmt.where(tuple_(*columns) > tuple_(*values))
+    return stmt
+
+
+def build_page(rows: list, columns: Sequence, order: str, limit: int) -> Page:
+    """Trim the look-ahead row and derive the next cursor"""
+    if len(rows) <= limit:
+        return Page(rows, None)
+    items = rows[:limit]
+    last = items[-1]
+    return Page(items, encode_cursor([getattr(last, col.key) for col in columns], order))
+
+
+# Exact counts per table, reused across requests for COUNT_CACHE_TTL seconds
+count_cache = TTLCache(maxsize=256, ttl=COUNT_CACHE_TTL)
+
+_PG_ESTIMATE = text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)")
+
+
+def estimate_count_statement(dialect_name: str):
+    """Planner row estimate where the database keeps one, else None"""
+    if dialect_name == "postgresql":
+        return _PG_ESTIMATE
+    return None
@@ -0,0 +1,276 @@
+import math
+import time
+from typing import Dict, Optional
+
+from .cache import TTLCache, get_redis
+from .exceptions import RateLimitException, ServiceUnavailableException
+from ..config import (
+    REDIS_URL,
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_KEYS,
+    RATE_LIMIT_LOGIN_IP_PER_MINUTE,
+    RATE_LIMIT_LOGIN_IP_BURST,
+    RATE_LIMIT_LOGIN_ACCOUNT,
+    RATE_LIMIT_LOGIN_ACCOUNT_WINDOW,
+    RATE_LIMIT_REGISTER_IP,
+    RATE_LIMIT_REGISTER_IP_WINDOW,
+    AUTH_MAX_CONCURRENT,
+)
+
+
+class RateLimitResult:
+    """Outcome of one rate limit check"""
+
+    __slots__ = ("allowed", "remaining", "retry_after")
+
+    def __init__(self, allowed: bool, remaining: float, retry_after: float = 0.0):
+        self.allowed = allowed
+        self.remaining = remaining
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Allows bursts of `capacity`, refilled at `rate` requests per second"""
+
+    algorithm = "token_bucket"
+
+    def __init__(self, name: str, rate: float, capacity: int):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+
+    @classmethod
+    def per_minute(cls, name: str, per_minute: int, burst: int) -> "TokenBucket":
+        return cls(name, per_minute / 60, burst)
+
+    @property
+    def ttl(self) -> float:
+        """Seconds until an untouched bucket is full again"""
+        return self.capacity / self.rate
+
+
+class SlidingWindow:
+    """At most `limit` requests in any `window` seconds
+
+    Approximated from the counts of the current and previous fixed windows,
+    weighting the previous one by how much of it still overlaps. Constant
+    memory per key, unlike a log of request timestamps.
+    """
+
+    algorithm = "sliding_window"
+
+    def __init__(self, name: str, limit: int, window: float):
+        self.name = name
+        self.limit = limit
+        self.window = window
+
+
+def _window_result(rule: SlidingWindow, previous: int, current: int, elapsed: float) -> RateLimitResult:
+    estimate = previous * (1 - elapsed / rule.window) + current
+    if estimate <= rule.limit:
+        return RateLimitResult(True, rule.limit - estimate)
+    until_next = rule.window - elapsed
+    if current > rule.limit or not previous:
+        return RateLimitResult(False, 0, until_next)
+    # Wait for the previous window's weight to decay enough
+    return RateLimitResult(False, 0, min(until_next, (estimate - rule.limit) / previous * rule.window))
+
+
+class MemoryRateLimitBackend:
+    """Per-process counters; each worker enforces its own limits
+
+    Bounded by an LRU, so spraying many keys evicts the oldest rather than
+    growing memory. Operations never await, so they are atomic on the event loop.
+    """
+
+    def __init__(self, maxsize: int = RATE_LIMIT_KEYS):
+        self.state = TTLCache(maxsize=maxsize, ttl=0)
+
+    async def token_bucket(self, rule: TokenBucket, key: str, cost: int = 1) -> RateLimitResult:
+        now = time.monotonic()
+        entry = self.state.get(key)
+        tokens, stamp = entry if entry is not None else (rule.capacity, now)
+        tokens = min(rule.capacity, tokens + (now - stamp) * rule.rate)
+        if tokens >= cost:
+            tokens -= cost
+            result = RateLimitResult(True, tokens)
+        else:
+            result = RateLimitResult(False, tokens, (cost - tokens) / rule.rate)
+        self.state.set(key, (tokens, now), ttl=rule.ttl)
+        return result
+
+    async def sliding_window(self, rule: SlidingWindow, key: str) -> RateLimitResult:
+        now = time.time()
+        index = int(now // rule.window)
+        entry = self.state.get(key)
+        if entry is None or entry[0] < index - 1:
+            previous, current = 0, 0
+        elif entry[0] == index - 1:
+            previous, current = entry[2], 0
+        else:
+            previous, current = entry[1], entry[2]
+        # Denied attempts count too, so a client hammering the limit stays blocked
+        current += 1
+        self.state.set(key, (index, previous, current), ttl=2 * rule.window)
+        return _window_result(rule, previous, current, now - index * rule.window)
+
+
+# Refill and take in one round trip; Redis' clock keeps workers consistent
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local ttl_ms = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], ttl_ms)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+class RedisRateLimitBackend:
+    """Shared counters, so limits hold across all workers and hosts"""
+
+    key_prefix = "ratelimit:"
+
+    def __init__(self, redis=None):
+        self._redis = redis
+        self._script = None
+
+    @property
+    def redis(self):
+        return self._redis if self._redis is not None else get_redis()
+
+    def reset(self):
+        """Drop the script bound to a connection the parent process owns"""
+        self._script = None
+
+    async def token_bucket(self, rule: TokenBucket, key: str, cost: int = 1) -> RateLimitResult:
+        if self._script is None:
+            self._script = self.redis.register_script(_TOKEN_BUCKET_LUA)
+        allowed, tokens, retry_after = await self._script(
+            keys=[f"{self.key_prefix}{key}"],
+            args=[rule.rate, rule.capacity, cost, math.ceil(rule.ttl * 1000)],
+        )
+        return RateLimitResult(bool(allowed), float(tokens), float(retry_after))
+
+    async def sliding_window(self, rule: SlidingWindow, key: str) -> RateLimitResult:
+        now = time.time()
+        index = int(now // rule.window)
+        current_key = f"{self.key_prefix}{key}:{index}"
+        current = await self.redis.incr(current_key)
+        if current == 1:
+            await self.redis.expire(current_key, math.ceil(2 * rule.window))
+        previous = int(await self.redis.get(f"{self.key_prefix}{key}:{index - 1}") or 0)
+        return _window_result(rule, previous, current, now - index * rule.window)
+
+
+class RateLimiter:
+    """Checks rules against keys such as `ip:1.2.3.4` or `account:alice@example.com`"""
+
+    def __init__(self, backend=None, enabled: bool = RATE_LIMIT_ENABLED):
+        self._backend = backend
+        self.enabled = enabled
+        self.allowed: Dict[str, int] = {}
+        self.denied: Dict[str, int] = {}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = RedisRateLimitBackend() if REDIS_URL else MemoryRateLimitBackend()
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend):
+        self._backend = backend
+
+    async def hit(self, rule, key: str) -> RateLimitResult:
+        """Count one request against `rule` for `key`"""
+        full_key = f"{rule.name}:{key}"
+        if rule.algorithm == "token_bucket":
+            result = await self.backend.token_bucket(rule, full_key)
+        else:
+            result = await self.backend.sliding_window(rule, full_key)
+        counts = self.allowed if result.allowed else self.denied
+        counts[rule.name] = counts.get(rule.name, 0) + 1
+        return result
+
+    async def check(self, rule, key: Optional[str]):
+        """Raise RateLimitException (429) when `key` is over `rule`"""
+        if not self.enabled or not key:
+            return
+        result = await self.hit(rule, key)
+        if not result.allowed:
+            raise RateLimitException(retry_after=result.retry_after)
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "allowed": dict(self.allowed), "denied": dict(self.denied)}
+
+
+rate_limiter = RateLimiter()
+
+# Bursty per-IP allowance for logins, plus a per-account cap that holds
+# however many IPs a credential-stuffing run is spread across
+LOGIN_IP_RULE = TokenBucket.per_minute("login_ip", RATE_LIMIT_LOGIN_IP_PER_MINUTE, RATE_LIMIT_LOGIN_IP_BURST)
+LOGIN_ACCOUNT_RULE = SlidingWindow("login_account", RATE_LIMIT_LOGIN_ACCOUNT, RATE_LIMIT_LOGIN_ACCOUNT_WINDOW)
+REGISTER_IP_RULE = SlidingWindow("register_ip", RATE_LIMIT_REGISTER_IP, RATE_LIMIT_REGISTER_IP_WINDOW)
+
+
+def client_ip(request) -> Optional[str]:
+    """Peer address (already the forwarded client when proxy headers are trusted)"""
+    return request.client.host if request.client else None
+
+
+class ConcurrencyLimiter:
+    """Admission control: sheds requests with 503 once `limit` are in progress
+
+    Guards the password endpoints so that overload is turned away cheaply
+    at the door instead of queueing in front of the hashing pool. The
+    default limit (0) is half of the hashing pool's queue bound, read at
+    use time because the pool is resized per worker after fork.
+    """
+
+    def __init__(self, limit: int = AUTH_MAX_CONCURRENT, retry_after: int = 1):
+        self.limit = limit
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.shed = 0
+
+    @property
+    def effective_limit(self) -> int:
+        if self.limit:
+            return self.limit
+        from .hashing import password_hasher
+        return max(1, password_hasher.max_pending // 2)
+
+    async def __aenter__(self):
+        if self.in_flight >= self.effective_limit:
+            self.shed += 1
+            raise ServiceUnavailableException(
+                "Too many concurrent authentication requests, retry shortly",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {"limit": self.effective_limit, "in_flight": self.in_flight, "shed_total": self.shed}
+
+
+auth_concurrency = ConcurrencyLimiter()
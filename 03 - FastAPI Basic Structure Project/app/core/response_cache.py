@@ -0,0 +1,341 @@
+import asyncio
+import functools
+import hashlib
+import itertools
+import logging
+import secrets
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import orjson
+from fastapi import Request, Response
+
+from .cache import TTLCache, get_redis
+from .db_routing import use_primary
+from .http_cache import is_not_modified, not_modified
+from ..config import (
+    REDIS_URL,
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_ALLOW_LOCAL,
+    RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_LOCK_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+# Response headers stored alongside the body
+_STORED_HEADERS = ("content-type", "etag", "last-modified", "cache-control", "vary")
+
+
+class MemoryCacheBackend:
+    """Per-process backend; invalidation only reaches this worker
+
+    Tag versions are kept in a bounded LRU too (one tag per record would
+    otherwise grow forever). A tag that is missing, whether never seen or
+    evicted, is given a fresh version, so entries built under an evicted
+    tag no longer match and are recomputed.
+    """
+
+    # Tags outnumber entries (a list entry and each record carry their own)
+    tags_per_entry = 4
+    # Tag versions must outlive every entry built under them
+    tag_ttl = 86400
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self.entries = TTLCache(maxsize=maxsize, ttl=RESPONSE_CACHE_TTL)
+        self._tags = TTLCache(maxsize=maxsize * self.tags_per_entry, ttl=self.tag_ttl)
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[dict]:
+        return self.entries.get(key)
+
+    async def set(self, key: str, entry: dict, ttl: int):
+        self.entries.set(key, entry, ttl=ttl)
+
+    async def tag_versions(self, tags: List[str]) -> Dict[str, int]:
+        versions = {}
+        with self._lock:
+            for tag in tags:
+                version = self._tags.get(tag)
+                if version is None:
+                    version = next(self._counter)
+                    self._tags.set(tag, version)
+                versions[tag] = version
+        return versions
+
+    async def bump(self, tags: Iterable[str]):
+        self.bump_sync(tags)
+
+    def bump_sync(self, tags: Iterable[str]):
+        with self._lock:
+            for tag in tags:
+                self._tags.set(tag, next(self._counter))
+
+    async def acquire(self, key: str, timeout: float) -> Optional[str]:
+        # Single-flight in ResponseCache already covers one process
+        return "local"
+
+    async def release(self, key: str, token: str):
+        pass
+
+
+# Delete the lock only if it still holds our token: after a build outlives the
+# lock's TTL, the key may belong to another worker
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisCacheBackend:
+    """Shared backend; entries and tag versions live in Redis
+
+    Invalidation bumps a per-tag counter with INCR. Entries remember the
+    counters they were built under and are ignored once any has moved, so
+    invalidating a tag never has to find the keys that carry it.
+    """
+
+    key_prefix = "respcache:"
+    # Tag counters must outlive every entry built under them
+    tag_ttl = 86400
+
+    def __init__(self, redis=None, url: str = REDIS_URL):
+        self._redis = redis
+        self._sync_redis = None
+        self._release_script = None
+        self.url = url
+
+    @property
+    def redis(self):
+        return self._redis if self._redis is not None else get_redis()
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.key_prefix}tag:{tag}"
+
+    async def get(self, key: str) -> Optional[dict]:
+        raw = await self.redis.get(self.key_prefix + key)
+        return orjson.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, entry: dict, ttl: int):
+        await self.redis.set(self.key_prefix + key, orjson.dumps(entry), ex=ttl)
+
+    async def tag_versions(self, tags: List[str]) -> Dict[str, int]:
+        if not tags:
+            return {}
+        values = await self.redis.mget([self._tag_key(tag) for tag in tags])
+        return {tag: int(value or 0) for tag, value in zip(tags, values)}
+
+    async def bump(self, tags: Iterable[str]):
+        for tag in tags:
+            await self.redis.incr(self._tag_key(tag))
+            await self.redis.expire(self._tag_key(tag), self.tag_ttl)
+
+    def bump_sync(self, tags: Iterable[str]):
+        """For the sync services, which have no event loop to await on"""
+        if self._sync_redis is None:
+            import redis
+            self._sync_redis = redis.Redis.from_url(self.url)
+        for tag in tags:
+            self._sync_redis.incr(self._tag_key(tag))
+            self._sync_redis.expire(self._tag_key(tag), self.tag_ttl)
+
+    def reset(self):
+        """Drop the sync connection and script, which must not be shared with a forked child"""
+        self._sync_redis = None
+        self._release_script = None
+
+    async def acquire(self, key: str, timeout: float) -> Optional[str]:
+        """Take the build lock for `key`; returns the token that releases it"""
+        token = secrets.token_hex(16)
+        lock_key = f"{self.key_prefix}lock:{key}"
+        if await self.redis.set(lock_key, token, ex=max(1, int(timeout)), nx=True):
+            return token
+        return None
+
+    async def release(self, key: str, token: str):
+        if self._release_script is None:
+            self._release_script = self.redis.register_script(_RELEASE_LOCK_LUA)
+        await self._release_script(keys=[f"{self.key_prefix}lock:{key}"], args=[token])
+
+
+class ResponseCache:
+    """Caches whole endpoint responses, keyed by request and tagged for invalidation
+
+    Concurrent misses for one key are collapsed: within a process the first
+    request computes and the rest await its result; across processes (Redis
+    backend) a short lock makes other workers poll for the entry instead of
+    recomputing it.
+    """
+
+    def __init__(
+        self, backend=None, enabled: bool = RESPONSE_CACHE_ENABLED, allow_local: bool = RESPONSE_CACHE_ALLOW_LOCAL
+    ):
+        self._backend = backend
+        self.enabled = enabled
+        self.allow_local = allow_local
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = RedisCacheBackend() if REDIS_URL else MemoryCacheBackend()
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend):
+        self._backend = backend
+
+    async def _lookup(self, key: str) -> Optional[dict]:
+        entry = await self.backend.get(key)
+        if entry is None:
+            return None
+        current = await self.backend.tag_versions(list(entry["t"]))
+        if current != entry["t"]:
+            return None
+        return entry
+
+    async def _build(self, key: str, tags: List[str], ttl: int, compute: Callable) -> Union[dict, Response]:
+        versions = await self.backend.tag_versions(tags)
+        # A lagging replica could return rows from before the write that bumped
+        # these versions, and the stale body would then be cached as current
+        use_primary()
+        response = await compute()
+        if not isinstance(response, Response) or response.status_code != 200:
+            return response
+        entry = {
+            "s": response.status_code,
+            "h": {k: v for k, v in response.headers.items() if k in _STORED_HEADERS},
+            "b": response.body.decode("latin-1"),
+            # Versions read before computing, so a concurrent write invalidates this entry
+            "t": versions,
+        }
+        await self.backend.set(key, entry, ttl)
+        return entry
+
+    async def get_or_compute(self, key: str, tags: List[str], ttl: int, compute: Callable):
+        """Cached entry for `key`, or the result of `compute()` (cached if a 200 Response)"""
+        entry = await self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            entry = await asyncio.shield(inflight)
+            if entry is not None:
+                return entry
+            # The leader produced nothing cacheable (error, 404, 304); compute our own
+            return await compute()
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        result = None
+        try:
+            result = await self._compute_once(key, tags, ttl, compute)
+            return result
+        finally:
+            future.set_result(result if isinstance(result, dict) else None)
+            del self._inflight[key]
+
+    async def _compute_once(self, key: str, tags: List[str], ttl: int, compute: Callable):
+        token = await self.backend.acquire(key, RESPONSE_CACHE_LOCK_TIMEOUT)
+        if token is not None:
+            try:
+                return await self._build(key, tags, ttl, compute)
+            finally:
+                await self.backend.release(key, token)
+        # Another worker is computing it; wait briefly for its entry
+        deadline = time.monotonic() + RESPONSE_CACHE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            entry = await self._lookup(key)
+            if entry is not None:
+                return entry
+        return await self._build(key, tags, ttl, compute)
+
+    async def invalidate(self, tags: Iterable[str]):
+        if self.enabled:
+            await self.backend.bump(tags)
+
+    def invalidate_sync(self, tags: Iterable[str]):
+        if self.enabled:
+            self.backend.bump_sync(tags)
+
+    def disable_if_unshared(self, workers: int) -> bool:
+        """Turn the cache off when `workers` processes would each keep their own copy
+
+        Invalidations do not reach other workers' in-process entries, so they
+        would keep serving stale responses for up to their TTL. Returns True
+        when the cache was disabled.
+        """
+        if not self.enabled or workers <= 1 or self.allow_local:
+            return False
+        if not isinstance(self.backend, MemoryCacheBackend):
+            return False
+        logger.warning(
+            "Response cache disabled: %d workers without REDIS_URL would serve stale entries; "
+            "set REDIS_URL, or RESPONSE_CACHE_ALLOW_LOCAL=True to accept up to %ds of staleness",
+            workers, RESPONSE_CACHE_TTL,
+        )
+        self.enabled = False
+        return True
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "hits": self.hits, "misses": self.misses}
+
+
+response_cache = ResponseCache()
+
+
+def _cache_key(request: Request, user_id: Optional[int]) -> str:
+    query = "&".join(sorted(request.url.query.split("&"))) if request.url.query else ""
+    raw = f"{request.method}:{request.url.path}?{query}:u={user_id if user_id is not None else '*'}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _to_response(request: Request, entry: Union[dict, Response]) -> Response:
+    if isinstance(entry, Response):
+        return entry
+    headers = entry["h"]
+    etag = headers.get("etag")
+    if etag and is_not_modified(request, etag, None):
+        return not_modified(etag, None, headers.get("cache-control", "no-cache"))
+    return Response(content=entry["b"].encode("latin-1"), status_code=entry["s"], headers=headers)
+
+
+def cache_response(
+    tags: Callable[..., List[str]],
+    ttl: int = RESPONSE_CACHE_TTL,
+    vary_on_user: bool = True,
+):
+    """Cache a GET endpoint's successful responses
+
+    The endpoint must accept `request: Request` and, when `vary_on_user`
+    is set, `current_user`. `tags` receives the endpoint's keyword
+    arguments and returns the tags that invalidate the entry, e.g.
+    `lambda user_id, **_: ["users:" + str(user_id)]`. Dependencies (auth
+    included) still run on every request; only the endpoint body is skipped
+    on a hit.
+    """
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            request: Request = kwargs["request"]
+            if not response_cache.enabled:
+                return await endpoint(*args, **kwargs)
+            user = kwargs.get("current_user") if vary_on_user else None
+            key = _cache_key(request, getattr(user, "id", None))
+            entry = await response_cache.get_or_compute(
+                key, tags(**kwargs), ttl, lambda: endpoint(*args, **kwargs)
+            )
+            return _to_response(request, entry)
+        return wrapper
+    return decorator
@@ -0,0 +1,150 @@
+import re
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import DDL, and_, event, or_, select, text
+
+from ..config import SEARCH_MAX_TERMS
+
+SEARCH_COLUMNS = ("username", "email", "full_name", "bio")
+
+# Relative weight of a match in each column (FTS5 bm25 weights)
+_BM25_WEIGHTS = "10.0, 10.0, 5.0, 1.0"
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        username, email, full_name, bio,
+        content='users', content_rowid='id', tokenize='unicode61', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts(rowid, username, email, full_name, bio)
+        VALUES (new.id, new.username, new.email, new.full_name, new.bio);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, username, email, full_name, bio)
+        VALUES ('delete', old.id, old.username, old.email, old.full_name, old.bio);
+    END""",
+    # Only the indexed columns; password and timestamp updates skip the index
+    """CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF username, email, full_name, bio
+    ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, username, email, full_name, bio)
+        VALUES ('delete', old.id, old.username, old.email, old.full_name, old.bio);
+        INSERT INTO users_fts(rowid, username, email, full_name, bio)
+        VALUES (new.id, new.username, new.email, new.full_name, new.bio);
+    END""",
+]
+SQLITE_REBUILD = "INSERT INTO users_fts(users_fts) VALUES ('rebuild')"
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS users_fts_update",
+    "DROP TRIGGER IF EXISTS users_fts_delete",
+    "DROP TRIGGER IF EXISTS users_fts_insert",
+    "DROP TABLE IF EXISTS users_fts",
+]
+
+# Must match the expression in search queries exactly for the index to be used
+_PG_VECTOR = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(username, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(full_name, '')), 'B') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(bio, '')), 'C')"
+)
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_users_search_vector ON users USING gin (({_PG_VECTOR}))",
+    "CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON users USING gin (username gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (email gin_trgm_ops)",
+]
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS ix_users_email_trgm",
+    "DROP INDEX IF EXISTS ix_users_username_trgm",
+    "DROP INDEX IF EXISTS ix_users_search_vector",
+]
+
+
+def attach_search_ddl(table):
+    """Create the search index along with `table` under metadata.create_all"""
+    for statement in SQLITE_DDL:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    for statement in POSTGRES_DDL:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+    for statement in SQLITE_DROP:
+        event.listen(table, "before_drop", DDL(statement).execute_if(dialect="sqlite"))
+
+
+def search_terms(q: str) -> List[str]:
+    """Lower-cased words of a query, at most SEARCH_MAX_TERMS"""
+    return re.findall(r"[^\W_]+", q.lower())[:SEARCH_MAX_TERMS]
+
+
+def _like_pattern(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _select_list(fields: Sequence[str]) -> str:
+    return ", ".join(f"users.{name}" for name in fields)
+
+
+def _sqlite_search(fields, q, terms, limit, offset):
+    # Every term must match, each as a word prefix. Ranking and paging happen
+    # in the FTS table; only the page's rows are joined to users.
+    match = " ".join(f'"{term}"*' for term in terms)
+    stmt = text(
+        f"SELECT {_select_list(fields)} FROM users JOIN ("
+        f"SELECT rowid, bm25(users_fts, {_BM25_WEIGHTS}) AS score FROM users_fts "
+        f"WHERE users_fts MATCH :match ORDER BY score, rowid LIMIT :limit OFFSET :offset"
+        f") AS hits ON users.id = hits.rowid ORDER BY hits.score, users.id"
+    )
+    return stmt, {"match": match, "limit": limit, "offset": offset}
+
+
+def _postgres_search(fields, q, terms, limit, offset):
+    tsquery = " & ".join(f"{term}:*" for term in terms)
+    stmt = text(
+        f"SELECT {_select_list(fields)} FROM users "
+        f"WHERE ({_PG_VECTOR}) @@ to_tsquery('simple'::regconfig, :tsquery) "
+        f"OR username ILIKE :pattern OR email ILIKE :pattern "
+        f"ORDER BY ts_rank_cd(({_PG_VECTOR}), to_tsquery('simple'::regconfig, :tsquery)) "
+        f"+ greatest(similarity(username, :q), similarity(email, :q)) DESC, users.id "
+        f"LIMIT :limit OFFSET :offset"
+    )
+    return stmt, {
+        "tsquery": tsquery, "pattern": _like_pattern(q), "q": q, "limit": limit, "offset": offset
+    }
+
+
+def scan_statement(model, fields: Sequence[str], terms: Sequence[str], limit: int, offset: int):
+    """Unindexed fallback: each term must appear in some column (ILIKE '%term%')"""
+    columns = [getattr(model, name) for name in SEARCH_COLUMNS]
+    condition = and_(*[
+        or_(*[column.ilike(_like_pattern(term), escape="\\") for column in columns])
+        for term in terms
+    ])
+    return (
+        select(*[getattr(model, name) for name in fields])
+        .where(condition)
+        .order_by(model.id)
+        .limit(limit)
+        .offset(offset)
+    )
+
+
+def search_statement(
+    dialect_name: str, model, fields: Sequence[str], q: str, limit: int, offset: int
+) -> Optional[Tuple[object, dict]]:
+    """Ranked search statement and its parameters, or None for a query with no words
+    
+    PostgreSQL: a weighted tsvector expression index answers word and
+    word-prefix queries (`ali smi` -> `ali:* & smi:*`), and trigram indexes
+    on username and email answer substring matches such as `@example.co`.
+    Both are ordinary indexes, so every write keeps them current.
+    
+    SQLite: an external-content FTS5 table over the same columns, kept in
+    sync with `users` by triggers. Other databases fall back to a scan.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return None
+    if dialect_name == "sqlite":
+        return _sqlite_search(fields, q, terms, limit, offset)
+    if dialect_name == "postgresql":
+        return _postgres_search(fields, q.strip(), terms, limit, offset)
+    return scan_statement(model, fields, terms, limit, offset), {}
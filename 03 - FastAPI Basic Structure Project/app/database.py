@@ -1,14 +1,80 @@
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-from .config import DATABASE_URL
+from .config import (
+    DATABASE_URL,
+    DATABASE_REPLICA_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+)
+from .core.db_metrics import register_engine, TimedQueuePool, TimedAsyncAdaptedQueuePool
+from .core.db_routing import RoutingAsyncSession, RoutingSession, route_for_method
+
+
+def get_async_database_url(url: str) -> str:
+    """Map a sync database URL onto its async driver"""
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+def get_engine_options(url: str, is_async: bool = False) -> dict:
+    """Pool settings from config; in-memory SQLite keeps its default pool"""
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith("sqlite:")):
+        return {}
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
 
 # Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+engine = create_engine(DATABASE_URL, **get_engine_options(DATABASE_URL))
+register_engine("sync", engine)
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create async engine used by the API endpoints
+ASYNC_DATABASE_URL = get_async_database_url(DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **get_engine_options(ASYNC_DATABASE_URL, is_async=True)
+)
+register_engine("async", async_engine.sync_engine)
+
+# Optional read replica, with pools of its own
+replica_engine = None
+async_replica_engine = None
+if DATABASE_REPLICA_URL:
+    replica_engine = create_engine(DATABASE_REPLICA_URL, **get_engine_options(DATABASE_REPLICA_URL))
+    register_engine("sync_replica", replica_engine)
+    ASYNC_DATABASE_REPLICA_URL = get_async_database_url(DATABASE_REPLICA_URL)
+    async_replica_engine = create_async_engine(
+        ASYNC_DATABASE_REPLICA_URL, **get_engine_options(ASYNC_DATABASE_REPLICA_URL, is_async=True)
+    )
+    register_engine("async_replica", async_replica_engine.sync_engine)
+
+# Session factories route reads to the replica (if any) and writes to the primary
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, primary=engine, replica=replica_engine
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    class_=RoutingAsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+    primary=async_engine.sync_engine,
+    replica=async_replica_engine.sync_engine if async_replica_engine is not None else None,
+)
 
 # Create Base class for models
 Base = declarative_base()
@@ -21,3 +87,47 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db(request: Request):
+    """Dependency to get async database session
+    
+    Requests that may write (anything but GET/HEAD/OPTIONS) read from the
+    primary as well, so read-modify-write flows never see replica lag.
+    """
+    route_for_method(request.method)
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_async_sessionmaker():
+    """Dependency for responses that open their own session while streaming"""
+    return AsyncSessionLocal
+
+
+def all_sync_engines() -> list:
+    """Every engine's sync core: primary and replica, sync and async"""
+    engines = [engine, async_engine.sync_engine]
+    if replica_engine is not None:
+        engines += [replica_engine, async_replica_engine.sync_engine]
+    return engines
+
+
+def dispose_engines_after_fork():
+    """Give a forked worker its own connection pools
+
+    Connections inherited from the parent are dropped without being closed,
+    since the parent still owns their sockets.
+    """
+    for sync_engine in all_sync_engines():
+        sync_engine.dispose(close=False)
+
+
+async def close_engines():
+    """Close pooled connections on shutdown"""
+    await async_engine.dispose()
+    if async_replica_engine is not None:
+        await async_replica_engine.dispose()
+    engine.dispose()
+    if replica_engine is not None:
+        replica_engine.dispose()
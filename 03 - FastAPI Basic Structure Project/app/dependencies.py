@@ -1,44 +1,79 @@
-from typing import Generator
+from typing import Generator, Optional
 from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
-from jose import JWTError, jwt
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from jose import JWTError
 
-from .database import get_db
-from .config import SECRET_KEY, ALGORITHM
+from .database import get_async_db
+from .core.auth_cache import principal_cache, principal_to_dict, revocation_store, token_cache
+from .core.db_routing import route_for
 from .models import user
 User = user.User
 
 security = HTTPBearer()
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(security)
-) -> User:
-    """Get current authenticated user"""
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+async def get_token_payload(
+    token: HTTPAuthorizationCredentials = Depends(security)
+) -> dict:
+    """Claims of a valid, unrevoked access token
     
+    Also attributes the request to the token's user, so reads follow that
+    user's recent writes to the primary instead of a lagging replica.
+    """
     try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
+        payload = token_cache.decode(token.credentials)
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    # Refresh tokens are only accepted by the refresh endpoint
+    if payload.get("type", "access") != "access" or payload.get("sub") is None:
+        raise _credentials_exception()
+    jti = payload.get("jti")
+    if jti and await revocation_store.is_revoked(jti):
+        raise _credentials_exception()
+    await route_for(payload["sub"])
+    return payload
+
+
+async def load_principal(db: AsyncSession, email: str) -> Optional[User]:
+    """User for a token subject, from the principal cache or the database"""
+    cached = await principal_cache.get(email)
+    if cached is not None:
+        # Fresh detached instance per request; endpoints that modify it
+        # re-attach it to their own session
+        user = User(**cached)
+        make_transient_to_detached(user)
+        return user
     
-    user = db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalars().first()
+    if user is not None:
+        await principal_cache.set(email, principal_to_dict(user))
+    return user
+
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_async_db),
+    payload: dict = Depends(get_token_payload)
+) -> User:
+    """Get current authenticated user"""
+    user = await load_principal(db, payload["sub"])
     if user is None:
-        raise credentials_exception
-    
+        raise _credentials_exception()
     return user
 
 
-def get_current_active_user(
+async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
     """Get current active user"""
@@ -1,10 +1,22 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import time
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from .config import PROJECT_NAME, BACKEND_CORS_ORIGINS, API_V1_STR
+from .config import (
+    PROJECT_NAME, BACKEND_CORS_ORIGINS, API_V1_STR, SERVER_HOST, SERVER_PORT, COMPRESSION_ENABLED
+)
+from .database import close_engines
 from .core.exceptions import CustomException
+from .core.compression import CompressionMiddleware, compression_metrics
+from .core.instrumentation import (
+    InstrumentationMiddleware, http_metrics, start_access_log, stop_access_log
+)
+from .core.db_metrics import db_metrics, pool_status
+from .core.db_routing import sticky_primary
+from .core.hashing import password_hasher
+from .core.response_cache import response_cache
+from .core.rate_limit import rate_limiter, auth_concurrency
+from .core.auth_cache import revocation_store
 from .api.v1.api import api_router
 
 # Create FastAPI instance
@@ -24,15 +36,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip / br / zstd negotiated from Accept-Encoding; streamed bodies are compressed
+# chunk by chunk. Inside the instrumentation so its timings include compression.
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
 
-# Add timing middleware
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
+# Latency histograms, X-Process-Time / X-DB-* headers and sampled access logs.
+# Added last so it is outermost and times the whole stack.
+app.add_middleware(InstrumentationMiddleware)
 
 
 # Custom exception handler
@@ -40,7 +51,8 @@ async def add_process_time_header(request: Request, call_next):
 async def custom_exception_handler(request: Request, exc: CustomException):
     return JSONResponse(
         status_code=exc.status_code,
-        content={"error": exc.error_type, "message": exc.message, "detail": exc.detail}
+        content={"error": exc.error_type, "message": exc.message, "detail": exc.detail},
+        headers=exc.headers
     )
 
 
@@ -60,7 +72,51 @@ async def health_check():
     return {"status": "healthy", "message": "API is running"}
 
 
+@app.get("/metrics")
+async def metrics(format: str = "json"):
+    """HTTP, compression, database, password hashing, caching, rate limit and revocation metrics for this worker process
+
+    `?format=prometheus` returns the HTTP metrics in Prometheus text format.
+    """
+    if format == "prometheus":
+        return PlainTextResponse(http_metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+    return {
+        "http": http_metrics.snapshot(),
+        "compression": compression_metrics.snapshot(),
+        "db": {**db_metrics.snapshot(), "pools": pool_status(), "replica_routing": sticky_primary.stats()},
+        "hashing": password_hasher.snapshot(),
+        "response_cache": response_cache.stats(),
+        "rate_limit": {**rate_limiter.stats(), "auth_concurrency": auth_concurrency.stats()},
+        "revocation": revocation_store.stats(),
+    }
+
+
+@app.on_event("startup")
+def startup_access_log():
+    """Start the access log writer thread"""
+    start_access_log()
+
+
+@app.on_event("shutdown")
+def shutdown_hashing_pool():
+    """Stop hashing worker processes"""
+    password_hasher.shutdown()
+
+
+@app.on_event("shutdown")
+async def shutdown_database():
+    """Close pooled database connections once in-flight requests have drained"""
+    await close_engines()
+
+
+@app.on_event("shutdown")
+def shutdown_access_log():
+    """Flush queued access log records"""
+    stop_access_log()
+
+
 if __name__ == "__main__":
     import uvicorn
-    # Use port 8080 as default to avoid Windows port 8000 issues
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    # Single-process development server; use `python -m app.server` in production.
+    # On Windows, set SERVER_PORT=8080 if port 8000 is reserved.
+    uvicorn.run(app, host=SERVER_HOST, port=SERVER_PORT)
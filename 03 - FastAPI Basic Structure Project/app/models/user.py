@@ -1,13 +1,18 @@
-from sqlalchemy import Boolean, Column, String, Text, Integer, DateTime
+from sqlalchemy import Boolean, Column, String, Text, Integer, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 from ..database import Base
+from ..core.search import attach_search_ddl
 
 
 class User(Base):
     """User model"""
     __tablename__ = "users"
+    __table_args__ = (
+        # Keyset pagination ordered by creation time
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -23,3 +28,7 @@ class User(Base):
 
     def __repr__(self):
         return f"<User(id={self.id}, email={self.email}, username={self.username})>"
+
+
+# Full-text search index (FTS5 table and triggers, or PostgreSQL GIN indexes)
+attach_search_ddl(User.__table__)
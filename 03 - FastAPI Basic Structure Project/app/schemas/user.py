@@ -72,19 +72,52 @@ class User(BaseSchema, UserBase):
     pass
 
 
+# Response fields of User, in serialization order; lets endpoints select just these columns
+USER_FIELDS = tuple(User.model_fields)
+
+
 class UserList(BaseModel):
     """Schema for paginated user list"""
     users: List[User]
     total: int
-    page: int
+    page: Optional[int] = None
     per_page: int
     pages: int
+    next_cursor: Optional[str] = None
+    total_exact: bool = True
+
+
+class UserSearchResults(BaseModel):
+    """Schema for a page of ranked search results"""
+    users: List[User]
+    limit: int
+    offset: int
+    next_offset: Optional[int] = None
+
+
+class BulkImportError(BaseModel):
+    """A rejected row in a bulk import"""
+    row: int
+    error: str
+
+
+class BulkImportResult(BaseModel):
+    """Outcome of a bulk user import"""
+    created: int
+    failed: int
+    errors: List[BulkImportError]
 
 
 class Token(BaseModel):
     """Token schema"""
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshTokenRequest(BaseModel):
+    """Refresh token exchange / revocation request"""
+    refresh_token: str
 
 
 class TokenData(BaseModel):
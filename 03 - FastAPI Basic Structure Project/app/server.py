@@ -0,0 +1,100 @@
+"""
+Production server entry point
+
+    python -m app.server
+
+Runs gunicorn with uvicorn workers (uvloop + httptools) using the settings
+in gunicorn.conf.py: one worker per CPU, the app preloaded before forking,
+per-worker database pools, graceful drain on SIGTERM and request-count
+recycling. Where gunicorn is unavailable (Windows), falls back to uvicorn's
+own multi-process supervisor with the same worker count and limits.
+"""
+
+import os
+import sys
+
+from .config import (
+    HASH_WORKERS,
+    WEB_CONCURRENCY,
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_MAX_REQUESTS,
+    SERVER_GRACEFUL_TIMEOUT,
+    SERVER_KEEPALIVE,
+    SERVER_BACKLOG,
+    FORWARDED_ALLOW_IPS,
+)
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gunicorn.conf.py")
+
+
+def cpu_count() -> int:
+    """CPUs available to this process (respects affinity / container cpusets)"""
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count(configured: int = WEB_CONCURRENCY) -> int:
+    """Configured worker count, or one per CPU"""
+    return configured if configured > 0 else cpu_count()
+
+
+def after_fork():
+    """Reset per-process resources a forked worker must not share with the parent"""
+    from .core.cache import reset_redis
+    from .core.hashing import password_hasher
+    from .core.rate_limit import RedisRateLimitBackend, rate_limiter
+    from .core.response_cache import RedisCacheBackend, response_cache
+    from .database import dispose_engines_after_fork
+
+    dispose_engines_after_fork()
+    reset_redis()
+    # Unless pinned, split the CPUs between the API workers' hashing pools
+    # instead of giving every worker a process per CPU
+    hash_workers = None if HASH_WORKERS else max(1, cpu_count() // worker_count())
+    password_hasher.reset_after_fork(hash_workers)
+    if isinstance(response_cache._backend, RedisCacheBackend):
+        response_cache._backend.reset()
+    response_cache.disable_if_unshared(worker_count())
+    if isinstance(rate_limiter._backend, RedisRateLimitBackend):
+        rate_limiter._backend.reset()
+
+
+def run_uvicorn():
+    import uvicorn
+    from .core.response_cache import response_cache
+
+    # Workers are spawned fresh rather than forked, so they learn this
+    # through the environment instead of after_fork()
+    if response_cache.disable_if_unshared(worker_count()):
+        os.environ["RESPONSE_CACHE_ENABLED"] = "False"
+    uvicorn.run(
+        "app.main:app",
+        host=SERVER_HOST,
+        port=SERVER_PORT,
+        workers=worker_count(),
+        loop="uvloop" if sys.platform != "win32" else "asyncio",
+        http="httptools",
+        backlog=SERVER_BACKLOG,
+        timeout_keep_alive=SERVER_KEEPALIVE,
+        timeout_graceful_shutdown=SERVER_GRACEFUL_TIMEOUT,
+        limit_max_requests=SERVER_MAX_REQUESTS or None,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+    )
+
+
+def main():
+    try:
+        from gunicorn.app.wsgiapp import run
+    except ImportError:
+        run_uvicorn()
+        return
+    sys.argv = ["gunicorn", "--config", CONFIG_FILE, "app.main:app"]
+    run()
+
+
+if __name__ == "__main__":
+    main()
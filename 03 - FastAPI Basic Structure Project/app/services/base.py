@@ -1,32 +1,98 @@
-from typing import Generic, TypeVar, Type, Optional, List
-from sqlalchemy.orm import Session
+from typing import Generic, TypeVar, Type, Optional, List, Dict, Sequence, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only
 from sqlalchemy.ext.declarative import DeclarativeMeta
 
 from ..database import Base
+from ..core.db_errors import unique_violation
+from ..core.exceptions import ConflictException, ValidationException
+from ..core.response_cache import response_cache
+from ..core.pagination import Page, keyset_select, build_page, count_cache, estimate_count_statement
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType")
 UpdateSchemaType = TypeVar("UpdateSchemaType")
 
 
+def _keyset_columns(service, order: str) -> list:
+    """Model columns for a named keyset ordering"""
+    names = service.keyset_orders.get(order)
+    if names is None:
+        raise ValidationException(f"Unsupported ordering '{order}'")
+    return [getattr(service.model, name) for name in names]
+
+
+def _row_columns(service, fields: Sequence[str], key_columns: Sequence = ()) -> list:
+    """Columns to SELECT for `fields`, plus any sort key columns not among them"""
+    columns = [getattr(service.model, name) for name in fields]
+    return columns + [col for col in key_columns if col.key not in fields]
+
+
+def _projection(service, fields: Optional[Sequence[str]]) -> list:
+    """Loader options restricting ORM loads to `fields`; other attributes raise if touched"""
+    if fields is None:
+        return []
+    return [load_only(*[getattr(service.model, name) for name in fields], raiseload=True)]
+
+
+def _rows_to_dicts(rows, fields: Sequence[str]) -> List[dict]:
+    return [{name: row._mapping[name] for name in fields} for row in rows]
+
+
+def _conflict(service, exc: IntegrityError) -> ConflictException:
+    """ConflictException naming the unique column an INSERT/UPDATE collided on"""
+    name = unique_violation(exc)
+    if name:
+        for column, message in service.unique_conflicts.items():
+            # Column name (SQLite, PostgreSQL detail) or index name such as ix_users_email
+            if name == column or name.endswith(f"_{column}"):
+                return ConflictException(message)
+    return ConflictException()
+
+
 class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """Base service class with CRUD operations"""
     
+    # Orderings usable with get_page; each must end in a unique column
+    keyset_orders: Dict[str, Tuple[str, ...]] = {"id": ("id",)}
+    # Unique column -> message raised when a write violates it
+    unique_conflicts: Dict[str, str] = {}
+    
     def __init__(self, model: Type[ModelType]):
         self.model = model
     
-    def get(self, db: Session, id: int) -> Optional[ModelType]:
-        """Get a single record by ID"""
-        return db.query(self.model).filter(self.model.id == id).first()
+    @property
+    def cache_tag(self) -> str:
+        """Response cache tag covering every record (lists, counts)"""
+        return self.model.__tablename__
+    
+    def record_cache_tag(self, id: int) -> str:
+        """Response cache tag for one record"""
+        return f"{self.cache_tag}:{id}"
+    
+    def cache_tags(self, obj=None) -> List[str]:
+        """Tags to invalidate after writing `obj` (or an unknown set of records)"""
+        if obj is None:
+            return [self.cache_tag]
+        return [self.cache_tag, self.record_cache_tag(obj.id)]
+    
+    def get(self, db: Session, id: int, fields: Optional[Sequence[str]] = None) -> Optional[ModelType]:
+        """Get a single record by ID, loading only `fields` if given"""
+        query = db.query(self.model).options(*_projection(self, fields))
+        return query.filter(self.model.id == id).first()
     
     def get_multi(
         self, 
         db: Session, 
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None
     ) -> List[ModelType]:
-        """Get multiple records with pagination"""
-        return db.query(self.model).offset(skip).limit(limit).all()
+        """Get multiple records with pagination, loading only `fields` if given"""
+        query = db.query(self.model).options(*_projection(self, fields))
+        return query.offset(skip).limit(limit).all()
     
     def create(self, db: Session, obj_in: CreateSchemaType) -> ModelType:
         """Create a new record"""
@@ -39,6 +105,7 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        response_cache.invalidate_sync(self.cache_tags(db_obj))
         return db_obj
     
     def update(
@@ -59,16 +126,219 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        response_cache.invalidate_sync(self.cache_tags(db_obj))
         return db_obj
     
     def delete(self, db: Session, id: int) -> Optional[ModelType]:
         """Delete a record by ID"""
         obj = db.query(self.model).get(id)
         if obj:
+            tags = self.cache_tags(obj)
             db.delete(obj)
             db.commit()
+            response_cache.invalidate_sync(tags)
         return obj
     
     def count(self, db: Session) -> int:
         """Count total records"""
         return db.query(self.model).count()
+    
+    def get_page(
+        self, 
+        db: Session, 
+        limit: int = 100, 
+        cursor: Optional[str] = None, 
+        order: str = "id"
+    ) -> Page:
+        """Get the page after `cursor` using keyset pagination"""
+        columns = _keyset_columns(self, order)
+        stmt = keyset_select(self.model, columns, order, limit, cursor)
+        rows = list(db.execute(stmt).scalars().all())
+        return build_page(rows, columns, order, limit)
+    
+    def get_row(self, db: Session, id: int, fields: Sequence[str]) -> Optional[dict]:
+        """Selected columns of one record as a dict, without building an ORM object"""
+        stmt = select(*_row_columns(self, fields)).where(self.model.id == id)
+        row = db.execute(stmt).first()
+        return _rows_to_dicts([row], fields)[0] if row else None
+    
+    def get_version(self, db: Session, id: int) -> Optional[tuple]:
+        """(updated_at,) of a record via a primary-key lookup, or None if missing"""
+        return db.execute(select(self.model.updated_at).where(self.model.id == id)).first()
+    
+    def get_page_rows(
+        self, 
+        db: Session, 
+        fields: Sequence[str], 
+        limit: int = 100, 
+        cursor: Optional[str] = None, 
+        order: str = "id"
+    ) -> Page:
+        """Keyset page of selected columns as dicts, for serializing without ORM objects"""
+        columns = _keyset_columns(self, order)
+        stmt = keyset_select(_row_columns(self, fields, columns), columns, order, limit, cursor)
+        page = build_page(db.execute(stmt).all(), columns, order, limit)
+        page.items = _rows_to_dicts(page.items, fields)
+        return page
+    
+    def count_estimate(self, db: Session) -> int:
+        """Approximate record count: planner estimate or a briefly cached COUNT"""
+        table = self.model.__tablename__
+        stmt = estimate_count_statement(db.get_bind().dialect.name)
+        if stmt is not None:
+            estimate = db.execute(stmt, {"table": table}).scalar()
+            if estimate is not None and estimate >= 0:
+                return estimate
+        total = count_cache.get(table)
+        if total is None:
+            total = self.count(db)
+            count_cache.set(table, total)
+        return total
+
+
+class AsyncBaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    """Async base service class with CRUD operations"""
+    
+    # Orderings usable with get_page; each must end in a unique column
+    keyset_orders: Dict[str, Tuple[str, ...]] = {"id": ("id",)}
+    # Unique column -> message raised when a write violates it
+    unique_conflicts: Dict[str, str] = {}
+    
+    def __init__(self, model: Type[ModelType]):
+        self.model = model
+    
+    @property
+    def cache_tag(self) -> str:
+        """Response cache tag covering every record (lists, counts)"""
+        return self.model.__tablename__
+    
+    def record_cache_tag(self, id: int) -> str:
+        """Response cache tag for one record"""
+        return f"{self.cache_tag}:{id}"
+    
+    def cache_tags(self, obj=None) -> List[str]:
+        """Tags to invalidate after writing `obj` (or an unknown set of records)"""
+        if obj is None:
+            return [self.cache_tag]
+        return [self.cache_tag, self.record_cache_tag(obj.id)]
+    
+    async def get(
+        self, db: AsyncSession, id: int, fields: Optional[Sequence[str]] = None
+    ) -> Optional[ModelType]:
+        """Get a single record by ID, loading only `fields` if given"""
+        return await db.get(self.model, id, options=_projection(self, fields))
+    
+    async def get_multi(
+        self, 
+        db: AsyncSession, 
+        skip: int = 0, 
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[ModelType]:
+        """Get multiple records with pagination, loading only `fields` if given"""
+        stmt = select(self.model).options(*_projection(self, fields)).offset(skip).limit(limit)
+        result = await db.execute(stmt)
+        return list(result.scalars().all())
+    
+    async def create(self, db: AsyncSession, obj_in: CreateSchemaType) -> ModelType:
+        """Create a new record"""
+        if hasattr(obj_in, 'dict'):
+            obj_in_data = obj_in.dict()
+        else:
+            obj_in_data = obj_in
+        
+        db_obj = self.model(**obj_in_data)
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        await response_cache.invalidate(self.cache_tags(db_obj))
+        return db_obj
+    
+    async def update(
+        self, 
+        db: AsyncSession, 
+        db_obj: ModelType, 
+        obj_in: UpdateSchemaType
+    ) -> ModelType:
+        """Update an existing record"""
+        if hasattr(obj_in, 'dict'):
+            obj_data = obj_in.dict(exclude_unset=True)
+        else:
+            obj_data = obj_in
+        
+        for field, value in obj_data.items():
+            setattr(db_obj, field, value)
+        
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        await response_cache.invalidate(self.cache_tags(db_obj))
+        return db_obj
+    
+    async def delete(self, db: AsyncSession, id: int) -> Optional[ModelType]:
+        """Delete a record by ID"""
+        obj = await db.get(self.model, id)
+        if obj:
+            tags = self.cache_tags(obj)
+            await db.delete(obj)
+            await db.commit()
+            await response_cache.invalidate(tags)
+        return obj
+    
+    async def count(self, db: AsyncSession) -> int:
+        """Count total records"""
+        result = await db.execute(select(func.count()).select_from(self.model))
+        return result.scalar_one()
+    
+    async def get_page(
+        self, 
+        db: AsyncSession, 
+        limit: int = 100, 
+        cursor: Optional[str] = None, 
+        order: str = "id"
+    ) -> Page:
+        """Get the page after `cursor` using keyset pagination"""
+        columns = _keyset_columns(self, order)
+        stmt = keyset_select(self.model, columns, order, limit, cursor)
+        rows = list((await db.execute(stmt)).scalars().all())
+        return build_page(rows, columns, order, limit)
+    
+    async def get_row(self, db: AsyncSession, id: int, fields: Sequence[str]) -> Optional[dict]:
+        """Selected columns of one record as a dict, without building an ORM object"""
+        stmt = select(*_row_columns(self, fields)).where(self.model.id == id)
+        row = (await db.execute(stmt)).first()
+        return _rows_to_dicts([row], fields)[0] if row else None
+    
+    async def get_version(self, db: AsyncSession, id: int) -> Optional[tuple]:
+        """(updated_at,) of a record via a primary-key lookup, or None if missing"""
+        result = await db.execute(select(self.model.updated_at).where(self.model.id == id))
+        return result.first()
+    
+    async def get_page_rows(
+        self, 
+        db: AsyncSession, 
+        fields: Sequence[str], 
+        limit: int = 100, 
+        cursor: Optional[str] = None, 
+        order: str = "id"
+    ) -> Page:
+        """Keyset page of selected columns as dicts, for serializing without ORM objects"""
+        columns = _keyset_columns(self, order)
+        stmt = keyset_select(_row_columns(self, fields, columns), columns, order, limit, cursor)
+        page = build_page((await db.execute(stmt)).all(), columns, order, limit)
+        page.items = _rows_to_dicts(page.items, fields)
+        return page
+    
+    async def count_estimate(self, db: AsyncSession) -> int:
+        """Approximate record count: planner estimate or a briefly cached COUNT"""
+        table = self.model.__tablename__
+        stmt = estimate_count_statement(db.get_bind().dialect.name)
+        if stmt is not None:
+            estimate = (await db.execute(stmt, {"table": table})).scalar()
+            if estimate is not None and estimate >= 0:
+                return estimate
+        total = count_cache.get(table)
+        if total is None:
+            total = await self.count(db)
+            count_cache.set(table, total)
+        return total
@@ -1,16 +1,38 @@
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List, Sequence, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ..models.user import User
 from ..schemas.user import UserCreate, UserUpdate
 from ..core.security import get_password_hash, verify_password
-from ..core.exceptions import ConflictException, NotFoundException, AuthenticationException
-from .base import BaseService
+from ..core.hashing import password_hasher
+from ..core.auth_cache import principal_cache
+from ..core.response_cache import response_cache
+from ..core.exceptions import NotFoundException, AuthenticationException
+from ..core.search import search_statement
+from ..utils.bulk_io import RowError, batched
+from .base import BaseService, AsyncBaseService, _conflict, _projection, _rows_to_dicts
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+
+# Keyset orderings for user listings (backed by ix_users_id / ix_users_created_at_id)
+USER_KEYSET_ORDERS = {"id": ("id",), "created_at": ("created_at", "id")}
+USER_UNIQUE_CONFLICTS = {"email": "Email already registered", "username": "Username already taken"}
 
 
 class UserService(BaseService[User, UserCreate, UserUpdate]):
     """User service with authentication logic"""
     
+    keyset_orders = USER_KEYSET_ORDERS
+    unique_conflicts = USER_UNIQUE_CONFLICTS
+    
     def __init__(self):
         super().__init__(User)
     
@@ -23,38 +45,27 @@ class UserService(BaseService[User, UserCreate, UserUpdate]):
         return db.query(User).filter(User.username == username).first()
     
     def create(self, db: Session, user_in: UserCreate) -> User:
-        """Create a new user with hashed password"""
-        # Check if user already exists
-        if self.get_by_email(db, user_in.email):
-            raise ConflictException("Email already registered")
+        """Create a new user with hashed password
         
-        if self.get_by_username(db, user_in.username):
-            raise ConflictException("Username already taken")
-        
-        # Create user with hashed password
+        One INSERT ... RETURNING; the unique indexes on email and username
+        reject duplicates, so there is no check-then-insert race.
+        """
         user_data = user_in.dict()
         user_data["hashed_password"] = get_password_hash(user_data.pop("password"))
         
-        db_user = User(**user_data)
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        try:
+            db_user = db.execute(insert(User).values(**user_data).returning(User)).scalar_one()
+            db.commit()
+        except IntegrityError as e:
+            db.rollback()
+            raise _conflict(self, e) from e
+        response_cache.invalidate_sync(self.cache_tags(db_user))
         return db_user
     
     def update(self, db: Session, db_user: User, user_in: UserUpdate) -> User:
-        """Update user with validation"""
+        """Update user; email/username clashes surface from the unique indexes"""
         user_data = user_in.dict(exclude_unset=True)
         
-        # Check email uniqueness if updating email
-        if "email" in user_data and user_data["email"] != db_user.email:
-            if self.get_by_email(db, user_data["email"]):
-                raise ConflictException("Email already registered")
-        
-        # Check username uniqueness if updating username
-        if "username" in user_data and user_data["username"] != db_user.username:
-            if self.get_by_username(db, user_data["username"]):
-                raise ConflictException("Username already taken")
-        
         # Hash password if updating
         if "password" in user_data:
             user_data["hashed_password"] = get_password_hash(user_data.pop("password"))
@@ -63,8 +74,12 @@ class UserService(BaseService[User, UserCreate, UserUpdate]):
             setattr(db_user, field, value)
         
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        try:
+            db.commit()
+        except IntegrityError as e:
+            db.rollback()
+            raise _conflict(self, e) from e
+        response_cache.invalidate_sync(self.cache_tags(db_user))
         return db_user
     
     def authenticate(self, db: Session, email: str, password: str) -> Optional[User]:
@@ -90,8 +105,229 @@ class UserService(BaseService[User, UserCreate, UserUpdate]):
         db.add(user)
         db.commit()
         db.refresh(user)
+        response_cache.invalidate_sync(self.cache_tags(user))
+        return user
+
+
+class AsyncUserService(AsyncBaseService[User, UserCreate, UserUpdate]):
+    """Async user service with authentication logic
+
+    bcrypt hashing runs in the dedicated hashing process pool.
+    """
+    
+    keyset_orders = USER_KEYSET_ORDERS
+    unique_conflicts = USER_UNIQUE_CONFLICTS
+    
+    def __init__(self):
+        super().__init__(User)
+    
+    async def get_by_email(self, db: AsyncSession, email: str) -> Optional[User]:
+        """Get user by email"""
+        result = await db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
+    
+    async def get_by_username(self, db: AsyncSession, username: str) -> Optional[User]:
+        """Get user by username"""
+        result = await db.execute(select(User).where(User.username == username))
+        return result.scalars().first()
+    
+    async def create(self, db: AsyncSession, user_in: UserCreate) -> User:
+        """Create a new user with hashed password
+        
+        One INSERT ... RETURNING; the unique indexes on email and username
+        reject duplicates, so there is no check-then-insert race.
+        """
+        user_data = user_in.dict()
+        user_data["hashed_password"] = await password_hasher.hash(user_data.pop("password"))
+        
+        try:
+            result = await db.execute(insert(User).values(**user_data).returning(User))
+            db_user = result.scalar_one()
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            raise _conflict(self, e) from e
+        await response_cache.invalidate(self.cache_tags(db_user))
+        return db_user
+    
+    async def update(self, db: AsyncSession, db_user: User, user_in: UserUpdate) -> User:
+        """Update user; email/username clashes surface from the unique indexes"""
+        user_data = user_in.dict(exclude_unset=True)
+        
+        # Hash password if updating
+        if "password" in user_data:
+            user_data["hashed_password"] = await password_hasher.hash(user_data.pop("password"))
+        
+        old_email = db_user.email
+        for field, value in user_data.items():
+            setattr(db_user, field, value)
+        
+        db.add(db_user)
+        try:
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            raise _conflict(self, e) from e
+        await principal_cache.invalidate(old_email, db_user.email)
+        await response_cache.invalidate(self.cache_tags(db_user))
+        return db_user
+    
+    async def authenticate(self, db: AsyncSession, email: str, password: str) -> Optional[User]:
+        """Authenticate user by email and password"""
+        user = await self.get_by_email(db, email)
+        if not user:
+            return None
+        valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+        if not valid:
+            return None
+        if new_hash:
+            # Cost factor or scheme changed since this hash was made
+            user.hashed_password = new_hash
+            db.add(user)
+            await db.commit()
+            await response_cache.invalidate(self.cache_tags(user))
+        return user
+    
+    async def bulk_create(
+        self, db: AsyncSession, rows: List[Tuple[int, UserCreate]]
+    ) -> Tuple[int, List[dict]]:
+        """Insert a batch of users in one statement
+        
+        Returns the number created and an error per rejected row number.
+        """
+        errors = []
+        seen_emails, seen_usernames = set(), set()
+        accepted = []
+        for number, user_in in rows:
+            if user_in.email in seen_emails:
+                errors.append({"row": number, "error": "Email repeated in import"})
+            elif user_in.username in seen_usernames:
+                errors.append({"row": number, "error": "Username repeated in import"})
+            else:
+                seen_emails.add(user_in.email)
+                seen_usernames.add(user_in.username)
+                accepted.append((number, user_in))
+        if not accepted:
+            return 0, errors
+        
+        # One set-based uniqueness check for the whole batch
+        result = await db.execute(
+            select(User.email, User.username).where(
+                or_(User.email.in_(seen_emails), User.username.in_(seen_usernames))
+            )
+        )
+        taken = result.all()
+        taken_emails = {email for email, _ in taken}
+        taken_usernames = {username for _, username in taken}
+        new_users = []
+        for number, user_in in accepted:
+            if user_in.email in taken_emails:
+                errors.append({"row": number, "error": "Email already registered"})
+            elif user_in.username in taken_usernames:
+                errors.append({"row": number, "error": "Username already taken"})
+            else:
+                new_users.append((number, user_in))
+        if not new_users:
+            return 0, errors
+        
+        hashes = await password_hasher.hash_many([user_in.password for _, user_in in new_users])
+        values = []
+        for (number, user_in), hashed_password in zip(new_users, hashes):
+            user_data = user_in.dict()
+            user_data.pop("password")
+            user_data["hashed_password"] = hashed_password
+            values.append((number, user_data))
+        
+        try:
+            await db.execute(insert(User), [user_data for _, user_data in values])
+            await db.commit()
+            await response_cache.invalidate(self.cache_tags())
+            return len(values), errors
+        except IntegrityError:
+            await db.rollback()
+        
+        # A concurrent writer claimed some of these values; insert row by row
+        created = 0
+        for number, user_data in values:
+            try:
+                await db.execute(insert(User), [user_data])
+                await db.commit()
+                created += 1
+            except IntegrityError as e:
+                await db.rollback()
+                errors.append({"row": number, "error": _conflict(self, e).message})
+        if created:
+            await response_cache.invalidate(self.cache_tags())
+        return created, errors
+    
+    async def import_rows(
+        self, db: AsyncSession, rows: AsyncIterator[Tuple[int, object]], batch_size: int
+    ) -> Tuple[int, List[dict]]:
+        """Validate and insert parsed rows batch by batch as they stream in"""
+        created = 0
+        errors = []
+        async for batch in batched(rows, batch_size):
+            valid = []
+            for number, row in batch:
+                if isinstance(row, RowError):
+                    errors.append({"row": number, "error": str(row)})
+                    continue
+                try:
+                    valid.append((number, UserCreate(**row)))
+                except ValidationError as e:
+                    errors.append({"row": number, "error": _validation_message(e)})
+            batch_created, batch_errors = await self.bulk_create(db, valid)
+            created += batch_created
+            errors.extend(batch_errors)
+        errors.sort(key=lambda error: error["row"])
+        return created, errors
+    
+    async def stream_all(
+        self, db: AsyncSession, batch_size: int, fields: Optional[Sequence[str]] = None
+    ) -> AsyncIterator[List[User]]:
+        """Yield all users in id order, `batch_size` rows at a time, via a server-side cursor
+        
+        Only `fields` are loaded if given.
+        """
+        stmt = select(User).options(*_projection(self, fields)).order_by(User.id)
+        result = await db.stream_scalars(stmt.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield partition
+    
+    async def search_rows(
+        self, db: AsyncSession, q: str, fields: Sequence[str], limit: int = 20, offset: int = 0
+    ) -> Tuple[List[dict], Optional[int]]:
+        """Best matches for `q` first, as dicts, plus the offset of the next page (or None)"""
+        search = search_statement(db.get_bind().dialect.name, User, fields, q, limit + 1, offset)
+        if search is None:
+            return [], None
+        stmt, params = search
+        rows = (await db.execute(stmt, params)).all()
+        next_offset = offset + limit if len(rows) > limit else None
+        return _rows_to_dicts(rows[:limit], fields), next_offset
+    
+    async def get_active_users(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[User]:
+        """Get active users only"""
+        result = await db.execute(
+            select(User).where(User.is_active == True).offset(skip).limit(limit)
+        )
+        return list(result.scalars().all())
+    
+    async def deactivate_user(self, db: AsyncSession, user_id: int) -> User:
+        """Deactivate a user instead of deleting"""
+        user = await self.get(db, user_id)
+        if not user:
+            raise NotFoundException("User not found")
+        
+        user.is_active = False
+        db.add(user)
+        await db.commit()
+        await principal_cache.invalidate(user.email)
+        await response_cache.invalidate(self.cache_tags(user))
+        await db.refresh(user)
         return user
 
 
 # Create service instance
 user_service = UserService()
+async_user_service = AsyncUserService()
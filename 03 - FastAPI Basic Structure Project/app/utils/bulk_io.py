@@ -0,0 +1,94 @@
+import codecs
+import csv
+import io
+import json
+from typing import AsyncIterator, Iterable, List, Tuple
+
+# Content types accepted by the bulk import endpoint
+CSV_TYPES = {"text/csv", "application/csv"}
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
+
+class RowError(ValueError):
+    """A line of input that could not be parsed into a row"""
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into text lines without buffering the whole body"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """(row number, dict or RowError) per non-blank NDJSON line"""
+    number = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            yield number, RowError(f"Invalid JSON: {e}")
+            continue
+        yield number, row
+
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """(row number, dict or RowError) per CSV record; the first record is the header"""
+    header = None
+    record = ""
+    number = 0
+    async for line in iter_lines(chunks):
+        record += line
+        # An odd number of quotes means a quoted field continues on the next line
+        if record.count('"') % 2:
+            record += "\n"
+            continue
+        if not record.strip():
+            record = ""
+            continue
+        values = next(csv.reader([record]))
+        record = ""
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        number += 1
+        if len(values) != len(header):
+            yield number, RowError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        # Empty cells mean "not provided" so schema defaults apply
+        yield number, {key: value for key, value in zip(header, values) if value != ""}
+    if record.strip():
+        yield number + 1, RowError("Unterminated quoted field")
+
+
+async def batched(rows: AsyncIterator, size: int) -> AsyncIterator[List]:
+    """Group an async iterator into lists of at most `size` items"""
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def to_csv_line(values: Iterable) -> str:
+    """One CSV record, newline included"""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(
+        "" if value is None else value for value in values
+    )
+    return buffer.getvalue()
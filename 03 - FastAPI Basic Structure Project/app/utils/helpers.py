@@ -73,9 +73,13 @@ def truncate_string(text: str, max_length: int, suffix: str = "...") -> str:
     return text[:max_length - len(suffix)] + suffix
 
 
-def paginate_query(query, page: int = 1, per_page: int = 10):
-    """Add pagination to SQLAlchemy query"""
-    total = query.count()
+def paginate_query(query, page: int = 1, per_page: int = 10, with_total: bool = True):
+    """Add pagination to SQLAlchemy query
+    
+    OFFSET pagination; for large tables prefer the keyset pager
+    (`BaseService.get_page`). Pass `with_total=False` to skip the COUNT.
+    """
+    total = query.count() if with_total else None
     items = query.offset((page - 1) * per_page).limit(per_page).all()
     
     return {
@@ -83,5 +87,5 @@ def paginate_query(query, page: int = 1, per_page: int = 10):
         'total': total,
         'page': page,
         'per_page': per_page,
-        'pages': (total + per_page - 1) // per_page
+        'pages': (total + per_page - 1) // per_page if total is not None else None
     }
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Response compression benchmark: bytes saved vs CPU spent per level
+
+Builds the body of `GET /users/?limit=1000` (orjson-encoded users, as the
+endpoint sends them) and the NDJSON export of the same users, then
+compresses both with every installed coding at each level:
+
+- one-shot: the whole list body at once, as the middleware does for
+            ordinary responses
+- stream:   the export in --chunk-rows chunks, each flushed as it is sent,
+            as the middleware does for streaming responses; flushing costs
+            some ratio, the difference shows up here
+
+For each level it reports the compressed size, the share of bytes saved,
+the median CPU time and the kilobytes saved per millisecond of CPU. Pick
+per-route levels (COMPRESSION_ROUTE_LEVELS) from the knee of that curve:
+high levels for small hot responses that are cached or sent over slow
+links, low levels for large streamed exports where CPU dominates.
+
+gzip is always measured; br and zstd only when the brotli / zstandard
+packages are installed.
+
+Usage:
+    python -m benchmarks.bench_compression
+    python -m benchmarks.bench_compression --users 5000 --rounds 20
+    python -m benchmarks.bench_compression --codings gzip --levels 1,6,9
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+import orjson
+
+from app.core.compression import ENCODERS
+
+LEVELS = {
+    "gzip": range(1, 10),
+    "br": range(0, 12),
+    "zstd": (1, 2, 3, 5, 7, 9, 12, 15, 19),
+}
+WORDS = [
+    "python", "backend", "coffee", "hiking", "music", "data", "cloud", "design", "chess",
+    "running", "photography", "linux", "security", "gardening", "cycling", "cooking",
+]
+
+
+def synthetic_users(n: int):
+    """Dicts shaped like the User schema's JSON"""
+    rng = random.Random(42)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    users = []
+    for i in range(1, n + 1):
+        created = base + timedelta(seconds=rng.randrange(10**7))
+        users.append({
+            "email": f"user{i}@example.com",
+            "username": f"user{i}",
+            "full_name": f"User {i}",
+            "bio": " ".join(rng.sample(WORDS, rng.randrange(0, 8))) or None,
+            "is_active": True,
+            "id": i,
+            "is_superuser": False,
+            "created_at": created.isoformat(),
+            "updated_at": (created + timedelta(seconds=rng.randrange(10**6))).isoformat(),
+        })
+    return users
+
+
+def compress(coding: str, level: int, chunks):
+    """Compressed size and CPU seconds for `chunks` sent as one response"""
+    start = time.process_time()
+    encoder = ENCODERS[coding](level)
+    size = 0
+    for chunk in chunks[:-1]:
+        size += len(encoder.compress(chunk))
+    size += len(encoder.finish(chunks[-1]))
+    return size, time.process_time() - start
+
+
+def measure(coding: str, level: int, chunks, rounds: int):
+    timings = []
+    for _ in range(rounds):
+        size, seconds = compress(coding, level, chunks)
+        timings.append(seconds)
+    return size, statistics.median(timings) * 1000
+
+
+def report(label: str, chunks, codings, levels, rounds: int):
+    total = sum(len(chunk) for chunk in chunks)
+    print(f"\n{label}: {total / 1024:.1f} KB in {len(chunks)} chunk(s)")
+    print(f"{'coding':<6} {'level':>5} {'KB out':>9} {'saved':>7} {'CPU ms':>8} {'MB/s':>8} {'KB saved/ms':>12}")
+    for coding in codings:
+        for level in levels.get(coding, LEVELS[coding]):
+            size, cpu_ms = measure(coding, level, chunks, rounds)
+            saved = total - size
+            print(
+                f"{coding:<6} {level:>5} {size / 1024:>9.1f} {saved / total:>6.1%} {cpu_ms:>8.2f} "
+                f"{total / 1e6 / max(cpu_ms / 1000, 1e-9):>8.1f} {saved / 1024 / max(cpu_ms, 1e-6):>12.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000, help="Users in the list body and the export")
+    parser.add_argument("--chunk-rows", type=int, default=100, help="Users per streamed export chunk")
+    parser.add_argument("--rounds", type=int, default=10, help="Runs per level (median CPU time reported)")
+    parser.add_argument("--codings", default=",".join(ENCODERS), help="Comma-separated codings to measure")
+    parser.add_argument("--levels", default=None, help="Comma-separated levels (default: each coding's range)")
+    args = parser.parse_args()
+
+    codings = [coding for coding in args.codings.split(",") if coding]
+    missing = [coding for coding in codings if coding not in ENCODERS]
+    if missing:
+        parser.error(f"not installed: {', '.join(missing)} (available: {', '.join(ENCODERS)})")
+    levels = {}
+    if args.levels:
+        levels = {coding: [int(level) for level in args.levels.split(",")] for coding in codings}
+
+    users = synthetic_users(args.users)
+    list_body = orjson.dumps({"users": users, "next_cursor": None, "limit": args.users})
+    lines = [orjson.dumps(user) + b"\n" for user in users]
+    export_chunks = [
+        b"".join(lines[i:i + args.chunk_rows]) for i in range(0, len(lines), args.chunk_rows)
+    ]
+
+    report(f"GET /users/?limit={args.users} (one-shot)", [list_body], codings, levels, args.rounds)
+    report("GET /users/export (stream)", export_chunks, codings, levels, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
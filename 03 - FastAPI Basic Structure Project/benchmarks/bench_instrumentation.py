@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Request instrumentation overhead benchmark
+
+Drives a minimal ASGI app directly (no network, no HTTP client) with and
+without `InstrumentationMiddleware` and reports the added cost per request
+in microseconds. Access logging runs at the configured sample rate.
+
+Exits with status 1 when the overhead exceeds --budget-us, so it can guard
+CI against regressions in the hot path.
+
+Usage:
+    python -m benchmarks.bench_instrumentation
+    python -m benchmarks.bench_instrumentation --requests 200000 --budget-us 10
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from app.core.instrumentation import HTTPMetrics, InstrumentationMiddleware, start_access_log, stop_access_log
+
+_BODY = b'{"status":"healthy"}'
+
+
+async def endpoint(scope, receive, send):
+    """Stands in for a routed app; sets `endpoint` the way Starlette's router does"""
+    scope["endpoint"] = endpoint
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/json")],
+    })
+    await send({"type": "http.response.body", "body": _BODY})
+
+
+class _App:
+    routes = []
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def make_scope(app):
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/health",
+        "headers": [],
+        "query_string": b"",
+        "app": app,
+    }
+
+
+async def run(app, n: int) -> float:
+    """Seconds to serve n requests"""
+    owner = _App()
+    start = time.perf_counter()
+    for _ in range(n):
+        await app(make_scope(owner), receive, send)
+    return time.perf_counter() - start
+
+
+async def main_async(args):
+    instrumented = InstrumentationMiddleware(endpoint, metrics=HTTPMetrics(), sample_rate=args.sample_rate)
+
+    # Warm up both paths, then take the best of several rounds
+    await run(endpoint, 1000)
+    await run(instrumented, 1000)
+    bare = min([await run(endpoint, args.requests) for _ in range(args.rounds)])
+    wrapped = min([await run(instrumented, args.requests) for _ in range(args.rounds)])
+    return bare / args.requests * 1e6, wrapped / args.requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50000, help="Requests per round")
+    parser.add_argument("--rounds", type=int, default=5, help="Rounds per variant (best is reported)")
+    parser.add_argument("--sample-rate", type=float, default=0.01, help="Access log sample rate")
+    parser.add_argument("--budget-us", type=float, default=20.0, help="Maximum allowed overhead per request")
+    args = parser.parse_args()
+
+    # Sampled records go through the queue to a discarded stream
+    with open(os.devnull, "w") as sink:
+        start_access_log(sink)
+        try:
+            bare, wrapped = asyncio.run(main_async(args))
+        finally:
+            stop_access_log()
+
+    overhead = wrapped - bare
+    print(f"{'variant':<14} {'µs/request':>11}")
+    print(f"{'bare':<14} {bare:>11.2f}")
+    print(f"{'instrumented':<14} {wrapped:>11.2f}")
+    print(f"overhead: {overhead:.2f} µs/request (budget {args.budget_us:.2f})")
+    if overhead > args.budget_us:
+        print("FAIL: instrumentation overhead over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Rate limiter overhead benchmark
+
+Reports microseconds per check for each algorithm and backend, and for a
+pass through the concurrency limiter. Keys are spread over --keys distinct
+clients so the in-memory backend's LRU does real work.
+
+The Redis backend is included when --redis-url is given; its numbers are
+dominated by the network round trip (one for the token bucket script, two
+or three for the sliding window).
+
+Usage:
+    python -m benchmarks.bench_rate_limit
+    python -m benchmarks.bench_rate_limit --redis-url redis://localhost:6379/0
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.core.rate_limit import (
+    ConcurrencyLimiter,
+    MemoryRateLimitBackend,
+    RateLimiter,
+    RedisRateLimitBackend,
+    SlidingWindow,
+    TokenBucket,
+)
+
+RULES = [
+    TokenBucket.per_minute("bench_token_bucket", 600, 100),
+    SlidingWindow("bench_sliding_window", 100, 60),
+]
+
+
+async def time_checks(limiter: RateLimiter, rule, checks: int, keys: int) -> float:
+    """Microseconds per check"""
+    names = [f"ip:10.0.{i // 256}.{i % 256}" for i in range(keys)]
+    start = time.perf_counter()
+    for i in range(checks):
+        await limiter.hit(rule, names[i % keys])
+    return (time.perf_counter() - start) / checks * 1e6
+
+
+async def time_admission(checks: int) -> float:
+    limiter = ConcurrencyLimiter(limit=1000)
+    start = time.perf_counter()
+    for _ in range(checks):
+        async with limiter:
+            pass
+    return (time.perf_counter() - start) / checks * 1e6
+
+
+async def main_async(args):
+    backends = [("memory", MemoryRateLimitBackend(), args.checks)]
+    if args.redis_url:
+        import redis.asyncio as redis
+        client = redis.from_url(args.redis_url)
+        # Network bound; fewer checks are enough
+        backends.append(("redis", RedisRateLimitBackend(redis=client), max(1, args.checks // 20)))
+
+    print(f"{'check':<22} {'backend':<8} {'µs/check':>9}")
+    for name, backend, checks in backends:
+        limiter = RateLimiter(backend=backend, enabled=True)
+        for rule in RULES:
+            await time_checks(limiter, rule, min(checks, 1000), args.keys)  # warm up
+            us = await time_checks(limiter, rule, checks, args.keys)
+            print(f"{rule.algorithm:<22} {name:<8} {us:>9.2f}")
+    print(f"{'concurrency_limiter':<22} {'memory':<8} {await time_admission(args.checks):>9.2f}")
+
+    if args.redis_url:
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", type=int, default=200000, help="Checks per algorithm (in memory)")
+    parser.add_argument("--keys", type=int, default=10000, help="Distinct client keys")
+    parser.add_argument("--redis-url", default=None, help="Also benchmark the Redis backend")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
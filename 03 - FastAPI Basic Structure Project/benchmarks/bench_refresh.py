@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Re-login vs refresh benchmark
+
+Renews a session N times through the real app, in-process, in two ways:
+
+- login:   POST /api/v1/users/login with the password (bcrypt verify)
+- refresh: POST /api/v1/users/refresh with the previous refresh token
+           (rotation + revocation check, no password hashing)
+
+Reports wall time and CPU per renewal. CPU includes the hashing pool's
+processes, where bcrypt runs. Rate limiting is disabled so that repeated
+logins for one account are not throttled.
+
+Usage:
+    python -m benchmarks.bench_refresh
+    python -m benchmarks.bench_refresh --renewals 50 --bcrypt-rounds 12
+"""
+
+import argparse
+import os
+import tempfile
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--renewals", type=int, default=30, help="Session renewals per variant")
+parser.add_argument("--bcrypt-rounds", type=int, default=12, help="bcrypt cost factor")
+args = parser.parse_args()
+
+# Settings are read when the app is imported
+tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+os.environ["RATE_LIMIT_ENABLED"] = "False"
+os.environ["ACCESS_LOG_SAMPLE_RATE"] = "0"
+os.environ.setdefault("REDIS_URL", "")
+
+import asyncio
+import time
+
+import httpx
+
+from app.core.hashing import password_hasher
+from app.database import Base, engine
+from app.main import app
+
+EMAIL = "bench-refresh@example.com"
+PASSWORD = "benchpassword123"
+
+
+def cpu_seconds() -> float:
+    """This process plus the time spent in the hashing pool"""
+    return time.process_time() + password_hasher.snapshot()["cpu_seconds_total"]
+
+
+async def renew_by_login(client: httpx.AsyncClient, n: int):
+    for _ in range(n):
+        response = await client.post("/api/v1/users/login", data={"username": EMAIL, "password": PASSWORD})
+        assert response.status_code == 200, response.text
+
+
+async def renew_by_refresh(client: httpx.AsyncClient, n: int):
+    response = await client.post("/api/v1/users/login", data={"username": EMAIL, "password": PASSWORD})
+    refresh_token = response.json()["refresh_token"]
+    for _ in range(n):
+        response = await client.post("/api/v1/users/refresh", json={"refresh_token": refresh_token})
+        assert response.status_code == 200, response.text
+        refresh_token = response.json()["refresh_token"]
+
+
+async def main_async():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/api/v1/users/register", json={
+            "email": EMAIL, "username": "benchrefresh", "password": PASSWORD
+        })
+
+        results = {}
+        for name, renew in (("login", renew_by_login), ("refresh", renew_by_refresh)):
+            await renew(client, 2)  # warm up
+            wall, cpu = time.perf_counter(), cpu_seconds()
+            await renew(client, args.renewals)
+            results[name] = (
+                (time.perf_counter() - wall) / args.renewals * 1000,
+                (cpu_seconds() - cpu) / args.renewals * 1000,
+            )
+
+    print(f"{'variant':<8} {'wall ms/renewal':>16} {'CPU ms/renewal':>15}")
+    for name, (wall_ms, cpu_ms) in results.items():
+        print(f"{name:<8} {wall_ms:>16.2f} {cpu_ms:>15.2f}")
+    print(f"refresh uses {results['login'][1] / max(results['refresh'][1], 1e-9):.0f}x less CPU per renewal")
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    try:
+        asyncio.run(main_async())
+    finally:
+        password_hasher.shutdown()
+        engine.dispose()
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
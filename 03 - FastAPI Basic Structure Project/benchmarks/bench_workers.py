@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Worker scaling benchmark
+
+Starts the production server (`python -m app.server`) with 1, 2, 4, ...
+workers, drives it over real HTTP from several client processes, and
+reports requests/sec and the speedup over a single worker. The server uses
+a fresh temporary SQLite database; the default endpoint does no database
+work, so the numbers show how CPU-bound request handling (routing,
+middleware, JSON) spreads across cores.
+
+Client processes compete with the server for CPUs, so on a small machine
+the curve flattens early. Run the load from another host for clean numbers.
+
+Usage:
+    python -m benchmarks.bench_workers
+    python -m benchmarks.bench_workers --workers 1,2,4,8 --clients 4 --duration 10 --path /
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int, db_url: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "SERVER_HOST": "127.0.0.1",
+        "SERVER_PORT": str(port),
+        "DATABASE_URL": db_url,
+        "ACCESS_LOG_SAMPLE_RATE": "0",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "app.server"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def stop_server(proc: subprocess.Popen):
+    # SIGTERM: the same graceful drain a container stop triggers
+    proc.terminate()
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+async def _load(url: str, concurrency: int, duration: float) -> int:
+    done = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits) as client:
+        async def loop():
+            nonlocal done
+            while time.monotonic() < deadline:
+                response = await client.get(url)
+                if response.status_code == 200:
+                    done += 1
+
+        await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return done
+
+
+def client_process(url: str, concurrency: int, duration: float, results):
+    results.put(asyncio.run(_load(url, concurrency, duration)))
+
+
+def measure(url: str, clients: int, concurrency: int, duration: float) -> float:
+    """Requests/sec across all client processes"""
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=client_process, args=(url, concurrency, duration, results))
+        for _ in range(clients)
+    ]
+    for proc in procs:
+        proc.start()
+    total = sum(results.get() for _ in procs)
+    for proc in procs:
+        proc.join()
+    return total / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=None, help="Comma-separated worker counts (default: 1, 2, 4 ... up to the CPU count)")
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="Client processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent requests per client process")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of load per worker count")
+    parser.add_argument("--path", default="/health", help="Endpoint to load")
+    args = parser.parse_args()
+
+    if args.workers:
+        counts = [int(n) for n in args.workers.split(",")]
+    else:
+        cpus = os.cpu_count() or 1
+        counts = [n for n in (1, 2, 4, 8, 16, 32) if n <= cpus] or [1]
+
+    tmpdir = tempfile.TemporaryDirectory()
+    db_url = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+
+    print(f"{'workers':>7} {'req/s':>10} {'speedup':>8}")
+    baseline = None
+    for workers in counts:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        proc = start_server(workers, port, db_url)
+        try:
+            wait_ready(base_url)
+            # Warm up every worker before measuring
+            measure(base_url + args.path, args.clients, args.concurrency, 1.0)
+            rps = measure(base_url + args.path, args.clients, args.concurrency, args.duration)
+        finally:
+            stop_server(proc)
+        baseline = baseline or rps
+        print(f"{workers:>7} {rps:>10.0f} {rps / baseline:>7.2f}x")
+
+    tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# gunicorn settings for the production server (python -m app.server)
+#
+#   gunicorn -c gunicorn.conf.py app.main:app
+#
+# Values come from app/config.py, so they can be set in the environment or .env.
+
+from app.config import (
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_MAX_REQUESTS,
+    SERVER_MAX_REQUESTS_JITTER,
+    SERVER_GRACEFUL_TIMEOUT,
+    SERVER_TIMEOUT,
+    SERVER_KEEPALIVE,
+    SERVER_BACKLOG,
+    FORWARDED_ALLOW_IPS,
+)
+from app.server import after_fork, worker_count
+
+bind = f"{SERVER_HOST}:{SERVER_PORT}"
+backlog = SERVER_BACKLOG
+
+# Async workers: one per CPU is enough to keep every core busy
+workers = worker_count()
+worker_class = "app.workers.UvicornWorker"
+
+# Import the app once in the master; workers fork with it already loaded
+preload_app = True
+
+# Recycle each worker after this many requests (staggered by the jitter)
+# to bound slow leaks; 0 disables recycling
+max_requests = SERVER_MAX_REQUESTS
+max_requests_jitter = SERVER_MAX_REQUESTS_JITTER if SERVER_MAX_REQUESTS else 0
+
+# SIGTERM: stop accepting, let in-flight requests finish for up to
+# graceful_timeout seconds, then run the app's shutdown handlers
+graceful_timeout = SERVER_GRACEFUL_TIMEOUT
+# Workers that stop heartbeating for this long are killed and replaced
+timeout = SERVER_TIMEOUT
+keepalive = SERVER_KEEPALIVE
+
+# Only these proxies may set the client address via X-Forwarded-For; the
+# login/register rate limits key on it, so never trust arbitrary peers
+forwarded_allow_ips = FORWARDED_ALLOW_IPS
+
+accesslog = None  # app.access logs sampled requests instead
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    """Database pools, Redis clients and the hashing pool are per worker"""
+    after_fork()
+
+
+def worker_int(worker):
+    worker.log.info("worker %s interrupted, draining", worker.pid)
@@ -0,0 +1,65 @@
+import time
+
+
+class FakeRedis:
+    """In-process stand-in for the redis.asyncio client used in tests"""
+    
+    def __init__(self):
+        self._data = {}
+    
+    def _alive(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return item
+    
+    async def get(self, key):
+        item = self._alive(key)
+        return None if item is None else item[0]
+    
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and self._alive(key) is not None:
+            return None
+        if isinstance(value, str):
+            value = value.encode()
+        self._data[key] = (value, time.monotonic() + ex if ex else None)
+        return True
+    
+    async def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._alive(key) is not None:
+                removed += 1
+            self._data.pop(key, None)
+        return removed
+    
+    async def mget(self, keys):
+        return [await self.get(key) for key in keys]
+    
+    async def incr(self, key):
+        item = self._alive(key)
+        value = int(item[0]) + 1 if item else 1
+        self._data[key] = (str(value).encode(), item[1] if item else None)
+        return value
+    
+    def register_script(self, script):
+        """Only the compare-and-delete lock release script is emulated"""
+        assert "DEL" in script and "GET" in script
+        
+        async def compare_and_delete(keys, args):
+            item = self._alive(keys[0])
+            if item is not None and item[0] == str(args[0]).encode():
+                return await self.delete(keys[0])
+            return 0
+        return compare_and_delete
+    
+    async def expire(self, key, seconds):
+        item = self._alive(key)
+        if item is None:
+            return False
+        self._data[key] = (item[0], time.monotonic() + seconds)
+        return True
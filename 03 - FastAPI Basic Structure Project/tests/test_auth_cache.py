@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.auth_cache import PrincipalCache, TokenCache
+from app.core.security import create_access_token
+from .fake_redis import FakeRedis
+
+
+@pytest.fixture
+def cache_user_headers(client: TestClient):
+    """Register a dedicated user and return auth headers"""
+    user_data = {
+        "email": "cacheuser@example.com",
+        "username": "cacheuser",
+        "password": "testpassword123"
+    }
+    client.post("/api/v1/users/register", json=user_data)
+    response = client.post("/api/v1/users/login", data={
+        "username": user_data["email"],
+        "password": user_data["password"]
+    })
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+class TestPrincipalCache:
+    """Test authenticated principal caching"""
+    
+    def test_cached_principal_skips_db(self, client: TestClient, cache_user_headers):
+        """Test that repeated requests load the principal from cache"""
+        client.get("/api/v1/users/me", headers=cache_user_headers)
+        response = client.get("/api/v1/users/me", headers=cache_user_headers)
+        
+        assert response.status_code == 200
+        assert response.json()["email"] == "cacheuser@example.com"
+        assert response.headers["X-DB-Queries"] == "0"
+    
+    def test_update_invalidates_principal(self, client: TestClient, cache_user_headers):
+        """Test that updating the user invalidates the cached principal"""
+        client.get("/api/v1/users/me", headers=cache_user_headers)
+        response = client.put("/api/v1/users/me", json={"bio": "Cached bio"}, headers=cache_user_headers)
+        assert response.status_code == 200
+        
+        response = client.get("/api/v1/users/me", headers=cache_user_headers)
+        assert response.json()["bio"] == "Cached bio"
+    
+    def test_shared_tier(self):
+        """Test that the Redis tier serves other workers and is invalidated"""
+        redis = FakeRedis()
+        worker_a = PrincipalCache(redis=redis)
+        worker_b = PrincipalCache(redis=redis)
+        
+        async def scenario():
+            await worker_a.set("a@example.com", {"id": 1, "email": "a@example.com"})
+            assert (await worker_b.get("a@example.com"))["id"] == 1
+            await worker_a.invalidate("a@example.com")
+            worker_b.local.clear()
+            assert await worker_b.get("a@example.com") is None
+        
+        asyncio.run(scenario())
+
+
+class TestTokenCache:
+    """Test verified token caching"""
+    
+    def test_verified_token_is_cached(self):
+        """Test that a verified token is served from cache"""
+        cache = TokenCache(maxsize=10)
+        token = create_access_token({"sub": "a@example.com"})
+        
+        assert cache.decode(token)["sub"] == "a@example.com"
+        assert cache.decode(token)["sub"] == "a@example.com"
+        assert cache.cache.hits == 1
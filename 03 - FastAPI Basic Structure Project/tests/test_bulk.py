@@ -0,0 +1,125 @@
+import asyncio
+import csv
+import io
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models.user import User
+from app.utils.bulk_io import RowError, iter_csv_rows
+from .conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def admin_headers(client: TestClient):
+    """Register a superuser and return auth headers"""
+    client.post("/api/v1/users/register", json={
+        "email": "bulkadmin@example.com",
+        "username": "bulkadmin",
+        "password": "testpassword123"
+    })
+    db = TestingSessionLocal()
+    db.query(User).filter(User.email == "bulkadmin@example.com").update({"is_superuser": True})
+    db.commit()
+    db.close()
+    response = client.post("/api/v1/users/login", data={
+        "username": "bulkadmin@example.com",
+        "password": "testpassword123"
+    })
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+
+class TestBulkImport:
+    """Test streaming bulk import"""
+    
+    def test_ndjson_import_reports_row_errors(self, client: TestClient, admin_headers):
+        """Test that valid rows are created and bad rows are reported"""
+        rows = [
+            {"email": "bulk1@example.com", "username": "bulk1", "password": "testpassword123"},
+            {"email": "bulk2@example.com", "username": "bulk2", "password": "short"},
+            {"email": "bulk1@example.com", "username": "bulk1b", "password": "testpassword123"},
+            {"email": "bulkadmin@example.com", "username": "bulk3", "password": "testpassword123"},
+        ]
+        body = "\n".join(json.dumps(row) for row in rows) + "\nnot json\n"
+        response = client.post(
+            "/api/v1/users/import",
+            content=body,
+            headers={**admin_headers, "Content-Type": "application/x-ndjson"}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["created"] == 1
+        assert data["failed"] == 4
+        assert [error["row"] for error in data["errors"]] == [2, 3, 4, 5]
+    
+    def test_csv_import(self, client: TestClient, admin_headers):
+        """Test CSV import including a quoted multi-line field"""
+        body = (
+            "email,username,password,bio\n"
+            'csv1@example.com,csv1,testpassword123,"line one\nline two"\n'
+            "csv2@example.com,csv2,testpassword123,\n"
+        )
+        response = client.post(
+            "/api/v1/users/import",
+            content=body,
+            headers={**admin_headers, "Content-Type": "text/csv"}
+        )
+        
+        assert response.json() == {"created": 2, "failed": 0, "errors": []}
+    
+    def test_import_requires_superuser(self, client: TestClient):
+        """Test that regular users cannot import"""
+        client.post("/api/v1/users/register", json={
+            "email": "bulkuser@example.com",
+            "username": "bulkuser",
+            "password": "testpassword123"
+        })
+        response = client.post("/api/v1/users/login", data={
+            "username": "bulkuser@example.com",
+            "password": "testpassword123"
+        })
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        response = client.post(
+            "/api/v1/users/import",
+            content="{}",
+            headers={**headers, "Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 403
+    
+    def test_csv_parser_across_chunks(self):
+        """Test that records split across network chunks parse correctly"""
+        async def collect():
+            return [row async for row in iter_csv_rows(_chunks(
+                b"email,username\na@exa", b'mple.com,"user\n', b'name"\nb@example.com\n'
+            ))]
+        
+        rows = asyncio.run(collect())
+        assert rows[0] == (1, {"email": "a@example.com", "username": "user\nname"})
+        assert isinstance(rows[1][1], RowError)
+
+
+class TestBulkExport:
+    """Test streaming export"""
+    
+    def test_export_ndjson(self, client: TestClient, admin_headers):
+        """Test that every user is exported without password hashes"""
+        response = client.get("/api/v1/users/export", headers=admin_headers)
+        
+        assert response.status_code == 200
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert "bulkadmin@example.com" in {row["email"] for row in rows}
+        assert all("hashed_password" not in row for row in rows)
+    
+    def test_export_csv(self, client: TestClient, admin_headers):
+        """Test CSV export"""
+        response = client.get("/api/v1/users/export?format=csv", headers=admin_headers)
+        
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert response.headers["content-type"].startswith("text/csv")
+        assert "bulkadmin" in {row["username"] for row in rows}
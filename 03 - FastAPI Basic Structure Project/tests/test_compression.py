@@ -0,0 +1,161 @@
+import asyncio
+import gzip
+import zlib
+
+from fastapi.testclient import TestClient
+
+from app.core.compression import CompressionMetrics, CompressionMiddleware, negotiate, parse_route_levels
+from app.models.user import User
+from .conftest import TestingSessionLocal
+
+JSON = (b"content-type", b"application/json")
+
+
+def make_app(chunks, headers=(JSON,), status=200):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": status, "headers": list(headers)})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return app
+
+
+def run(app, accept_encoding="gzip", path="/", **options):
+    """Drive the middleware and collect what it sends"""
+    sent = []
+    middleware = CompressionMiddleware(app, metrics=CompressionMetrics(), **options)
+    scope = {
+        "type": "http", "method": "GET", "path": path,
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    headers = {key.decode(): value.decode() for key, value in sent[0]["headers"]}
+    return headers, [message["body"] for message in sent[1:]]
+
+
+class TestNegotiation:
+    """Test Accept-Encoding negotiation"""
+
+    def test_preference_and_q_values(self):
+        """Test q-values win, ties go to server order, q=0 refuses"""
+        available = {"zstd": None, "br": None, "gzip": None}
+        assert negotiate("gzip, br, zstd", available) == "zstd"
+        assert negotiate("gzip;q=1.0, br;q=0.5", available) == "gzip"
+        assert negotiate("gzip;q=0, identity", available) is None
+        assert negotiate("*;q=0.1, zstd;q=0", available) == "br"
+        assert negotiate("", available) is None
+        assert negotiate("br", {"gzip": None}) is None
+
+    def test_route_levels(self):
+        """Test the per-route level setting is parsed"""
+        assert parse_route_levels("/a:gzip=1,br=2;/b:gzip=9") == {"/a": {"gzip": 1, "br": 2}, "/b": {"gzip": 9}}
+
+
+class TestCompressionMiddleware:
+    """Test the ASGI compression layer"""
+
+    def test_compresses_large_body(self):
+        """Test a one-shot body is gzipped with its length and Vary set"""
+        body = b'{"users": [' + b'{"id": 1, "username": "someone"},' * 200 + b"]}"
+        headers, chunks = run(make_app([body]))
+    
+        assert headers["content-encoding"] == "gzip"
+        assert headers["vary"] == "Accept-Encoding"
+        assert int(headers["content-length"]) == len(chunks[0]) < len(body) // 5
+        assert gzip.decompress(chunks[0]) == body
+
+    def test_small_body_untouched(self):
+        """Test bodies under the threshold are sent as-is"""
+        headers, chunks = run(make_app([b'{"ok": true}']))
+    
+        assert "content-encoding" not in headers
+        assert chunks == [b'{"ok": true}']
+
+    def test_streaming_is_incremental(self):
+        """Test each streamed chunk is decodable as soon as it is sent"""
+        lines = [b'{"id": %d, "username": "user%d"}\n' % (i, i) * 100 for i in range(3)]
+        headers, chunks = run(make_app(lines, headers=[(b"content-type", b"application/x-ndjson")]))
+    
+        assert headers["content-encoding"] == "gzip"
+        assert "content-length" not in headers
+        decoder = zlib.decompressobj(31)
+        for line, chunk in zip(lines, chunks):
+            assert decoder.decompress(chunk) == line
+        assert decoder.decompress(b"".join(chunks[len(lines):])) == b""
+        assert decoder.eof
+
+    def test_small_chunks_buffered_to_threshold(self):
+        """Test a stream of tiny chunks is compressed once the threshold is reached"""
+        headers, chunks = run(make_app([b"a" * 100] * 20), minimum_size=500)
+    
+        assert headers["content-encoding"] == "gzip"
+        assert gzip.decompress(b"".join(chunks)) == b"a" * 2000
+
+    def test_respects_excluded_and_encoded(self):
+        """Test compressed media types and pre-encoded bodies are passed through"""
+        body = b"\x00" * 5000
+        for headers in (
+            [(b"content-type", b"image/png")],
+            [(b"content-type", b"application/zip")],
+            [JSON, (b"content-encoding", b"gzip")],
+        ):
+            response_headers, chunks = run(make_app([body], headers=headers))
+            assert chunks == [body]
+    
+        assert "vary" not in run(make_app([body], headers=[(b"content-type", b"image/png")]))[0]
+
+    def test_not_accepted(self):
+        """Test identity-only clients get the body unchanged but a Vary header"""
+        body = b"x" * 5000
+        headers, chunks = run(make_app([body]), accept_encoding="gzip;q=0")
+    
+        assert "content-encoding" not in headers
+        assert headers["vary"] == "Accept-Encoding"
+        assert chunks == [body]
+
+    def test_route_level(self):
+        """Test a route prefix gets its own compression level"""
+        body = bytes(range(256)) * 40 + b"abc" * 5000
+        fast = run(make_app([body]), path="/export", route_levels={"/export": {"gzip": 1}})[1][0]
+        best = run(make_app([body]), path="/export", route_levels={"/export": {"gzip": 9}})[1][0]
+    
+        assert gzip.decompress(fast) == gzip.decompress(best) == body
+        assert len(best) < len(fast)
+
+
+class TestCompressionEndpoints:
+    """Test compression on real endpoints"""
+
+    def test_user_list_and_export(self, client: TestClient):
+        """Test a large list and the streamed export arrive gzipped and intact"""
+        client.post("/api/v1/users/register", json={
+            "email": "gzipadmin@example.com",
+            "username": "gzipadmin",
+            "password": "testpassword123",
+            "bio": "compressible " * 200
+        })
+        db = TestingSessionLocal()
+        db.query(User).filter(User.email == "gzipadmin@example.com").update({"is_superuser": True})
+        db.commit()
+        db.close()
+        token = client.post("/api/v1/users/login", data={
+            "username": "gzipadmin@example.com",
+            "password": "testpassword123"
+        }).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "gzip"}
+    
+        listing = client.get("/api/v1/users/?limit=1000", headers=headers)
+        with client.stream("GET", "/api/v1/users/export", headers=headers) as export:
+            raw = b"".join(export.iter_raw())
+    
+        assert listing.headers["content-encoding"] == "gzip"
+        assert any(user["username"] == "gzipadmin" for user in listing.json()["users"])
+        assert export.headers["content-encoding"] == "gzip"
+        assert b"gzipadmin" in gzip.decompress(raw)
+        assert client.get("/metrics").json()["compression"]["codings"]["gzip"]["responses"] >= 2
@@ -0,0 +1,138 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+
+from app.core.exceptions import ValidationException
+from app.core.fields import parse_fields, slim_model
+from app.models.user import User
+from app.schemas.user import User as UserSchema, USER_FIELDS
+from app.services.user_service import user_service
+from .conftest import TestingSessionLocal, engine
+
+
+@pytest.fixture
+def admin_headers(client: TestClient):
+    """Register a superuser with a long bio and return auth headers"""
+    client.post("/api/v1/users/register", json={
+        "email": "fieldsadmin@example.com",
+        "username": "fieldsadmin",
+        "password": "testpassword123",
+        "bio": "x" * 5000
+    })
+    db = TestingSessionLocal()
+    db.query(User).filter(User.email == "fieldsadmin@example.com").update({"is_superuser": True})
+    db.commit()
+    db.close()
+    response = client.post("/api/v1/users/login", data={
+        "username": "fieldsadmin@example.com",
+        "password": "testpassword123"
+    })
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+class TestParseFields:
+    """Test ?fields= parsing"""
+
+    def test_projection(self):
+        """Test fields come back in schema order with id always included"""
+        assert parse_fields(" username ,email", USER_FIELDS) == tuple(
+            name for name in USER_FIELDS if name in ("id", "username", "email")
+        )
+        assert parse_fields(None, USER_FIELDS) == USER_FIELDS
+
+    def test_unknown_field(self):
+        """Test unknown names are rejected rather than ignored"""
+        with pytest.raises(ValidationException):
+            parse_fields("username,hashed_password", USER_FIELDS)
+
+    def test_slim_model(self):
+        """Test the slim model serializes only the projected fields"""
+        schema = slim_model(UserSchema, ("id", "username"))
+        user = User(id=7, username="slim", email="slim@example.com", bio="long")
+    
+        assert schema.model_validate(user).model_dump() == {"id": 7, "username": "slim"}
+        assert slim_model(UserSchema, ("id", "username")) is schema
+
+
+class TestServiceProjection:
+    """Test projections reach the SQL"""
+
+    def test_get_multi_selects_only_fields(self, client: TestClient, admin_headers):
+        """Test unrequested columns are neither selected nor lazily loaded"""
+        statements = []
+        capture = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", capture)
+        db = TestingSessionLocal()
+        try:
+            users = user_service.get_multi(db, limit=5, fields=["id", "username"])
+            assert users
+            with pytest.raises(InvalidRequestError):
+                users[0].bio
+        finally:
+            db.close()
+            event.remove(engine, "before_cursor_execute", capture)
+    
+        assert "users.username" in statements[0]
+        assert "users.bio" not in statements[0]
+
+
+class TestFieldsEndpoints:
+    """Test ?fields= on the user endpoints"""
+
+    def test_list(self, client: TestClient, admin_headers):
+        """Test cursor and offset listings return only the requested fields"""
+        client.post("/api/v1/users/register", json={
+            "email": "fieldsother@example.com", "username": "fieldsother", "password": "testpassword123"
+        })
+        cursor_page = client.get("/api/v1/users/?fields=username", headers=admin_headers).json()
+        offset_page = client.get("/api/v1/users/?skip=1&fields=username", headers=admin_headers).json()
+    
+        for page in (cursor_page, offset_page):
+            assert page["users"]
+            assert all(set(user) == {"id", "username"} for user in page["users"])
+
+    def test_read_user(self, client: TestClient, admin_headers):
+        """Test a projected user has its own ETag and revalidates"""
+        me = client.get("/api/v1/users/me?fields=id", headers=admin_headers)
+        user_id = me.json()["id"]
+        full = client.get(f"/api/v1/users/{user_id}", headers=admin_headers)
+        slim = client.get(f"/api/v1/users/{user_id}?fields=username,updated_at", headers=admin_headers)
+    
+        assert set(slim.json()) == {"id", "username", "updated_at"}
+        assert len(slim.content) < len(full.content) // 10
+        assert slim.headers["ETag"] != full.headers["ETag"]
+        revalidated = client.get(
+            f"/api/v1/users/{user_id}?fields=username,updated_at",
+            headers={**admin_headers, "If-None-Match": slim.headers["ETag"]}
+        )
+        assert revalidated.status_code == 304
+
+    def test_read_user_without_updated_at(self, client: TestClient, admin_headers):
+        """Test validators still work when updated_at is not requested"""
+        user_id = client.get("/api/v1/users/me?fields=id", headers=admin_headers).json()["id"]
+    
+        response = client.get(f"/api/v1/users/{user_id}?fields=email", headers=admin_headers)
+    
+        assert response.json() == {"id": user_id, "email": "fieldsadmin@example.com"}
+        assert "Last-Modified" in response.headers
+
+    def test_me(self, client: TestClient, admin_headers):
+        """Test /me honours fields"""
+        response = client.get("/api/v1/users/me?fields=email", headers=admin_headers)
+    
+        assert set(response.json()) == {"id", "email"}
+
+    def test_export(self, client: TestClient, admin_headers):
+        """Test CSV export has just the requested columns"""
+        response = client.get("/api/v1/users/export?format=csv&fields=username", headers=admin_headers)
+    
+        lines = response.text.splitlines()
+        assert lines[0].split(",") == [name for name in USER_FIELDS if name in ("id", "username")]
+        assert "fieldsadmin" in response.text
+
+    def test_unknown_field(self, client: TestClient, admin_headers):
+        """Test unknown fields get 422"""
+        response = client.get("/api/v1/users/?fields=hashed_password", headers=admin_headers)
+    
+        assert response.status_code == 422
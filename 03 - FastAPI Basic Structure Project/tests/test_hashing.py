@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from passlib.context import CryptContext
+
+from app.core.exceptions import ServiceUnavailableException
+from app.core.hashing import PasswordHasher
+from app.core.security import pwd_context
+
+
+@pytest.fixture
+def hasher():
+    """Small hashing pool for tests"""
+    hasher = PasswordHasher(workers=1, max_pending=2)
+    yield hasher
+    hasher.shutdown()
+
+
+class TestPasswordHasher:
+    """Test process-pool password hashing"""
+    
+    def test_hash_and_verify(self, hasher):
+        """Test hashing round trip and metrics"""
+        hashed = asyncio.run(hasher.hash("testpassword123"))
+        
+        assert pwd_context.verify("testpassword123", hashed)
+        valid, new_hash = asyncio.run(hasher.verify_and_update("testpassword123", hashed))
+        assert valid
+        assert new_hash is None
+        assert hasher.snapshot()["completed_total"] == 2
+    
+    def test_rehash_outdated_cost(self, hasher):
+        """Test that hashes with an old cost factor are upgraded"""
+        old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("testpassword123")
+        
+        valid, new_hash = asyncio.run(hasher.verify_and_update("testpassword123", old_hash))
+        
+        assert valid
+        assert new_hash is not None
+        assert pwd_context.verify("testpassword123", new_hash)
+        assert not pwd_context.needs_update(new_hash)
+    
+    def test_admission_control(self, hasher):
+        """Test that work beyond max_pending is rejected"""
+        hasher._pending = hasher.max_pending
+        
+        with pytest.raises(ServiceUnavailableException):
+            asyncio.run(hasher.hash("testpassword123"))
+        assert hasher.snapshot()["rejected_total"] == 1
+    
+    def test_hash_many_waits_for_capacity(self, hasher):
+        """Test that bulk hashing waits for a free slot instead of failing"""
+        hasher._pending = hasher.max_pending
+        
+        async def scenario():
+            batch = asyncio.create_task(hasher.hash_many(["first", "second", "third"]))
+            await asyncio.sleep(0.05)
+            assert not batch.done()
+            # The interactive requests holding the slots finish
+            hasher._pending = 0
+            return await batch
+        
+        hashes = asyncio.run(scenario())
+        
+        assert len(hashes) == 3
+        assert all(pwd_context.verify(password, hashed) for password, hashed in zip(["first", "second", "third"], hashes))
+        assert hasher.snapshot()["rejected_total"] == 0
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+
+from app.core.http_cache import http_date
+from app.core.response_cache import response_cache
+
+
+def register_and_login(client: TestClient, name: str):
+    response = client.post("/api/v1/users/register", json={
+        "email": f"{name}@example.com",
+        "username": name,
+        "password": "testpassword123"
+    })
+    user_id = response.json()["id"]
+    response = client.post("/api/v1/users/login", data={
+        "username": f"{name}@example.com",
+        "password": "testpassword123"
+    })
+    return user_id, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+class TestConditionalGet:
+    """Test ETag / Last-Modified handling on user reads"""
+    
+    def test_user_etag_round_trip(self, client: TestClient, monkeypatch):
+        """Test that a matching ETag yields a bodiless 304 after one lookup"""
+        # Exercise the endpoint's own revalidation, not a cached response
+        monkeypatch.setattr(response_cache, "enabled", False)
+        user_id, headers = register_and_login(client, "etaguser")
+        client.get("/api/v1/users/me", headers=headers)  # warm the principal cache
+        
+        response = client.get(f"/api/v1/users/{user_id}", headers=headers)
+        etag = response.headers["ETag"]
+        assert response.status_code == 200
+        assert response.headers["Cache-Control"] == "private, no-cache"
+        assert "Last-Modified" in response.headers
+        
+        response = client.get(f"/api/v1/users/{user_id}", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+        assert response.headers["X-DB-Queries"] == "1"
+    
+    def test_update_changes_etag(self, client: TestClient):
+        """Test that modifying the user invalidates the old ETag"""
+        user_id, headers = register_and_login(client, "etagchange")
+        etag = client.get("/api/v1/users/me", headers=headers).headers["ETag"]
+        
+        client.put("/api/v1/users/me", json={"bio": "changed"}, headers=headers)
+        
+        response = client.get("/api/v1/users/me", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["bio"] == "changed"
+        assert response.headers["ETag"] != etag
+    
+    def test_if_modified_since(self, client: TestClient):
+        """Test Last-Modified based revalidation"""
+        user_id, headers = register_and_login(client, "imsuser")
+        
+        future = http_date(datetime.utcnow() + timedelta(minutes=1))
+        response = client.get(f"/api/v1/users/{user_id}", headers={**headers, "If-Modified-Since": future})
+        assert response.status_code == 304
+        
+        past = http_date(datetime.utcnow() - timedelta(days=1))
+        response = client.get(f"/api/v1/users/{user_id}", headers={**headers, "If-Modified-Since": past})
+        assert response.status_code == 200
+    
+    def test_missing_user_with_validators(self, client: TestClient):
+        """Test that conditional requests for missing users still 404"""
+        _, headers = register_and_login(client, "etagmissing")
+        response = client.get("/api/v1/users/999999", headers={**headers, "If-None-Match": "*"})
+        assert response.status_code == 404
@@ -0,0 +1,170 @@
+import io
+import json
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.instrumentation import (
+    LATENCY_BUCKETS_MS, HTTPMetrics, Histogram, InstrumentationMiddleware, access_logger,
+    start_access_log, stop_access_log,
+)
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def access_records():
+    """Records reaching the access logger"""
+    handler = _ListHandler()
+    level = access_logger.level
+    access_logger.addHandler(handler)
+    access_logger.setLevel(logging.INFO)
+    yield handler.records
+    access_logger.setLevel(level)
+    access_logger.removeHandler(handler)
+
+
+def build_app(metrics: HTTPMetrics, sample_rate: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    app.add_middleware(InstrumentationMiddleware, metrics=metrics, sample_rate=sample_rate)
+    return app
+
+
+class TestHistogram:
+    """Test fixed-bucket latency histogram"""
+
+    def test_bucket_assignment(self):
+        """Test observations land in the first bucket whose bound covers them"""
+        histogram = Histogram()
+    
+        histogram.observe(0.5)
+        histogram.observe(1)
+        histogram.observe(3)
+        histogram.observe(60000)
+    
+        assert histogram.counts[0] == 2
+        assert histogram.counts[LATENCY_BUCKETS_MS.index(5)] == 1
+        assert histogram.counts[-1] == 1
+        assert histogram.count == 4
+        assert histogram.sum_ms == pytest.approx(60004.5)
+
+    def test_quantiles(self):
+        """Test quantiles report bucket upper bounds"""
+        histogram = Histogram()
+        assert histogram.quantile(0.5) is None
+    
+        for _ in range(99):
+            histogram.observe(2)
+        histogram.observe(400)
+    
+        assert histogram.quantile(0.5) == 2.5
+        assert histogram.quantile(0.99) == 2.5
+        assert histogram.quantile(1.0) == 500
+
+
+class TestInstrumentationMiddleware:
+    """Test per-route metrics, headers and sampled access logging"""
+
+    def test_route_template_labels(self):
+        """Test requests are grouped by route template, not raw path"""
+        metrics = HTTPMetrics()
+        client = TestClient(build_app(metrics, sample_rate=0))
+    
+        client.get("/items/1")
+        client.get("/items/2")
+        client.get("/missing")
+    
+        snapshot = metrics.snapshot()
+        assert snapshot["in_flight"] == 0
+        assert snapshot["routes"]["GET /items/{item_id}"]["count"] == 2
+        assert snapshot["routes"]["GET /items/{item_id}"]["statuses"] == {"200": 2}
+        assert snapshot["routes"]["GET unmatched"]["statuses"] == {"404": 1}
+
+    def test_headers(self):
+        """Test timing and database headers are set"""
+        client = TestClient(build_app(HTTPMetrics(), sample_rate=0))
+    
+        response = client.get("/items/1")
+    
+        assert float(response.headers["X-Process-Time"]) >= 0
+        assert response.headers["X-DB-Queries"] == "0"
+
+    def test_sampled_and_error_logging(self, access_records):
+        """Test sample rate 0 only logs server errors"""
+        metrics = HTTPMetrics()
+        client = TestClient(build_app(metrics, sample_rate=0), raise_server_exceptions=False)
+    
+        client.get("/items/1")
+        client.get("/boom")
+    
+        assert [(r.route, r.status) for r in access_records] == [("/boom", 500)]
+        assert metrics.snapshot()["routes"]["GET /boom"]["statuses"] == {"500": 1}
+
+    def test_full_sampling(self, access_records):
+        """Test sample rate 1 logs every request with structured fields"""
+        client = TestClient(build_app(HTTPMetrics(), sample_rate=1))
+    
+        client.get("/items/7")
+    
+        record = access_records[0]
+        assert record.route == "/items/{item_id}"
+        assert record.path == "/items/7"
+        assert record.status == 200
+        assert record.duration_ms >= 0
+
+    def test_queued_json_output(self):
+        """Test the listener thread writes one JSON object per record"""
+        stream = io.StringIO()
+        stop_access_log()
+        start_access_log(stream)
+        try:
+            access_logger.info("request", extra={"route": "/x", "status": 201})
+        finally:
+            # Flushes the queue before returning
+            stop_access_log()
+    
+        entry = json.loads(stream.getvalue().splitlines()[0])
+        assert entry["event"] == "request"
+        assert entry["route"] == "/x"
+        assert entry["status"] == 201
+
+
+class TestMetricsEndpoint:
+    """Test HTTP metrics exposure"""
+
+    def test_http_section(self, client: TestClient):
+        """Test /metrics reports the health route by template"""
+        client.get("/health")
+    
+        data = client.get("/metrics").json()["http"]
+    
+        assert data["routes"]["GET /health"]["count"] >= 1
+        assert data["in_flight"] == 1  # the /metrics request itself
+
+    def test_prometheus_format(self, client: TestClient):
+        """Test Prometheus text exposition"""
+        client.get("/health")
+    
+        response = client.get("/metrics?format=prometheus")
+    
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'http_request_duration_seconds_count{method="GET",route="/health"}' in response.text
@@ -0,0 +1,45 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core.db_metrics import TimedQueuePool, db_metrics, start_request_stats
+
+
+class TestDatabaseMetrics:
+    """Test database pool and query metrics"""
+    
+    def test_db_headers(self, client: TestClient):
+        """Test per-request database headers"""
+        response = client.post("/api/v1/users/register", json={
+            "email": "metrics@example.com",
+            "username": "metricsuser",
+            "password": "testpassword123"
+        })
+        
+        assert int(response.headers["X-DB-Queries"]) >= 1
+        assert float(response.headers["X-DB-Time"]) >= 0
+        assert "X-DB-Pool-Wait" in response.headers
+    
+    def test_metrics_endpoint(self, client: TestClient):
+        """Test metrics endpoint"""
+        response = client.get("/metrics")
+        
+        assert response.status_code == 200
+        data = response.json()["db"]
+        assert "queries_total" in data
+        assert "pool_wait_seconds_max" in data
+        assert "checked_out" in data["pools"]["async"]
+    
+    def test_checkout_wait_recorded(self, tmp_path):
+        """Test that timed pools record checkouts for the current request"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool, pool_size=1)
+        before = db_metrics.snapshot()["checkouts_total"]
+        stats = start_request_stats()
+        
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        
+        assert stats.checkouts == 1
+        assert stats.queries == 1
+        assert db_metrics.snapshot()["checkouts_total"] == before + 1
+        engine.dispose()
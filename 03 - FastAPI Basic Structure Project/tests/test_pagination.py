@@ -0,0 +1,77 @@
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+
+from app.core.exceptions import ValidationException
+from app.core.pagination import encode_cursor, decode_cursor
+from app.models.user import User
+
+
+@pytest.fixture
+def paging_headers(client: TestClient):
+    """Register a handful of users and return auth headers for one of them"""
+    for i in range(5):
+        client.post("/api/v1/users/register", json={
+            "email": f"pageuser{i}@example.com",
+            "username": f"pageuser{i}",
+            "password": "testpassword123"
+        })
+    response = client.post("/api/v1/users/login", data={
+        "username": "pageuser0@example.com",
+        "password": "testpassword123"
+    })
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def walk_pages(client: TestClient, headers, **params):
+    """Follow next_cursor until the last page, returning all rows"""
+    rows = []
+    cursor = None
+    while True:
+        query = dict(params, limit=2)
+        if cursor:
+            query["cursor"] = cursor
+        response = client.get("/api/v1/users/", params=query, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        rows.extend(data["users"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            return rows
+
+
+class TestKeysetPagination:
+    """Test cursor pagination of the users list"""
+    
+    def test_pages_cover_every_user_once(self, client: TestClient, paging_headers):
+        """Test that walking the cursor visits each user exactly once, in order"""
+        rows = walk_pages(client, paging_headers)
+        ids = [row["id"] for row in rows]
+        
+        response = client.get("/api/v1/users/?exact_total=true", headers=paging_headers)
+        assert response.json()["total_exact"] is True
+        assert len(ids) == response.json()["total"]
+        assert ids == sorted(set(ids))
+    
+    def test_created_at_ordering(self, client: TestClient, paging_headers):
+        """Test paging by (created_at, id)"""
+        rows = walk_pages(client, paging_headers, order="created_at")
+        keys = [(row["created_at"], row["id"]) for row in rows]
+        
+        assert keys == sorted(keys)
+        assert len({row["id"] for row in rows}) == len(rows)
+    
+    def test_invalid_cursor(self, client: TestClient, paging_headers):
+        """Test that a malformed cursor is rejected"""
+        response = client.get("/api/v1/users/?cursor=not-a-cursor", headers=paging_headers)
+        assert response.status_code == 422
+    
+    def test_cursor_round_trip(self):
+        """Test that cursors decode back to typed sort keys"""
+        columns = [User.created_at, User.id]
+        created = datetime(2024, 1, 2, 3, 4, 5)
+        cursor = encode_cursor([created, 7], "created_at")
+        
+        assert decode_cursor(cursor, columns, "created_at") == [created, 7]
+        with pytest.raises(ValidationException):
+            decode_cursor(cursor, columns, "id")
@@ -0,0 +1,161 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import rate_limit
+from app.core.exceptions import ServiceUnavailableException
+from app.core.rate_limit import (
+    ConcurrencyLimiter,
+    MemoryRateLimitBackend,
+    RateLimiter,
+    RedisRateLimitBackend,
+    SlidingWindow,
+    TokenBucket,
+    rate_limiter,
+    LOGIN_ACCOUNT_RULE,
+    REGISTER_IP_RULE,
+)
+from .fake_redis import FakeRedis
+
+
+class FakeClock:
+    def __init__(self, start: float):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Drives both the wall and monotonic clocks used by the limiter"""
+    fake = FakeClock(60 * 16667 + 20.0)  # 20s into a 60s window
+    monkeypatch.setattr(rate_limit.time, "time", fake)
+    monkeypatch.setattr(rate_limit.time, "monotonic", fake)
+    return fake
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """The app's limiter, enabled with a fresh in-memory backend"""
+    monkeypatch.setattr(rate_limiter, "enabled", True)
+    monkeypatch.setattr(rate_limiter, "_backend", MemoryRateLimitBackend())
+    return rate_limiter
+
+
+class TestAlgorithms:
+    """Test token bucket and sliding window limits"""
+
+    def test_token_bucket(self, clock):
+        """Test burst capacity, refusal and refill"""
+        limiter = RateLimiter(backend=MemoryRateLimitBackend(), enabled=True)
+        rule = TokenBucket("tb", rate=1, capacity=3)
+    
+        async def scenario():
+            results = [await limiter.hit(rule, "k") for _ in range(4)]
+            assert [r.allowed for r in results] == [True, True, True, False]
+            assert results[-1].retry_after == pytest.approx(1)
+    
+            clock.now += 2
+            assert (await limiter.hit(rule, "k")).allowed
+            assert (await limiter.hit(rule, "k")).allowed
+            assert not (await limiter.hit(rule, "k")).allowed
+    
+            # Keys are independent
+            assert (await limiter.hit(rule, "other")).allowed
+    
+        asyncio.run(scenario())
+
+    def run_sliding_window(self, backend, clock):
+        limiter = RateLimiter(backend=backend, enabled=True)
+        rule = SlidingWindow("sw", limit=3, window=60)
+    
+        async def scenario():
+            results = [await limiter.hit(rule, "k") for _ in range(4)]
+            assert [r.allowed for r in results] == [True, True, True, False]
+            assert 0 < results[-1].retry_after <= 40
+    
+            # Halfway through the next window, the previous 4 weigh as 2
+            clock.now += 70
+            assert (await limiter.hit(rule, "k")).allowed
+            assert not (await limiter.hit(rule, "k")).allowed
+    
+            # Two windows later nothing is left
+            clock.now += 120
+            assert (await limiter.hit(rule, "k")).allowed
+            assert limiter.stats()["denied"] == {"sw": 2}
+    
+        asyncio.run(scenario())
+
+    def test_sliding_window_memory(self, clock):
+        """Test the sliding window in memory"""
+        self.run_sliding_window(MemoryRateLimitBackend(), clock)
+
+    def test_sliding_window_redis(self, clock):
+        """Test the sliding window against the Redis backend"""
+        self.run_sliding_window(RedisRateLimitBackend(redis=FakeRedis()), clock)
+
+    def test_memory_backend_bounded(self):
+        """Test that spraying keys evicts old ones instead of growing"""
+        limiter = RateLimiter(backend=MemoryRateLimitBackend(maxsize=10), enabled=True)
+        rule = TokenBucket("tb", rate=1, capacity=1)
+    
+        async def scenario():
+            for i in range(100):
+                await limiter.hit(rule, f"ip{i}")
+    
+        asyncio.run(scenario())
+        assert len(limiter.backend.state) == 10
+
+
+class TestConcurrencyLimiter:
+    """Test admission control"""
+
+    def test_sheds_over_limit(self):
+        """Test requests over the limit are rejected with Retry-After"""
+        limiter = ConcurrencyLimiter(limit=1)
+    
+        async def scenario():
+            async with limiter:
+                with pytest.raises(ServiceUnavailableException) as exc_info:
+                    async with limiter:
+                        pass
+                assert exc_info.value.headers == {"Retry-After": "1"}
+            async with limiter:
+                pass
+    
+        asyncio.run(scenario())
+        assert limiter.stats() == {"limit": 1, "in_flight": 0, "shed_total": 1}
+
+
+class TestRateLimitedEndpoints:
+    """Test limits on /login and /register"""
+
+    def test_login_per_account(self, client: TestClient, limiter, monkeypatch):
+        """Test repeated logins for one account get 429 with Retry-After"""
+        monkeypatch.setattr(LOGIN_ACCOUNT_RULE, "limit", 2)
+        credentials = {"username": "rl-victim@example.com", "password": "wrong"}
+    
+        statuses = [client.post("/api/v1/users/login", data=credentials).status_code for _ in range(2)]
+        response = client.post("/api/v1/users/login", data=credentials)
+    
+        assert statuses == [401, 401]
+        assert response.status_code == 429
+        assert response.json()["error"] == "RATE_LIMITED"
+        assert int(response.headers["Retry-After"]) >= 1
+        assert client.get("/metrics").json()["rate_limit"]["denied"]["login_account"] >= 1
+
+    def test_register_per_ip(self, client: TestClient, limiter, monkeypatch):
+        """Test registrations from one IP are capped"""
+        monkeypatch.setattr(REGISTER_IP_RULE, "limit", 1)
+    
+        first = client.post("/api/v1/users/register", json={
+            "email": "rl-first@example.com", "username": "rlfirst", "password": "testpassword123"
+        })
+        second = client.post("/api/v1/users/register", json={
+            "email": "rl-second@example.com", "username": "rlsecond", "password": "testpassword123"
+        })
+    
+        assert first.status_code == 201
+        assert second.status_code == 429
@@ -0,0 +1,260 @@
+import asyncio
+import contextvars
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.core import db_routing
+from app.core.response_cache import MemoryCacheBackend, response_cache
+from app.core.db_routing import (
+    RoutingAsyncSession,
+    RoutingSession,
+    StickyPrimary,
+    route_for,
+    route_for_method,
+)
+from app.database import Base, get_async_db
+from app.main import app
+from app.models.user import User
+from .conftest import async_engine as primary_async_engine
+from .fake_redis import FakeRedis
+
+
+def add_user(session, name: str):
+    session.add(User(email=f"{name}@example.com", username=name, hashed_password="x"))
+    session.commit()
+
+
+def usernames(session) -> set:
+    return set(session.execute(select(User.username)).scalars())
+
+
+def in_request(fn, *args):
+    """Run `fn` with fresh per-request routing state"""
+    return contextvars.copy_context().run(fn, *args)
+
+
+@pytest.fixture
+def sticky(monkeypatch):
+    """Sticky-to-primary tracking, enabled as if a replica were configured"""
+    tracker = StickyPrimary(window=30, enabled=True)
+    monkeypatch.setattr(db_routing, "sticky_primary", tracker)
+    return tracker
+
+
+@pytest.fixture
+def databases(tmp_path):
+    """Two SQLite files standing in for the primary and the replica"""
+    engines = {}
+    for name in ("primary", "replica"):
+        engines[name] = create_engine(f"sqlite:///{tmp_path / name}.db")
+        Base.metadata.create_all(bind=engines[name])
+        with sessionmaker(bind=engines[name])() as session:
+            add_user(session, f"on{name}")
+    yield engines
+    for engine in engines.values():
+        engine.dispose()
+
+
+@pytest.fixture
+def session_factory(databases):
+    return sessionmaker(
+        class_=RoutingSession, autoflush=False, primary=databases["primary"], replica=databases["replica"]
+    )
+
+
+class TestRoutingSession:
+    """Test which database each query is sent to"""
+
+    def test_reads_use_replica(self, session_factory):
+        """Test plain reads go to the replica"""
+        def scenario():
+            with session_factory() as session:
+                assert usernames(session) == {"onreplica"}
+    
+        in_request(scenario)
+
+    def test_writes_use_primary_and_reads_follow(self, session_factory, databases):
+        """Test writes go to the primary and the session then reads its own writes"""
+        def scenario():
+            with session_factory() as session:
+                add_user(session, "written")
+                assert usernames(session) == {"onprimary", "written"}
+    
+        in_request(scenario)
+        with sessionmaker(bind=databases["replica"])() as replica:
+            assert usernames(replica) == {"onreplica"}
+
+    def test_unsafe_methods_read_primary(self, session_factory):
+        """Test a request that may write reads from the primary throughout"""
+        def scenario(method):
+            route_for_method(method)
+            with session_factory() as session:
+                return usernames(session)
+    
+        assert in_request(scenario, "GET") == {"onreplica"}
+        assert in_request(scenario, "PUT") == {"onprimary"}
+
+    def test_sticky_after_write(self, session_factory, sticky):
+        """Test a user's reads go to the primary for a window after they write"""
+        # Each asyncio.run is a separate request context
+        async def write(key):
+            await route_for(key)
+            with session_factory() as session:
+                add_user(session, "stickywriter")
+    
+        async def read(key):
+            await route_for(key)
+            with session_factory() as session:
+                return usernames(session)
+    
+        asyncio.run(write("Writer@example.com"))
+    
+        assert "stickywriter" in asyncio.run(read("writer@example.com"))
+        assert asyncio.run(read("someone-else@example.com")) == {"onreplica"}
+    
+        sticky.recent.clear()
+        assert asyncio.run(read("writer@example.com")) == {"onreplica"}
+
+    def test_without_replica(self, databases):
+        """Test everything goes to the primary when no replica is configured"""
+        factory = sessionmaker(class_=RoutingSession, primary=databases["primary"])
+    
+        with factory() as session:
+            assert usernames(session) == {"onprimary"}
+
+
+class TestStickyPrimary:
+    """Test sticky marks across workers"""
+
+    def test_shared_through_redis(self):
+        """Test one worker's write makes the user sticky on another"""
+        redis = FakeRedis()
+        worker_a = StickyPrimary(window=5, enabled=True, redis=redis)
+        worker_b = StickyPrimary(window=5, enabled=True, redis=redis)
+    
+        async def scenario():
+            assert not await worker_b.is_sticky("alice@example.com")
+            await worker_a.share("Alice@example.com")
+            assert await worker_b.is_sticky("alice@example.com")
+    
+        asyncio.run(scenario())
+
+    def test_disabled_without_replica(self):
+        """Test nothing is tracked when there is no replica"""
+        tracker = StickyPrimary(window=5, enabled=False)
+    
+        tracker.remember("alice@example.com")
+    
+        assert not asyncio.run(tracker.is_sticky("alice@example.com"))
+        assert tracker.stats()["marked"] == 0
+
+
+class TestAsyncRouting:
+    """Test the async session the endpoints use"""
+
+    def test_async_session(self, databases, sticky):
+        """Test async reads, writes and the shared sticky mark"""
+        sticky._redis = FakeRedis()
+        engines = {
+            name: create_async_engine(str(engine.url).replace("sqlite://", "sqlite+aiosqlite://", 1))
+            for name, engine in databases.items()
+        }
+        factory = async_sessionmaker(
+            class_=RoutingAsyncSession,
+            expire_on_commit=False,
+            primary=engines["primary"].sync_engine,
+            replica=engines["replica"].sync_engine,
+        )
+    
+        async def scenario():
+            await route_for("asyncwriter@example.com")
+            async with factory() as db:
+                assert set((await db.execute(select(User.username))).scalars()) == {"onreplica"}
+                db.add(User(email="asyncwriter@example.com", username="asyncwriter", hashed_password="x"))
+                await db.commit()
+                assert "asyncwriter" in set((await db.execute(select(User.username))).scalars())
+            for engine in engines.values():
+                await engine.dispose()
+    
+        asyncio.run(scenario())
+        assert asyncio.run(sticky.redis.get("sticky:asyncwriter@example.com")) is not None
+
+
+class TestReplicaEndpoints:
+    """Test read-your-writes through the API with a replica that never catches up"""
+
+    @pytest.fixture
+    def lagging_replica(self, tmp_path, sticky):
+        replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'lagging.db'}", poolclass=NullPool)
+        sync_replica = create_engine(f"sqlite:///{tmp_path / 'lagging.db'}")
+        Base.metadata.create_all(bind=sync_replica)
+        sync_replica.dispose()
+        factory = async_sessionmaker(
+            class_=RoutingAsyncSession,
+            autoflush=False,
+            expire_on_commit=False,
+            primary=primary_async_engine.sync_engine,
+            replica=replica.sync_engine,
+        )
+    
+        async def routed_get_async_db(request: Request):
+            route_for_method(request.method)
+            async with factory() as db:
+                yield db
+    
+        previous = app.dependency_overrides[get_async_db]
+        app.dependency_overrides[get_async_db] = routed_get_async_db
+        yield
+        app.dependency_overrides[get_async_db] = previous
+
+    def register_and_login(self, client: TestClient, names) -> dict:
+        headers = {}
+        for name in names:
+            client.post("/api/v1/users/register", json={
+                "email": f"{name}@example.com", "username": name, "password": "testpassword123"
+            })
+            response = client.post("/api/v1/users/login", data={
+                "username": f"{name}@example.com", "password": "testpassword123"
+            })
+            headers[name] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return headers
+
+    def test_reads_follow_own_writes(self, client: TestClient, lagging_replica, monkeypatch):
+        """Test a new user can read their row while other users read the replica"""
+        # Uncached, so the endpoint itself reads the replica
+        monkeypatch.setattr(response_cache, "enabled", False)
+        headers = self.register_and_login(client, ("replicareader", "replicawriter"))
+        # Loads (and caches) the reader's principal while still sticky
+        assert client.get("/api/v1/users/me", headers=headers["replicareader"]).status_code == 200
+        writer_id = client.get("/api/v1/users/me", headers=headers["replicawriter"]).json()["id"]
+        db_routing.sticky_primary.recent.delete("replicareader@example.com")
+    
+        # Anyone else reads the replica, which has not caught up
+        other = client.get(f"/api/v1/users/{writer_id}", headers=headers["replicareader"])
+        assert other.status_code == 404
+        # The writer registered moments ago, so their reads use the primary
+        own = client.get(f"/api/v1/users/{writer_id}", headers=headers["replicawriter"])
+        assert own.status_code == 200
+
+    def test_cached_responses_built_on_primary(self, client: TestClient, lagging_replica, monkeypatch):
+        """Test a response that will be cached is never built from the lagging replica"""
+        monkeypatch.setattr(response_cache, "enabled", True)
+        monkeypatch.setattr(response_cache, "_backend", MemoryCacheBackend())
+        headers = self.register_and_login(client, ("cachereader", "cachewriter"))
+        # Loads (and caches) the reader's principal while still sticky
+        assert client.get("/api/v1/users/me", headers=headers["cachereader"]).status_code == 200
+        writer_id = client.get("/api/v1/users/me", headers=headers["cachewriter"]).json()["id"]
+        db_routing.sticky_primary.recent.clear()
+    
+        first = client.get(f"/api/v1/users/{writer_id}", headers=headers["cachereader"])
+        again = client.get(f"/api/v1/users/{writer_id}", headers=headers["cachereader"])
+    
+        assert first.status_code == 200
+        assert again.json() == first.json()
+        assert response_cache.hits >= 1
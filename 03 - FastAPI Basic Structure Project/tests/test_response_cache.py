@@ -0,0 +1,189 @@
+import asyncio
+from fastapi import Response
+from fastapi.testclient import TestClient
+
+from app.core.response_cache import ResponseCache, RedisCacheBackend, MemoryCacheBackend
+from .fake_redis import FakeRedis
+
+
+def register_and_login(client: TestClient, name: str):
+    response = client.post("/api/v1/users/register", json={
+        "email": f"{name}@example.com",
+        "username": name,
+        "password": "testpassword123"
+    })
+    user_id = response.json()["id"]
+    response = client.post("/api/v1/users/login", data={
+        "username": f"{name}@example.com",
+        "password": "testpassword123"
+    })
+    return user_id, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+class TestResponseCacheEndpoints:
+    """Test cached user reads and invalidation through the services"""
+    
+    def test_cached_read_skips_db(self, client: TestClient):
+        """Test that a repeated read is served without queries"""
+        user_id, headers = register_and_login(client, "rcuser")
+        client.get("/api/v1/users/me", headers=headers)  # warm the principal cache
+        
+        first = client.get(f"/api/v1/users/{user_id}", headers=headers)
+        second = client.get(f"/api/v1/users/{user_id}", headers=headers)
+        
+        assert second.status_code == 200
+        assert second.content == first.content
+        assert second.headers["ETag"] == first.headers["ETag"]
+        assert second.headers["X-DB-Queries"] == "0"
+    
+    def test_update_invalidates_cached_read(self, client: TestClient):
+        """Test that updating a user invalidates its cached response"""
+        user_id, headers = register_and_login(client, "rcupdate")
+        client.get(f"/api/v1/users/{user_id}", headers=headers)
+        
+        client.put("/api/v1/users/me", json={"bio": "fresh"}, headers=headers)
+        
+        response = client.get(f"/api/v1/users/{user_id}", headers=headers)
+        assert response.json()["bio"] == "fresh"
+    
+    def test_create_invalidates_cached_list(self, client: TestClient):
+        """Test that registering a user invalidates cached lists"""
+        _, headers = register_and_login(client, "rclist")
+        before = client.get("/api/v1/users/?exact_total=true&limit=1000", headers=headers).json()
+        
+        register_and_login(client, "rclist2")
+        
+        after = client.get("/api/v1/users/?exact_total=true&limit=1000", headers=headers).json()
+        assert after["total"] == before["total"] + 1
+
+
+class TestResponseCacheBackends:
+    """Test the cache against both backends"""
+    
+    def run_scenario(self, backend):
+        cache = ResponseCache(backend=backend, enabled=True)
+        calls = []
+        
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return Response(content=b'{"n":1}', media_type="application/json")
+        
+        async def scenario():
+            # Concurrent misses collapse into one computation
+            entries = await asyncio.gather(*(
+                cache.get_or_compute("k", ["users:1"], 30, compute) for _ in range(5)
+            ))
+            assert len(calls) == 1
+            assert all(entry["b"] == '{"n":1}' for entry in entries)
+            
+            await cache.get_or_compute("k", ["users:1"], 30, compute)
+            assert len(calls) == 1
+            
+            await cache.invalidate(["users:1"])
+            await cache.get_or_compute("k", ["users:1"], 30, compute)
+            assert len(calls) == 2
+            
+            # Other tags are unaffected
+            await cache.invalidate(["users:2"])
+            await cache.get_or_compute("k", ["users:1"], 30, compute)
+            assert len(calls) == 2
+        
+        asyncio.run(scenario())
+    
+    def test_memory_backend(self):
+        """Test single-flight, TTL entry reuse and tag invalidation in memory"""
+        self.run_scenario(MemoryCacheBackend())
+    
+    def test_redis_backend(self):
+        """Test the same behaviour against the Redis backend"""
+        self.run_scenario(RedisCacheBackend(redis=FakeRedis()))
+    
+    def test_redis_shared_between_workers(self):
+        """Test that one worker's invalidation reaches another's cache"""
+        redis = FakeRedis()
+        worker_a = ResponseCache(backend=RedisCacheBackend(redis=redis), enabled=True)
+        worker_b = ResponseCache(backend=RedisCacheBackend(redis=redis), enabled=True)
+        calls = []
+        
+        async def compute():
+            calls.append(1)
+            return Response(content=b"{}", media_type="application/json")
+        
+        async def scenario():
+            await worker_a.get_or_compute("k", ["users"], 30, compute)
+            await worker_b.get_or_compute("k", ["users"], 30, compute)
+            assert len(calls) == 1
+            await worker_a.invalidate(["users"])
+            await worker_b.get_or_compute("k", ["users"], 30, compute)
+            assert len(calls) == 2
+        
+        asyncio.run(scenario())
+    
+    def test_memory_tags_bounded(self):
+        """Test tag versions are bounded and an evicted tag invalidates its entries"""
+        cache = ResponseCache(backend=MemoryCacheBackend(maxsize=2), enabled=True)
+        calls = []
+        
+        async def compute():
+            calls.append(1)
+            return Response(content=b"{}", media_type="application/json")
+        
+        async def scenario():
+            await cache.get_or_compute("k", ["users:1"], 30, compute)
+            await cache.get_or_compute("k", ["users:1"], 30, compute)
+            assert len(calls) == 1
+            # Touch enough other tags to push users:1 out
+            await cache.backend.tag_versions([f"users:{i}" for i in range(2, 12)])
+            assert len(cache.backend._tags) == 2 * MemoryCacheBackend.tags_per_entry
+            await cache.get_or_compute("k", ["users:1"], 30, compute)
+            assert len(calls) == 2
+        
+        asyncio.run(scenario())
+    
+    def test_memory_backend_disabled_with_several_workers(self):
+        """Test the in-process backend is turned off unless it is the only worker or allowed"""
+        assert not ResponseCache(backend=MemoryCacheBackend(), enabled=True).disable_if_unshared(1)
+        assert not ResponseCache(backend=RedisCacheBackend(redis=FakeRedis()), enabled=True).disable_if_unshared(4)
+        allowed = ResponseCache(backend=MemoryCacheBackend(), enabled=True, allow_local=True)
+        assert not allowed.disable_if_unshared(4)
+        assert allowed.enabled
+        
+        cache = ResponseCache(backend=MemoryCacheBackend(), enabled=True)
+        assert cache.disable_if_unshared(4)
+        assert not cache.enabled
+    
+    def test_redis_lock_released_only_by_owner(self):
+        """Test a build that outlived its lock cannot release another worker's lock"""
+        redis = FakeRedis()
+        backend = RedisCacheBackend(redis=redis)
+        
+        async def scenario():
+            stale = await backend.acquire("k", 5)
+            assert await backend.acquire("k", 5) is None
+            # The lock expires mid-build and another worker takes it
+            await redis.delete("respcache:lock:k")
+            current = await backend.acquire("k", 5)
+            await backend.release("k", stale)
+            assert await redis.get("respcache:lock:k") == current.encode()
+            await backend.release("k", current)
+            assert await redis.get("respcache:lock:k") is None
+        
+        asyncio.run(scenario())
+    
+    def test_uncacheable_responses_are_not_stored(self):
+        """Test that non-200 responses are returned but never cached"""
+        cache = ResponseCache(backend=MemoryCacheBackend(), enabled=True)
+        calls = []
+        
+        async def compute():
+            calls.append(1)
+            return Response(status_code=304)
+        
+        async def scenario():
+            for _ in range(2):
+                result = await cache.get_or_compute("k", [], 30, compute)
+                assert result.status_code == 304
+        
+        asyncio.run(scenario())
+        assert len(calls) == 2
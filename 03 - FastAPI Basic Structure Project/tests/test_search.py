@@ -0,0 +1,108 @@
+from fastapi.testclient import TestClient
+
+from app.core.search import scan_statement, search_statement, search_terms
+from app.models.user import User
+from .conftest import TestingSessionLocal
+
+
+def register(client: TestClient, name: str, **fields) -> dict:
+    response = client.post("/api/v1/users/register", json={
+        "email": f"{name}@example.com",
+        "username": name,
+        "password": "testpassword123",
+        **fields
+    })
+    assert response.status_code == 201
+    return response.json()
+
+
+def login(client: TestClient, name: str) -> dict:
+    response = client.post("/api/v1/users/login", data={
+        "username": f"{name}@example.com",
+        "password": "testpassword123"
+    })
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def search(client: TestClient, headers: dict, q: str, **params) -> dict:
+    response = client.get("/api/v1/users/search", params={"q": q, **params}, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def found(results: dict) -> list:
+    return [user["username"] for user in results["users"]]
+
+
+class TestSearchTerms:
+    """Test query parsing"""
+
+    def test_words_only(self):
+        """Test punctuation separates words and is never passed to the index"""
+        assert search_terms('Alice_Smith "OR" @example.co*') == ["alice", "smith", "or", "example", "co"]
+        assert search_terms("!!") == []
+
+
+class TestUserSearch:
+    """Test the indexed search endpoint"""
+
+    def test_prefixes_across_fields(self, client: TestClient):
+        """Test every word must match a word prefix in some field"""
+        register(client, "zeldasearch", full_name="Zelda Quixote")
+        headers = login(client, "zeldasearch")
+    
+        assert found(search(client, headers, "zel quix")) == ["zeldasearch"]
+        assert found(search(client, headers, "Quixote")) == ["zeldasearch"]
+        assert found(search(client, headers, "quix nobodyelse")) == []
+
+    def test_ranked(self, client: TestClient):
+        """Test a username match ranks above a mention in a bio"""
+        register(client, "fanofmarblecat", bio="Posts about marblecat all day")
+        register(client, "marblecat", full_name="Marble Cat")
+        headers = login(client, "marblecat")
+    
+        assert found(search(client, headers, "marblecat")) == ["marblecat", "fanofmarblecat"]
+
+    def test_index_follows_updates(self, client: TestClient):
+        """Test the index is kept in sync when a user changes their name"""
+        register(client, "renamesearch", full_name="Oldname Person")
+        headers = login(client, "renamesearch")
+        assert found(search(client, headers, "oldname")) == ["renamesearch"]
+    
+        client.put("/api/v1/users/me", json={"full_name": "Newname Person"}, headers=headers)
+    
+        assert found(search(client, headers, "oldname")) == []
+        assert found(search(client, headers, "newname")) == ["renamesearch"]
+
+    def test_paginated(self, client: TestClient):
+        """Test limit and offset walk through the ranked results"""
+        for i in range(3):
+            register(client, f"pagesearch{i}", full_name="Pagination Tester")
+        headers = login(client, "pagesearch0")
+    
+        first = search(client, headers, "pagination tester", limit=2)
+        second = search(client, headers, "pagination tester", limit=2, offset=first["next_offset"])
+    
+        assert first["next_offset"] == 2
+        assert second["next_offset"] is None
+        assert sorted(found(first) + found(second)) == ["pagesearch0", "pagesearch1", "pagesearch2"]
+
+    def test_requires_authentication(self, client: TestClient):
+        """Test anonymous callers are rejected"""
+        response = client.get("/api/v1/users/search", params={"q": "anything"})
+    
+        assert response.status_code in (401, 403)
+
+    def test_scan_agrees_with_index(self, client: TestClient):
+        """Test the ILIKE fallback finds the same users as the FTS index"""
+        register(client, "scansearch", full_name="Scanner Darkly")
+        db = TestingSessionLocal()
+        try:
+            fields = ["username"]
+            stmt, params = search_statement("sqlite", User, fields, "scanner dark", 10, 0)
+            indexed = [row.username for row in db.execute(stmt, params)]
+            scanned = [row.username for row in db.execute(scan_statement(User, fields, ["scanner", "dark"], 10, 0))]
+        finally:
+            db.close()
+    
+        assert indexed == scanned == ["scansearch"]
@@ -0,0 +1,46 @@
+from fastapi.testclient import TestClient
+
+from app.models.user import User as UserModel
+from app.schemas.user import User, UserList
+from .conftest import TestingSessionLocal
+
+
+def login(client: TestClient, email: str, username: str):
+    client.post("/api/v1/users/register", json={
+        "email": email,
+        "username": username,
+        "full_name": "Fast Path",
+        "password": "testpassword123"
+    })
+    response = client.post("/api/v1/users/login", data={
+        "username": email,
+        "password": "testpassword123"
+    })
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+class TestSerializationFastPath:
+    """Test that fast-path responses match the User schema exactly"""
+    
+    def test_user_matches_schema(self, client: TestClient):
+        """Test that a single user serializes as the schema would"""
+        headers = login(client, "fastpath@example.com", "fastpath")
+        response = client.get("/api/v1/users/me", headers=headers)
+        
+        db = TestingSessionLocal()
+        stored = db.query(UserModel).filter(UserModel.email == "fastpath@example.com").one()
+        expected = User.model_validate(stored).model_dump(mode="json")
+        db.close()
+        
+        assert response.json() == expected
+        assert list(response.json()) == list(expected)
+        assert client.get(f"/api/v1/users/{expected['id']}", headers=headers).json() == expected
+    
+    def test_list_matches_schema(self, client: TestClient):
+        """Test that the list response validates against UserList"""
+        headers = login(client, "fastlist@example.com", "fastlist")
+        response = client.get("/api/v1/users/?limit=1000", headers=headers)
+        
+        data = response.json()
+        assert UserList.model_validate(data).model_dump(mode="json") == data
+        assert all("hashed_password" not in user for user in data["users"])
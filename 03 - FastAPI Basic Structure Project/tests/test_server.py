@@ -0,0 +1,56 @@
+import pytest
+
+from app import server
+from app.core import cache
+from app.core.hashing import password_hasher
+from app.core.response_cache import MemoryCacheBackend, response_cache
+from app.database import async_engine, engine
+
+
+class TestServerProfile:
+    """Test production server settings and per-worker setup"""
+
+    def test_worker_count(self, monkeypatch):
+        """Test explicit worker counts win over the CPU count"""
+        monkeypatch.setattr(server, "cpu_count", lambda: 6)
+    
+        assert server.worker_count(3) == 3
+        assert server.worker_count(0) == 6
+
+    def test_after_fork_replaces_pools(self, monkeypatch):
+        """Test a forked worker gets fresh pools and clients"""
+        monkeypatch.setattr(server, "HASH_WORKERS", 0)
+        monkeypatch.setattr(server, "cpu_count", lambda: 8)
+        monkeypatch.setattr(server, "worker_count", lambda: 4)
+        sync_pool = engine.pool
+        async_pool = async_engine.sync_engine.pool
+        cache._redis_client = object()
+        workers = password_hasher.workers
+        cache_enabled, cache_backend = response_cache.enabled, response_cache._backend
+        response_cache.enabled, response_cache._backend = True, MemoryCacheBackend()
+    
+        try:
+            server.after_fork()
+    
+            assert engine.pool is not sync_pool
+            assert async_engine.sync_engine.pool is not async_pool
+            assert cache._redis_client is None
+            assert password_hasher._executor is None
+            assert password_hasher.workers == 2
+            # Four workers would each hold a private response cache
+            assert not response_cache.enabled
+        finally:
+            password_hasher.reset_after_fork(workers)
+            response_cache.enabled, response_cache._backend = cache_enabled, cache_backend
+
+    def test_gunicorn_config(self):
+        """Test the gunicorn config file preloads and recycles workers"""
+        settings = {}
+        with open(server.CONFIG_FILE) as f:
+            exec(compile(f.read(), server.CONFIG_FILE, "exec"), settings)
+    
+        assert settings["preload_app"] is True
+        assert settings["worker_class"] == "app.workers.UvicornWorker"
+        assert settings["workers"] >= 1
+        assert settings["max_requests"] > 0
+        assert callable(settings["post_fork"])
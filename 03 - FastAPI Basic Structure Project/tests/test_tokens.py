@@ -0,0 +1,194 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from app.core import cache, security
+from app.core.auth_cache import RevocationStore
+from app.core.cache import ExpiringSet
+from .fake_redis import FakeRedis
+
+
+def register_and_login(client: TestClient, name: str) -> dict:
+    client.post("/api/v1/users/register", json={
+        "email": f"{name}@example.com",
+        "username": name,
+        "password": "testpassword123"
+    })
+    response = client.post("/api/v1/users/login", data={
+        "username": f"{name}@example.com",
+        "password": "testpassword123"
+    })
+    return response.json()
+
+
+def bearer(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+class TestExpiringSet:
+    """Test the bounded, self-expiring deny-list set"""
+
+    def test_members_expire(self, monkeypatch):
+        """Test members drop out at their expiry and the set shrinks"""
+        now = [1000.0]
+        monkeypatch.setattr(cache.time, "time", lambda: now[0])
+        members = ExpiringSet(maxsize=10)
+    
+        members.add("a", 1010)
+        members.add("b", 1020)
+        assert "a" in members and "b" in members
+    
+        now[0] = 1015
+        assert "a" not in members
+        assert len(members) == 1
+        assert "b" in members
+
+    def test_bounded(self, monkeypatch):
+        """Test the member closest to expiry is evicted when full"""
+        monkeypatch.setattr(cache.time, "time", lambda: 1000.0)
+        members = ExpiringSet(maxsize=2)
+    
+        members.add("soon", 1010)
+        members.add("late", 1030)
+        members.add("mid", 1020)
+    
+        assert "soon" not in members
+        assert "late" in members and "mid" in members
+        assert len(members) == 2
+
+
+class TestRevocationStore:
+    """Test revocation across workers"""
+
+    def test_shared_revocation(self):
+        """Test one worker's revocation is seen by another and is single-claim"""
+        redis = FakeRedis()
+        worker_a = RevocationStore(redis=redis)
+        worker_b = RevocationStore(redis=redis)
+        expires_at = time.time() + 60
+    
+        async def scenario():
+            assert not await worker_b.is_revoked("jti-1")
+            assert await worker_a.revoke("jti-1", expires_at)
+            # worker_b remembers "not revoked" briefly; start from a cold local tier
+            worker_b.not_revoked.clear()
+            assert await worker_b.is_revoked("jti-1")
+            assert not await worker_b.revoke("jti-1", expires_at)
+    
+        asyncio.run(scenario())
+
+    def test_full_local_set_never_forgets(self):
+        """Test that without Redis a full deny-list grows instead of un-revoking tokens"""
+        store = RevocationStore(maxsize=2)
+        expires_at = time.time() + 60
+    
+        async def scenario():
+            for jti in ("a", "b", "c"):
+                await store.revoke(jti, expires_at + ord(jti))
+            return [await store.is_revoked(jti) for jti in ("a", "b", "c")]
+    
+        assert asyncio.run(scenario()) == [True, True, True]
+        assert store.stats()["over_capacity"] is True
+        assert store.stats()["evicted_local"] == 0
+
+    def test_full_local_set_evicts_with_redis(self):
+        """Test that with Redis local evictions fall back to the shared copy"""
+        store = RevocationStore(maxsize=2, redis=FakeRedis())
+        expires_at = time.time() + 60
+    
+        async def scenario():
+            for jti in ("a", "b", "c"):
+                await store.revoke(jti, expires_at + ord(jti))
+            assert "a" not in store.revoked
+            return await store.is_revoked("a")
+    
+        assert asyncio.run(scenario())
+        assert store.stats()["evicted_local"] >= 1
+
+    def test_expired_tokens_not_stored(self):
+        """Test revoking an already-expired token is a no-op"""
+        store = RevocationStore()
+    
+        assert not asyncio.run(store.revoke("old", time.time() - 1))
+        assert len(store.revoked) == 0
+
+
+class TestRefreshTokens:
+    """Test refresh rotation, reuse detection and logout"""
+
+    def test_login_returns_refresh_token(self, client: TestClient):
+        """Test login issues both tokens"""
+        tokens = register_and_login(client, "refreshuser")
+    
+        assert tokens["refresh_token"]
+        assert client.get("/api/v1/users/me", headers=bearer(tokens)).status_code == 200
+
+    def test_refresh_rotates(self, client: TestClient):
+        """Test a refresh token yields new working tokens and cannot be reused"""
+        tokens = register_and_login(client, "rotateuser")
+    
+        response = client.post("/api/v1/users/refresh", json={"refresh_token": tokens["refresh_token"]})
+    
+        assert response.status_code == 200
+        rotated = response.json()
+        assert rotated["refresh_token"] != tokens["refresh_token"]
+        assert client.get("/api/v1/users/me", headers=bearer(rotated)).status_code == 200
+    
+        # Replaying the used token revokes the whole chain
+        replay = client.post("/api/v1/users/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert replay.status_code == 401
+        again = client.post("/api/v1/users/refresh", json={"refresh_token": rotated["refresh_token"]})
+        assert again.status_code == 401
+
+    def test_family_revoked_past_replayed_token_expiry(self, client: TestClient, monkeypatch):
+        """Test the chain stays revoked after the replayed token itself would have expired"""
+        # The first token is issued with a one-day lifetime, the rotated one with the usual lifetime
+        monkeypatch.setattr(security, "REFRESH_TOKEN_EXPIRE_DAYS", 1)
+        tokens = register_and_login(client, "familyuser")
+        monkeypatch.undo()
+        rotated = client.post("/api/v1/users/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+        replay = client.post("/api/v1/users/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert replay.status_code == 401
+        first_exp = jwt.get_unverified_claims(tokens["refresh_token"])["exp"]
+        assert jwt.get_unverified_claims(rotated["refresh_token"])["exp"] > first_exp + 60
+    
+        # The deny-list clock moves past the replayed token's expiry, but not the rotated one's
+        monkeypatch.setattr(cache.time, "time", lambda: first_exp + 60)
+        response = client.post("/api/v1/users/refresh", json={"refresh_token": rotated["refresh_token"]})
+    
+        assert response.status_code == 401
+
+    def test_refresh_token_not_a_bearer_token(self, client: TestClient):
+        """Test refresh tokens are rejected on ordinary endpoints"""
+        tokens = register_and_login(client, "typeuser")
+    
+        response = client.get(
+            "/api/v1/users/me", headers={"Authorization": f"Bearer {tokens['refresh_token']}"}
+        )
+    
+        assert response.status_code == 401
+
+    def test_access_token_rejected_by_refresh(self, client: TestClient):
+        """Test access tokens cannot be exchanged"""
+        tokens = register_and_login(client, "exchangeuser")
+    
+        response = client.post("/api/v1/users/refresh", json={"refresh_token": tokens["access_token"]})
+    
+        assert response.status_code == 401
+
+    def test_logout_revokes(self, client: TestClient):
+        """Test logout revokes a cached access token and its refresh chain"""
+        tokens = register_and_login(client, "logoutuser")
+        # Verified once, so the token cache would otherwise keep accepting it
+        assert client.get("/api/v1/users/me", headers=bearer(tokens)).status_code == 200
+    
+        response = client.post(
+            "/api/v1/users/logout", json={"refresh_token": tokens["refresh_token"]}, headers=bearer(tokens)
+        )
+    
+        assert response.status_code == 204
+        assert client.get("/api/v1/users/me", headers=bearer(tokens)).status_code == 401
+        refresh = client.post("/api/v1/users/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert refresh.status_code == 401
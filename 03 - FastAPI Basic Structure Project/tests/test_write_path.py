@@ -0,0 +1,81 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import IntegrityError
+
+from app.core.db_errors import unique_violation
+
+
+def _integrity_error(message: str) -> IntegrityError:
+    return IntegrityError("INSERT ...", {}, Exception(message))
+
+
+class TestWritePath:
+    """Test single-statement user writes and conflict mapping"""
+    
+    def test_register_is_one_statement(self, client: TestClient):
+        """Test that registration issues a single INSERT ... RETURNING"""
+        response = client.post("/api/v1/users/register", json={
+            "email": "writer@example.com",
+            "username": "writer",
+            "password": "testpassword123"
+        })
+        
+        assert response.status_code == 201
+        assert response.json()["id"] is not None
+        assert response.headers["X-DB-Queries"] == "1"
+    
+    def test_register_conflict_messages(self, client: TestClient):
+        """Test that each unique column maps to its own conflict message"""
+        client.post("/api/v1/users/register", json={
+            "email": "conflict@example.com",
+            "username": "conflict",
+            "password": "testpassword123"
+        })
+        response = client.post("/api/v1/users/register", json={
+            "email": "conflict@example.com",
+            "username": "conflict2",
+            "password": "testpassword123"
+        })
+        assert response.status_code == 409
+        assert response.json()["detail"] == "Email already registered"
+        
+        response = client.post("/api/v1/users/register", json={
+            "email": "conflict2@example.com",
+            "username": "conflict",
+            "password": "testpassword123"
+        })
+        assert response.status_code == 409
+        assert response.json()["detail"] == "Username already taken"
+    
+    def test_update_conflict(self, client: TestClient):
+        """Test that updating to a taken username is a conflict"""
+        client.post("/api/v1/users/register", json={
+            "email": "taken@example.com",
+            "username": "taken",
+            "password": "testpassword123"
+        })
+        client.post("/api/v1/users/register", json={
+            "email": "mover@example.com",
+            "username": "mover",
+            "password": "testpassword123"
+        })
+        response = client.post("/api/v1/users/login", data={
+            "username": "mover@example.com",
+            "password": "testpassword123"
+        })
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        
+        response = client.put("/api/v1/users/me", json={"username": "taken"}, headers=headers)
+        assert response.status_code == 409
+        assert response.json()["detail"] == "Username already taken"
+        
+        response = client.get("/api/v1/users/me", headers=headers)
+        assert response.json()["username"] == "mover"
+    
+    def test_unique_violation_parsing(self):
+        """Test dialect error messages map to the violated column"""
+        assert unique_violation(_integrity_error("UNIQUE constraint failed: users.email")) == "email"
+        assert unique_violation(_integrity_error(
+            'duplicate key value violates unique constraint "ix_users_username"\n'
+            "DETAIL:  Key (username)=(bob) already exists."
+        )) == "username"
+        assert unique_violation(_integrity_error("NOT NULL constraint failed: users.email")) is None